@@ -1,7 +1,12 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_init, post_save
 from django.dispatch import receiver
+from bnc_books.cache import bump_versions
 from .models import User, UserProfile
 
+# What book responses show of their seller
+SELLER_NAME_FIELDS = ('first_name', 'last_name')
+STORE_FIELDS = ('store_name',)
+
 @receiver(post_save, sender=User)
 def create_user_profile(sender, instance, created, **kwargs):
     if created:
@@ -9,4 +14,29 @@ def create_user_profile(sender, instance, created, **kwargs):
 
 @receiver(post_save, sender=User)
 def save_user_profile(sender, instance, **kwargs):
-    instance.profile.save()
\ No newline at end of file
+    instance.profile.save()
+
+@receiver(post_init, sender=User)
+def remember_seller_name(sender, instance, **kwargs):
+    # Read from __dict__ so deferred loads (.only()) don't trigger a query
+    instance._shown_seller_name = tuple(instance.__dict__.get(field) for field in SELLER_NAME_FIELDS)
+
+@receiver(post_save, sender=User)
+def invalidate_seller_responses(sender, instance, created, **kwargs):
+    """Book details show the seller's name; logins and other saves leave them alone"""
+    shown = tuple(getattr(instance, field) for field in SELLER_NAME_FIELDS)
+    if not created and instance.role == 'seller' and shown != instance._shown_seller_name:
+        bump_versions(f'seller:{instance.pk}')
+    instance._shown_seller_name = shown
+
+@receiver(post_init, sender=UserProfile)
+def remember_store(sender, instance, **kwargs):
+    instance._shown_store = tuple(instance.__dict__.get(field) for field in STORE_FIELDS)
+
+@receiver(post_save, sender=UserProfile)
+def invalidate_store_responses(sender, instance, created, **kwargs):
+    """Book details and the cached listings show the seller's store name"""
+    shown = tuple(getattr(instance, field) for field in STORE_FIELDS)
+    if not created and shown != instance._shown_store:
+        bump_versions('books', f'seller:{instance.user_id}')
+    instance._shown_store = shown
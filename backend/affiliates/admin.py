@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Affiliate, ReferralLink, Referral, Commission, Payout
+from .models import Affiliate, ReferralLink, Referral, ReferralClick, Commission, Payout
 
 @admin.register(Affiliate)
 class AffiliateAdmin(admin.ModelAdmin):
@@ -42,6 +42,13 @@ class ReferralAdmin(admin.ModelAdmin):
     search_fields = ('affiliate__user__email', 'user__email')
     readonly_fields = ('clicked_at', 'registered_at', 'converted_at')
 
+@admin.register(ReferralClick)
+class ReferralClickAdmin(admin.ModelAdmin):
+    list_display = ('affiliate', 'referral_link', 'user', 'ip_address', 'clicked_at')
+    list_filter = ('clicked_at',)
+    search_fields = ('affiliate__referral_code', 'affiliate__user__email')
+    list_select_related = ('affiliate__user', 'referral_link', 'user')
+
 @admin.register(Commission)
 class CommissionAdmin(admin.ModelAdmin):
     list_display = ('affiliate', 'amount', 'commission_rate', 'type', 'status', 'created_at')
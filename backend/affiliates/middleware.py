@@ -1,39 +1,24 @@
 from django.utils.deprecation import MiddlewareMixin
-from .models import Referral, Affiliate
-import urllib.parse
+from . import tracking
 
 class ReferralTrackingMiddleware(MiddlewareMixin):
+    """
+    Records ?ref= visits. Runs after AuthenticationMiddleware so that signed-in
+    users are attributed; the click itself is buffered (see affiliates.tracking).
+    """
     def process_request(self, request):
         # Check for referral parameter in URL
         ref_code = request.GET.get('ref')
-        campaign = request.GET.get('campaign')
         
-        if ref_code and request.user.is_authenticated:
-            try:
-                affiliate = Affiliate.objects.get(referral_code=ref_code, status='approved')
-                
-                # Create or update referral
-                referral, created = Referral.objects.get_or_create(
-                    affiliate=affiliate,
-                    user=request.user,
-                    defaults={
-                        'ip_address': self.get_client_ip(request),
-                        'user_agent': request.META.get('HTTP_USER_AGENT', '')
-                    }
-                )
-                
-                # Update referral link clicks if campaign provided
-                if campaign and hasattr(affiliate, 'referral_links'):
-                    referral_link = affiliate.referral_links.filter(campaign=campaign).first()
-                    if referral_link:
-                        referral_link.clicks += 1
-                        referral_link.save()
-                        referral.referral_link = referral_link
-                
-                referral.save()
-                
-            except Affiliate.DoesNotExist:
-                pass
+        if ref_code:
+            user = getattr(request, 'user', None)
+            tracking.record_click(
+                ref_code,
+                campaign=request.GET.get('campaign'),
+                user_id=user.pk if user is not None and user.is_authenticated else None,
+                ip_address=self.get_client_ip(request),
+                user_agent=request.META.get('HTTP_USER_AGENT', '')
+            )
         
         return None
     
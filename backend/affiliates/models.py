@@ -144,6 +144,43 @@ class Referral(models.Model):
     def __str__(self):
         return f"Referral: {self.user.email} by {self.affiliate.user.email}"
 
+class ReferralClick(models.Model):
+    """
+    Append-only log of ?ref= visits, written in batches by affiliates.tracking.
+    Rows are never updated; click totals are aggregated from them.
+    """
+    affiliate = models.ForeignKey(
+        Affiliate, 
+        on_delete=models.CASCADE, 
+        related_name='clicks'
+    )
+    referral_link = models.ForeignKey(
+        ReferralLink, 
+        on_delete=models.SET_NULL, 
+        null=True, 
+        blank=True,
+        related_name='click_events'
+    )
+    user = models.ForeignKey(
+        User, 
+        on_delete=models.SET_NULL, 
+        null=True, 
+        blank=True,
+        related_name='referral_clicks'
+    )
+    ip_address = models.GenericIPAddressField(null=True, blank=True)
+    user_agent = models.CharField(max_length=255, blank=True)
+    clicked_at = models.DateTimeField()
+    
+    class Meta:
+        ordering = ['-clicked_at']
+        indexes = [
+            models.Index(fields=['affiliate', 'clicked_at']),
+        ]
+    
+    def __str__(self):
+        return f"Click on {self.affiliate.referral_code} at {self.clicked_at}"
+
 class Commission(models.Model):
     TYPE_CHOICES = [
         ('sale', 'Sale'),
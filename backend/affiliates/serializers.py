@@ -144,12 +144,12 @@ class CreatePayoutSerializer(serializers.Serializer):
 
 class AffiliateAnalyticsSerializer(serializers.Serializer):
     total_commissions = serializers.DecimalField(max_digits=12, decimal_places=2)
-    commission_growth = serializers.DecimalField(max_digits=5, decimal_places=2)
+    commission_growth = serializers.DecimalField(max_digits=12, decimal_places=2)
     available_balance = serializers.DecimalField(max_digits=12, decimal_places=2)
     pending_commissions = serializers.DecimalField(max_digits=12, decimal_places=2)
     total_referrals = serializers.IntegerField()
-    conversion_rate = serializers.DecimalField(max_digits=5, decimal_places=2)
-    click_through_rate = serializers.DecimalField(max_digits=5, decimal_places=2)
+    conversion_rate = serializers.DecimalField(max_digits=12, decimal_places=2)
+    click_through_rate = serializers.DecimalField(max_digits=12, decimal_places=2)
     total_clicks = serializers.IntegerField()
     average_commission = serializers.DecimalField(max_digits=10, decimal_places=2)
     commissions_by_period = serializers.ListField()
\ No newline at end of file
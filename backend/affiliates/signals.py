@@ -0,0 +1,12 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import Affiliate, ReferralLink
+from . import tracking
+
+@receiver(post_save, sender=Affiliate)
+@receiver(post_delete, sender=Affiliate)
+@receiver(post_save, sender=ReferralLink)
+@receiver(post_delete, sender=ReferralLink)
+def reload_referral_codes(sender, instance, **kwargs):
+    # Other processes pick the change up within REFERRAL_CODE_CACHE_TTL
+    tracking.codes.invalidate()
\ No newline at end of file
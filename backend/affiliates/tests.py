@@ -1,3 +1,89 @@
-from django.test import TestCase
+from unittest import mock
+from django.db import OperationalError, connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from accounts.models import User
+from .models import Affiliate, Referral, ReferralClick, ReferralLink
+from . import tracking
 
-# Create your tests here.
+class ReferralTrackingTests(TestCase):
+    def setUp(self):
+        tracking.buffer.drain()
+        tracking.codes.invalidate()
+        self.client = APIClient()
+        self.affiliate = Affiliate.objects.create(
+            user=User.objects.create_user(username='aff@example.com', email='aff@example.com', role='affiliate'),
+            status='approved'
+        )
+        self.link = ReferralLink.objects.create(
+            affiliate=self.affiliate, campaign='spring', url='/ref/spring', clicks=4
+        )
+        self.pending = Affiliate.objects.create(
+            user=User.objects.create_user(username='new@example.com', email='new@example.com', role='affiliate')
+        )
+        self.visitors = [
+            User.objects.create_user(username=f'v{index}@example.com', email=f'v{index}@example.com')
+            for index in range(2)
+        ]
+    
+    def tearDown(self):
+        tracking.buffer.drain()
+        tracking.codes.invalidate()
+    
+    def test_referral_visits_do_not_query(self):
+        tracking.codes.lookup(self.affiliate.referral_code)
+        with CaptureQueriesContext(connection) as context:
+            self.client.get('/api/books/categories/', {'ref': self.affiliate.referral_code, 'campaign': 'spring'})
+        self.assertFalse(any('affiliates_' in query['sql'] for query in context.captured_queries))
+        
+        clicks = tracking.buffer.drain()
+        self.assertEqual(len(clicks), 1)
+        self.assertEqual(
+            (clicks[0]['affiliate_id'], clicks[0]['referral_link_id'], clicks[0]['user_id']),
+            (self.affiliate.pk, self.link.pk, None)
+        )
+    
+    def test_only_active_codes_are_tracked(self):
+        self.assertFalse(tracking.record_click('NOSUCHCODE'))
+        self.assertFalse(tracking.record_click(self.pending.referral_code))
+        
+        self.pending.status = 'approved'
+        self.pending.save()
+        self.assertTrue(tracking.record_click(self.pending.referral_code))
+    
+    def test_flush_appends_clicks_and_aggregates_counters(self):
+        code = self.affiliate.referral_code
+        other_link = ReferralLink.objects.create(affiliate=self.affiliate, campaign='summer', url='/ref/summer')
+        Referral.objects.create(affiliate=self.affiliate, user=self.visitors[0])
+        for _ in range(3):
+            tracking.record_click(code, 'spring', user_id=self.visitors[0].pk, ip_address='10.0.0.1')
+        tracking.record_click(code, 'summer', user_id=self.visitors[1].pk)
+        tracking.record_click(code, 'unknown')
+        tracking.record_click(code)
+        
+        self.assertEqual(tracking.flush(), 6)
+        self.assertEqual(tracking.flush(), 0)
+        
+        self.assertEqual(ReferralClick.objects.filter(affiliate=self.affiliate).count(), 6)
+        self.assertEqual(ReferralLink.objects.get(pk=self.link.pk).clicks, 7)
+        self.assertEqual(ReferralLink.objects.get(pk=other_link.pk).clicks, 1)
+        referrals = dict(Referral.objects.filter(affiliate=self.affiliate).values_list('user_id', 'referral_link_id'))
+        self.assertEqual(referrals, {self.visitors[0].pk: self.link.pk, self.visitors[1].pk: other_link.pk})
+    
+    def test_flush_drops_clicks_of_deleted_affiliates(self):
+        tracking.record_click(self.affiliate.referral_code, 'spring')
+        self.affiliate.delete()
+        self.assertEqual(tracking.flush(), 0)
+        self.assertFalse(ReferralClick.objects.exists())
+    
+    @override_settings(REFERRAL_CLICK_FLUSH_SIZE=1)
+    def test_failed_flush_keeps_the_clicks_and_the_page_load(self):
+        locked = OperationalError('database is locked')
+        with mock.patch.object(ReferralClick.objects, 'bulk_create', side_effect=locked), \
+                self.assertLogs('bnc_books.batching', 'ERROR'):
+            response = self.client.get('/api/books/categories/', {'ref': self.affiliate.referral_code})
+        self.assertEqual(response.status_code, 200)
+        
+        self.assertEqual(tracking.flush(), 1)
+        self.assertEqual(ReferralClick.objects.filter(affiliate=self.affiliate).count(), 1)
@@ -0,0 +1,171 @@
+"""
+Write-behind tracking of referral clicks (?ref=<code>&campaign=<name>).
+
+On the request path, record_click() resolves the code against an in-memory
+map of active referral codes and campaign links, refreshed every
+REFERRAL_CODE_CACHE_TTL seconds and dropped whenever an affiliate or link
+is saved in this process. It then appends the click to a buffer. The
+request costs no query.
+
+The buffer is flushed once it is REFERRAL_CLICK_FLUSH_INTERVAL seconds old
+or holds REFERRAL_CLICK_FLUSH_SIZE clicks, and again at interpreter exit. A
+flush that fails keeps its clicks for a later one and does not fail the
+request (see bnc_books.batching.WriteBehindBuffer).
+A flush runs in one transaction with a fixed handful of statements, however
+many clicks it carries:
+
+- the clicks are appended to the ReferralClick log with one bulk insert;
+- ReferralLink.clicks is incremented per link with one UPDATE ... CASE;
+- a Referral is created for each new (affiliate, signed-in user) pair,
+  with conflicts ignored. Pairs that already exist move to the link
+  clicked last.
+
+Clicks buffered in a process that dies without exiting cleanly are lost.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, PositiveIntegerField, Value, When
+from django.utils import timezone
+
+from accounts.models import User
+from bnc_books.batching import WriteBehindBuffer, chunked
+from .models import Affiliate, Referral, ReferralClick, ReferralLink
+
+CHUNK_SIZE = 200
+USER_AGENT_LENGTH = ReferralClick._meta.get_field('user_agent').max_length
+
+
+def _code_cache_ttl():
+    return getattr(settings, 'REFERRAL_CODE_CACHE_TTL', 60)
+
+
+def _flush_interval():
+    return getattr(settings, 'REFERRAL_CLICK_FLUSH_INTERVAL', 30)
+
+
+def _flush_size():
+    return getattr(settings, 'REFERRAL_CLICK_FLUSH_SIZE', 500)
+
+
+class ReferralCodes:
+    """Thread-safe map of active referral codes and campaign links, reloaded every TTL"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._codes = None
+        self._links = {}
+        self._loaded_at = 0
+
+    def lookup(self, code, campaign=None):
+        """(affiliate_id, referral_link_id or None) for an active code, or None"""
+        with self._lock:
+            if self._codes is None or time.monotonic() - self._loaded_at >= _code_cache_ttl():
+                self._load()
+            affiliate_id = self._codes.get(code)
+            if affiliate_id is None:
+                return None
+            return affiliate_id, self._links.get((affiliate_id, campaign)) if campaign else None
+
+    def invalidate(self):
+        with self._lock:
+            self._codes = None
+
+    def _load(self):
+        self._codes = dict(
+            Affiliate.objects.filter(status='approved', is_active=True).values_list('referral_code', 'id').order_by()
+        )
+        self._links = {
+            (affiliate_id, campaign): link_id
+            for link_id, affiliate_id, campaign in ReferralLink.objects.filter(
+                is_active=True, affiliate_id__in=self._codes.values()
+            ).values_list('id', 'affiliate_id', 'campaign').order_by()
+        }
+        self._loaded_at = time.monotonic()
+
+
+codes = ReferralCodes()
+
+
+def record_click(code, campaign=None, user_id=None, ip_address=None, user_agent=''):
+    """Buffer a click on a referral code. Returns False for unknown or inactive codes."""
+    match = codes.lookup(code, campaign)
+    if match is None:
+        return False
+    affiliate_id, link_id = match
+    buffer.add({
+        'affiliate_id': affiliate_id,
+        'referral_link_id': link_id,
+        'user_id': user_id,
+        'ip_address': ip_address,
+        'user_agent': (user_agent or '')[:USER_AGENT_LENGTH],
+        'clicked_at': timezone.now(),
+    })
+    return True
+
+
+def _write(clicks):
+    # Drop references to rows deleted since the click was buffered
+    affiliates = set(Affiliate.objects.filter(
+        pk__in={click['affiliate_id'] for click in clicks}
+    ).values_list('id', flat=True).order_by())
+    links = set(ReferralLink.objects.filter(
+        pk__in={click['referral_link_id'] for click in clicks if click['referral_link_id']}
+    ).values_list('id', flat=True).order_by())
+    users = set(User.objects.filter(
+        pk__in={click['user_id'] for click in clicks if click['user_id']}
+    ).values_list('id', flat=True).order_by())
+
+    clicks = [click for click in clicks if click['affiliate_id'] in affiliates]
+    per_link = {}
+    last_referral = {}
+    for click in clicks:
+        if click['referral_link_id'] not in links:
+            click['referral_link_id'] = None
+        if click['user_id'] not in users:
+            click['user_id'] = None
+        if click['referral_link_id']:
+            per_link[click['referral_link_id']] = per_link.get(click['referral_link_id'], 0) + 1
+        if click['user_id']:
+            last_referral[(click['affiliate_id'], click['user_id'])] = click
+
+    with transaction.atomic():
+        ReferralClick.objects.bulk_create([ReferralClick(**click) for click in clicks], batch_size=500)
+
+        for chunk in chunked(per_link, CHUNK_SIZE):
+            ReferralLink.objects.filter(pk__in=chunk).update(clicks=F('clicks') + Case(
+                *[When(pk=link_id, then=Value(per_link[link_id])) for link_id in chunk],
+                default=Value(0),
+                output_field=PositiveIntegerField()
+            ))
+
+        Referral.objects.bulk_create([
+            Referral(
+                affiliate_id=affiliate_id,
+                user_id=user_id,
+                referral_link_id=click['referral_link_id'],
+                ip_address=click['ip_address'],
+                user_agent=click['user_agent']
+            )
+            for (affiliate_id, user_id), click in last_referral.items()
+        ], ignore_conflicts=True)
+
+        moved = {}
+        for (affiliate_id, user_id), click in last_referral.items():
+            if click['referral_link_id']:
+                moved.setdefault((affiliate_id, click['referral_link_id']), []).append(user_id)
+        for (affiliate_id, link_id), user_ids in moved.items():
+            Referral.objects.filter(affiliate_id=affiliate_id, user_id__in=user_ids).exclude(
+                referral_link_id=link_id
+            ).update(referral_link_id=link_id)
+
+    return len(clicks)
+
+
+buffer = WriteBehindBuffer(_write, _flush_interval, _flush_size)
+
+
+def flush():
+    """Write buffered clicks to the database. Returns the number of clicks written."""
+    return buffer.flush()
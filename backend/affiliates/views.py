@@ -9,7 +9,9 @@ from django.utils import timezone
 from datetime import timedelta
 import json
 
-from .models import Affiliate, ReferralLink, Referral, Commission, Payout
+from analytics.timeseries import time_series
+from bnc_books.replicas import ReplicaReadMixin
+from .models import Affiliate, ReferralLink, Referral, ReferralClick, Commission, Payout
 from .serializers import (
     AffiliateRegistrationSerializer, AffiliateSerializer,
     ReferralLinkSerializer, CreateReferralLinkSerializer,
@@ -93,7 +95,7 @@ class GenerateReferralLinkView(APIView):
         response_serializer = ReferralLinkSerializer(referral_link)
         return Response(response_serializer.data, status=status.HTTP_201_CREATED)
 
-class GetCommissionsView(ListAPIView):
+class GetCommissionsView(ReplicaReadMixin, ListAPIView):
     serializer_class = CommissionSerializer
     permission_classes = [permissions.IsAuthenticated]
     
@@ -101,7 +103,7 @@ class GetCommissionsView(ListAPIView):
         if hasattr(self.request.user, 'affiliate'):
             return Commission.objects.filter(
                 affiliate=self.request.user.affiliate
-            ).select_related('referral', 'order')
+            ).select_related('referral__user', 'referral__affiliate__user', 'order')
         return Commission.objects.none()
 
 class RequestPayoutView(APIView):
@@ -145,7 +147,7 @@ class RequestPayoutView(APIView):
         response_serializer = PayoutSerializer(payout)
         return Response(response_serializer.data, status=status.HTTP_201_CREATED)
 
-class AffiliateAnalyticsView(APIView):
+class AffiliateAnalyticsView(ReplicaReadMixin, APIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def get(self, request):
@@ -262,36 +264,26 @@ class AffiliateAnalyticsView(APIView):
         }
     
     def _get_clicks_data(self, affiliate, start_date):
-        clicks = ReferralLink.objects.filter(
-            affiliate=affiliate,
-            created_at__gte=start_date
-        ).aggregate(total_clicks=Sum('clicks'))
-        
+        # Clicks in the period, from the click log (see affiliates.tracking)
         return {
-            'total_clicks': clicks['total_clicks'] or 0
+            'total_clicks': ReferralClick.objects.filter(
+                affiliate=affiliate,
+                clicked_at__gte=start_date
+            ).count()
         }
     
     def _get_commissions_by_period(self, affiliate, days):
-        commissions_by_period = []
-        
-        for i in range(days, 0, -1):
-            date = timezone.now() - timedelta(days=i)
-            date_str = date.strftime('%Y-%m-%d')
-            
-            daily_commissions = Commission.objects.filter(
-                affiliate=affiliate,
-                created_at__date=date.date(),
-                status__in=['approved', 'paid']
-            ).aggregate(total=Sum('amount'))['total'] or 0
-            
-            commissions_by_period.append({
-                'date': date_str,
-                'commissions': float(daily_commissions)
-            })
-        
-        return commissions_by_period
+        today = timezone.localdate()
+        return [
+            {'date': day['date'].strftime('%Y-%m-%d'), 'commissions': float(day['commissions'])}
+            for day in time_series(
+                Commission.objects.filter(affiliate=affiliate, status__in=['approved', 'paid']),
+                'created_at', today - timedelta(days=days), today - timedelta(days=1),
+                commissions=Sum('amount')
+            )
+        ]
 
-class AffiliateDashboardView(APIView):
+class AffiliateDashboardView(ReplicaReadMixin, APIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def get(self, request):
@@ -305,7 +297,7 @@ class AffiliateDashboardView(APIView):
         # Get recent commissions
         recent_commissions = Commission.objects.filter(
             affiliate=affiliate
-        ).select_related('referral', 'order')[:5]
+        ).select_related('referral__user', 'referral__affiliate__user', 'order')[:5]
         
         # Get referral links
         referral_links = ReferralLink.objects.filter(affiliate=affiliate)
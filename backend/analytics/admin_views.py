@@ -4,15 +4,19 @@ from rest_framework.response import Response
 from django.db.models import Sum, Count, Avg, Q
 from django.utils import timezone
 from datetime import timedelta
+import time
 
 from accounts.models import User
 from books.models import Book, Category
 from orders.models import Order, OrderItem
 from affiliates.models import Affiliate, Commission
+from analytics.rollups import daily_revenue, top_categories, window_totals
 from reviews.models import Review
 from analytics.models import SellerAnalytics
+from bnc_books import metrics
+from bnc_books.replicas import ReplicaReadMixin
 
-class PlatformAnalyticsView(APIView):
+class PlatformAnalyticsView(ReplicaReadMixin, APIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def get(self, request):
@@ -33,105 +37,70 @@ class PlatformAnalyticsView(APIView):
         else:
             days = 30
         
-        start_date = timezone.now() - timedelta(days=days)
-        
-        # Calculate platform metrics
-        analytics_data = self._calculate_platform_analytics(start_date, days)
+        # Calculate platform metrics from the daily rollups, kept fresh by
+        # `rollup_platform_stats --interval`
+        analytics_data = self._calculate_platform_analytics(days)
         
         return Response(analytics_data)
     
-    def _calculate_platform_analytics(self, start_date, days):
+    def _calculate_platform_analytics(self, days):
         """Calculate comprehensive platform analytics"""
-        
-        # Basic metrics
-        total_revenue = Order.objects.filter(
-            created_at__gte=start_date,
-            status__in=['delivered', 'shipped', 'processing']
-        ).aggregate(total=Sum('total_amount'))['total'] or 0
-        
-        total_orders = Order.objects.filter(
-            created_at__gte=start_date
-        ).count()
-        
-        total_users = User.objects.filter(
-            date_joined__gte=start_date
+        today = timezone.localdate()
+        start_date = today - timedelta(days=days - 1)
+        totals = window_totals(start_date, today, start_date - timedelta(days=days))
+        
+        # Current state rather than a window: cheap counts on indexed columns
+        active_sellers = SellerAnalytics.objects.filter(
+            seller__role='seller',
+            total_books__gt=0
         ).count()
         
-        total_books = Book.objects.filter(
-            created_at__gte=start_date,
-            is_published=True
-        ).count()
-        
-        active_sellers = User.objects.filter(
-            role='seller',
-            books__isnull=False
-        ).distinct().count()
-        
         active_affiliates = Affiliate.objects.filter(
             status='approved',
             is_active=True
         ).count()
         
-        # Growth calculations
-        previous_start_date = start_date - timedelta(days=days)
-        previous_revenue = Order.objects.filter(
-            created_at__range=[previous_start_date, start_date],
-            status__in=['delivered', 'shipped', 'processing']
-        ).aggregate(total=Sum('total_amount'))['total'] or 0
-        
-        previous_orders = Order.objects.filter(
-            created_at__range=[previous_start_date, start_date]
-        ).count()
-        
-        previous_users = User.objects.filter(
-            date_joined__range=[previous_start_date, start_date]
-        ).count()
-        
         # Calculate growth percentages
-        revenue_growth = self._calculate_growth(total_revenue, previous_revenue)
-        order_growth = self._calculate_growth(total_orders, previous_orders)
-        user_growth = self._calculate_growth(total_users, previous_users)
+        revenue_growth = self._calculate_growth(totals['revenue'], totals['previous_revenue'])
+        order_growth = self._calculate_growth(totals['orders'], totals['previous_orders'])
+        user_growth = self._calculate_growth(totals['signups'], totals['previous_signups'])
         
         # Conversion rate
         total_sessions = 10000  # This would come from actual analytics
         if total_sessions > 0:
-            conversion_rate = (total_orders / total_sessions) * 100
+            conversion_rate = (totals['orders'] / total_sessions) * 100
         else:
             conversion_rate = 0
         
         # Average order value
-        if total_orders > 0:
-            average_order_value = total_revenue / total_orders
+        if totals['orders'] > 0:
+            average_order_value = totals['revenue'] / totals['orders']
         else:
             average_order_value = 0
         
         # Top selling categories
-        top_categories = Category.objects.filter(
-            book__orderitem__order__created_at__gte=start_date
-        ).annotate(
-            sales=Count('book__orderitem'),
-            revenue=Sum('book__orderitem__total_price')
-        ).order_by('-revenue')[:5]
-        
         top_categories_data = []
-        for category in top_categories:
+        for category in top_categories(start_date, today):
             top_categories_data.append({
-                'category': category.name,
-                'sales': category.sales,
-                'revenue': float(category.revenue or 0)
+                'category': category['category__name'],
+                'sales': category['sales'],
+                'revenue': float(category['revenue'] or 0)
             })
         
-        # Revenue by period
-        revenue_by_period = self._get_revenue_by_period(start_date, days)
+        # Revenue by period: the `days` days before today
+        revenue_by_period = [
+            {'date': day['date'].strftime('%Y-%m-%d'), 'revenue': float(day['revenue'])}
+            for day in daily_revenue(today - timedelta(days=days), today - timedelta(days=1))
+        ]
         
         return {
-            'total_revenue': float(total_revenue),
+            'total_revenue': float(totals['revenue']),
             'revenue_growth': round(revenue_growth, 1),
-            'total_orders': total_orders,
+            'total_orders': totals['orders'],
             'order_growth': round(order_growth, 1),
-            'total_users': total_users,
+            'total_users': totals['signups'],
             'user_growth': round(user_growth, 1),
-            'total_books': total_books,
+            'total_books': totals['books_listed'],
             'active_sellers': active_sellers,
             'active_affiliates': active_affiliates,
             'conversion_rate': round(conversion_rate, 1),
@@ -143,33 +112,13 @@ class PlatformAnalyticsView(APIView):
     def _calculate_growth(self, current, previous):
         """Calculate growth percentage"""
         if previous > 0:
-            return ((current - previous) / previous) * 100
+            return float((current - previous) / previous) * 100
         elif current > 0:
             return 100.0
         else:
             return 0.0
-    
-    def _get_revenue_by_period(self, start_date, days):
-        """Get revenue broken down by period"""
-        revenue_by_period = []
-        
-        for i in range(days, 0, -1):
-            date = timezone.now() - timedelta(days=i)
-            date_str = date.strftime('%Y-%m-%d')
-            
-            daily_revenue = Order.objects.filter(
-                created_at__date=date.date(),
-                status__in=['delivered', 'shipped', 'processing']
-            ).aggregate(total=Sum('total_amount'))['total'] or 0
-            
-            revenue_by_period.append({
-                'date': date_str,
-                'revenue': float(daily_revenue)
-            })
-        
-        return revenue_by_period
 
-class UserManagementView(APIView):
+class UserManagementView(ReplicaReadMixin, APIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def get(self, request):
@@ -216,7 +165,7 @@ class UserManagementView(APIView):
             'results': serializer.data
         })
 
-class ContentModerationView(APIView):
+class ContentModerationView(ReplicaReadMixin, APIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def get(self, request):
@@ -266,10 +215,13 @@ class SystemHealthView(APIView):
         new_orders_24h = Order.objects.filter(created_at__gte=last_24_hours).count()
         new_reviews_24h = Review.objects.filter(created_at__gte=last_24_hours).count()
         
-        # Performance metrics (simplified)
-        avg_response_time = 150  # ms - this would come from actual monitoring
-        error_rate = 0.5  # percentage - this would come from actual monitoring
-        uptime = 99.9  # percentage
+        # Request metrics of every worker since it started (bnc_books.metrics)
+        request_metrics = metrics.collect()
+        overall = metrics.summarize(metrics.totals(request_metrics['routes']))
+        endpoints = [
+            {'endpoint': key, **metrics.summarize(stats)}
+            for key, stats in request_metrics['routes'].items()
+        ]
         
         return Response({
             'overview': {
@@ -284,8 +236,16 @@ class SystemHealthView(APIView):
                 'new_reviews_24h': new_reviews_24h
             },
             'performance': {
-                'avg_response_time': avg_response_time,
-                'error_rate': error_rate,
-                'uptime': uptime
-            }
+                'requests': overall['requests'],
+                'avg_response_time': overall['avg_ms'],
+                'p50_response_time': overall['p50_ms'],
+                'p95_response_time': overall['p95_ms'],
+                'p99_response_time': overall['p99_ms'],
+                'error_rate': overall['error_rate'],
+                'avg_sql_queries': overall['avg_sql_queries'],
+                'uptime_seconds': round(time.time() - request_metrics['started']),
+                'workers': request_metrics['workers']
+            },
+            'slowest_endpoints': sorted(endpoints, key=lambda row: row['p95_ms'], reverse=True)[:10],
+            'chattiest_endpoints': sorted(endpoints, key=lambda row: row['avg_sql_queries'], reverse=True)[:10]
         })
\ No newline at end of file
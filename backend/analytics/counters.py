@@ -0,0 +1,258 @@
+"""
+Incrementally maintained seller analytics.
+
+SellerAnalytics, DailySales and BookPerformance are running totals. Instead
+of re-aggregating a seller's order history on every dashboard load, order
+lifecycle events apply deltas to them with F() expressions:
+
+- an order starts counting when it enters a COUNTED_STATUSES status
+  (e.g. pending -> processing): its items are added, per seller and per book;
+- it stops counting when it leaves them (e.g. shipped -> refunded): the same
+  amounts are subtracted;
+- moves between counted statuses (processing -> shipped) change nothing.
+
+Daily figures are booked on the day the order was placed, as before. Reads
+are a single-row fetch; `rebuild_seller_analytics` recomputes everything
+from the orders tables if the totals ever need repairing.
+"""
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum, Value
+from django.db.models.functions import Greatest, TruncDate
+from django.utils import timezone
+
+from accounts.models import User
+from bnc_books.batching import chunked
+from books.models import Book
+from orders.models import OrderItem
+from .models import BookPerformance, DailySales, SellerAnalytics
+
+COUNTED_STATUSES = ('processing', 'shipped', 'delivered')
+ID_CHUNK_SIZE = 500
+REBUILT_SELLER_FIELDS = (
+    'total_revenue', 'total_orders', 'total_books_sold', 'total_books', 'total_views', 'last_updated',
+)
+
+
+def is_counted(status):
+    return status in COUNTED_STATUSES
+
+
+def apply_deltas(model, lookup, **deltas):
+    """
+    Add `deltas` to the row matching `lookup`, creating it if needed. Counters
+    never drop below zero, and a missing row is not created just to
+    subtract from it.
+    """
+    updates = {
+        field: Greatest(F(field) + Value(delta), Value(delta * 0)) if delta < 0 else F(field) + Value(delta)
+        for field, delta in deltas.items()
+    }
+    if hasattr(model, 'last_updated'):
+        updates['last_updated'] = timezone.now()
+
+    if model.objects.filter(**lookup).update(**updates):
+        return
+    if not any(delta > 0 for delta in deltas.values()):
+        return
+
+    try:
+        # Savepoint: a concurrent writer may create the row first
+        with transaction.atomic():
+            model.objects.create(**lookup, **{field: max(delta, 0) for field, delta in deltas.items()})
+    except IntegrityError:
+        model.objects.filter(**lookup).update(**updates)
+
+
+def _items_by_seller(items):
+    totals = {}
+    for item in items:
+        seller = totals.setdefault(item['book__seller_id'], {'revenue': Decimal('0'), 'quantity': 0})
+        seller['revenue'] += item['revenue']
+        seller['quantity'] += item['quantity']
+    return totals
+
+
+def record_order_items(order, items, sign=1, new_order_sellers=None):
+    """
+    Add (sign=1) or remove (sign=-1) order items in the running totals.
+    `items` are dicts with book_id, book__seller_id, quantity and revenue.
+    The order is counted once for each seller in `new_order_sellers`, which
+    defaults to every seller with items in `items`.
+    """
+    day = timezone.localtime(order.created_at).date()
+    by_seller = _items_by_seller(items)
+    if new_order_sellers is None:
+        new_order_sellers = set(by_seller)
+
+    with transaction.atomic():
+        for seller_id, totals in by_seller.items():
+            revenue = totals['revenue'] * sign
+            quantity = totals['quantity'] * sign
+            orders = sign if seller_id in new_order_sellers else 0
+            apply_deltas(
+                SellerAnalytics, {'seller_id': seller_id},
+                total_revenue=revenue, total_orders=orders, total_books_sold=quantity
+            )
+            apply_deltas(
+                DailySales, {'seller_id': seller_id, 'date': day},
+                revenue=revenue, orders=orders, books_sold=quantity
+            )
+
+        for item in items:
+            apply_deltas(
+                BookPerformance, {'book_id': item['book_id']},
+                purchases=item['quantity'] * sign, revenue=item['revenue'] * sign
+            )
+
+
+def order_items(order):
+    return list(
+        OrderItem.objects.filter(order=order)
+        .values('book_id', 'book__seller_id')
+        .annotate(quantity=Sum('quantity'), revenue=Sum('total_price'))
+        .order_by('book_id')
+    )
+
+
+def order_status_changed(order, old_status, new_status):
+    """Apply the deltas for an order moving from `old_status` to `new_status`"""
+    if is_counted(old_status) == is_counted(new_status):
+        return
+    record_order_items(order, order_items(order), sign=1 if is_counted(new_status) else -1)
+
+
+def item_added(item):
+    """An item added to an order that already counts"""
+    order = item.order
+    if not is_counted(order.status):
+        return
+
+    seller_id = item.book.seller_id
+    seller_already_in_order = OrderItem.objects.filter(
+        order_id=order.pk, book__seller_id=seller_id
+    ).exclude(pk=item.pk).exists()
+
+    record_order_items(order, [{
+        'book_id': item.book_id,
+        'book__seller_id': seller_id,
+        'quantity': item.quantity,
+        'revenue': item.total_price,
+    }], new_order_sellers=set() if seller_already_in_order else {seller_id})
+
+
+def books_listed(seller_id, count):
+    """`count` books were added (or, if negative, removed) from a seller's catalog"""
+    apply_deltas(SellerAnalytics, {'seller_id': seller_id}, total_books=count)
+
+
+def rebuild(seller_ids=None):
+    """
+    Recompute every running total from the orders, books and performance
+    tables with a handful of grouped queries. Used to backfill existing data
+    and to repair drift (e.g. after raw SQL edits to orders).
+    """
+    counted_items = OrderItem.objects.filter(order__status__in=COUNTED_STATUSES)
+    books = Book.objects.all()
+    performance = BookPerformance.objects.all()
+    if seller_ids is not None:
+        counted_items = counted_items.filter(book__seller_id__in=seller_ids)
+        books = books.filter(seller_id__in=seller_ids)
+        performance = performance.filter(book__seller_id__in=seller_ids)
+    else:
+        seller_ids = list(User.objects.filter(role='seller').values_list('id', flat=True))
+
+    sales = {
+        row['book__seller_id']: row
+        for row in counted_items.values('book__seller_id').annotate(
+            revenue=Sum('total_price'), quantity=Sum('quantity'), orders=Count('order', distinct=True)
+        ).order_by()
+    }
+    listed = dict(books.values('seller_id').annotate(count=Count('id')).values_list('seller_id', 'count').order_by())
+    views = dict(
+        performance.values('book__seller_id').annotate(total=Sum('views'))
+        .values_list('book__seller_id', 'total').order_by()
+    )
+    daily = counted_items.annotate(day=TruncDate('order__created_at')).values('book__seller_id', 'day').annotate(
+        revenue=Sum('total_price'), quantity=Sum('quantity'), orders=Count('order', distinct=True)
+    ).order_by()
+    per_book = {
+        row['book_id']: row
+        for row in counted_items.values('book_id').annotate(
+            revenue=Sum('total_price'), quantity=Sum('quantity')
+        ).order_by()
+    }
+
+    # Ids are looked up in chunks: a single IN list of every book would go
+    # past the backend's limit on query parameters
+    with transaction.atomic():
+        now = timezone.now()
+        for chunk in chunked(seller_ids, ID_CHUNK_SIZE):
+            _rebuild_sellers(chunk, sales, listed, views, now)
+            _rebuild_daily_sales(chunk, daily.filter(book__seller_id__in=chunk))
+
+        for chunk in chunked(books.order_by('id').values_list('id', flat=True).iterator(), ID_CHUNK_SIZE):
+            _rebuild_book_performance(chunk, per_book)
+
+    return len(seller_ids)
+
+
+def _rebuild_sellers(seller_ids, sales, listed, views, now):
+    rows = {row.seller_id: row for row in SellerAnalytics.objects.filter(seller_id__in=seller_ids)}
+    created = []
+    for seller_id in seller_ids:
+        totals = sales.get(seller_id, {})
+        row = rows.get(seller_id)
+        if row is None:
+            row = SellerAnalytics(seller_id=seller_id)
+            created.append(row)
+        row.total_revenue = totals.get('revenue') or 0
+        row.total_orders = totals.get('orders') or 0
+        row.total_books_sold = totals.get('quantity') or 0
+        row.total_books = listed.get(seller_id, 0)
+        row.total_views = views.get(seller_id) or 0
+        row.last_updated = now
+    SellerAnalytics.objects.bulk_update(list(rows.values()), REBUILT_SELLER_FIELDS, batch_size=500)
+    SellerAnalytics.objects.bulk_create(created, batch_size=500)
+
+
+def _rebuild_daily_sales(seller_ids, daily):
+    # DailySales.views comes from view tracking, not orders: keep it
+    existing = {
+        (row.seller_id, row.date): row.views
+        for row in DailySales.objects.filter(seller_id__in=seller_ids).only('seller_id', 'date', 'views')
+    }
+    DailySales.objects.filter(seller_id__in=seller_ids).delete()
+    rows = {
+        (row['book__seller_id'], row['day']): DailySales(
+            seller_id=row['book__seller_id'], date=row['day'], revenue=row['revenue'],
+            orders=row['orders'], books_sold=row['quantity']
+        )
+        for row in daily
+    }
+    for key, day_views in existing.items():
+        if key in rows:
+            rows[key].views = day_views
+        elif day_views:
+            rows[key] = DailySales(seller_id=key[0], date=key[1], views=day_views)
+    DailySales.objects.bulk_create(rows.values(), batch_size=500)
+
+
+def _rebuild_book_performance(book_ids, per_book):
+    existing = {row.book_id: row for row in BookPerformance.objects.filter(book_id__in=book_ids)}
+    changed = []
+    created = []
+    for book_id in book_ids:
+        totals = per_book.get(book_id)
+        purchases = totals['quantity'] if totals else 0
+        revenue = totals['revenue'] if totals else Decimal('0')
+        row = existing.get(book_id)
+        if row is None:
+            if totals:
+                created.append(BookPerformance(book_id=book_id, purchases=purchases, revenue=revenue))
+        elif (row.purchases, row.revenue) != (purchases, revenue):
+            row.purchases, row.revenue = purchases, revenue
+            changed.append(row)
+    BookPerformance.objects.bulk_update(changed, ['purchases', 'revenue'], batch_size=500)
+    BookPerformance.objects.bulk_create(created, batch_size=500)
@@ -0,0 +1,132 @@
+"""
+Write-behind counters for book views and add-to-cart events.
+
+record() only increments a dict in process memory, so tracking adds no
+query to a product page view. Counts are aggregated per book and day. They
+are flushed to BookPerformance, DailySales.views and SellerAnalytics.total_views
+once the buffer is COUNTER_FLUSH_INTERVAL seconds old or holds
+COUNTER_FLUSH_SIZE keys. The flush is triggered by the request that crosses
+the limit, and again at interpreter exit. A flush is a handful of batched
+UPDATE ... CASE statements, however many events it carries. A flush that
+fails (e.g. on a locked database) keeps its counts for a later one and does
+not fail the request (see bnc_books.batching.WriteBehindBuffer).
+
+Counts buffered in a process that dies without exiting cleanly are lost:
+these are statistics, not ledgers.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, PositiveIntegerField, Q, Value, When
+from django.utils import timezone
+
+from bnc_books.batching import WriteBehindBuffer, chunked
+from books.models import Book
+from .models import BookPerformance, DailySales, SellerAnalytics
+
+EVENTS = ('views', 'add_to_cart_count')
+CHUNK_SIZE = 200
+
+
+def _flush_interval():
+    return getattr(settings, 'COUNTER_FLUSH_INTERVAL', 30)
+
+
+def _flush_size():
+    return getattr(settings, 'COUNTER_FLUSH_SIZE', 1000)
+
+
+class CounterBuffer(WriteBehindBuffer):
+    """
+    {(book_id, date): {event: count}} accumulated since the last drain. Its
+    age is counted from the first event after a drain.
+    """
+    def empty(self):
+        return {}
+
+    def put(self, counts, item):
+        event, book_id, day, count = item
+        counts.setdefault((book_id, day), dict.fromkeys(EVENTS, 0))[event] += count
+
+    def merge(self, counts, restored):
+        for key, events in restored.items():
+            merged = counts.setdefault(key, dict.fromkeys(EVENTS, 0))
+            for event, count in events.items():
+                merged[event] += count
+        return counts
+
+
+def record(event, book_id, count=1):
+    """Count `event` ('views' or 'add_to_cart_count') for a book"""
+    if event not in EVENTS:
+        raise ValueError(f"Unknown event '{event}'")
+    buffer.add((event, int(book_id), timezone.localdate(), count))
+
+
+def _increment(model, rows, match, fields):
+    """
+    Add rows[key][field] to each field of the row matched by match(key),
+    one UPDATE per chunk of keys.
+    """
+    for chunk in chunked(rows, CHUNK_SIZE):
+        condition = Q()
+        for key in chunk:
+            condition |= match(key)
+        updates = {
+            field: F(field) + Case(
+                *[When(match(key), then=Value(rows[key][field])) for key in chunk if rows[key][field]],
+                default=Value(0),
+                output_field=PositiveIntegerField()
+            )
+            for field in fields
+        }
+        if hasattr(model, 'last_updated'):
+            updates['last_updated'] = timezone.now()
+        model.objects.filter(condition).update(**updates)
+
+
+def _write(counts):
+    sellers = dict(
+        Book.objects.filter(pk__in={book_id for book_id, _ in counts}).values_list('id', 'seller_id').order_by()
+    )
+    per_book = {}
+    per_seller_day = {}
+    per_seller = {}
+    for (book_id, day), events in counts.items():
+        if book_id not in sellers:
+            continue  # deleted since
+        seller_id = sellers[book_id]
+        book = per_book.setdefault(book_id, dict.fromkeys(EVENTS, 0))
+        for event in EVENTS:
+            book[event] += events[event]
+        if events['views']:
+            seller_day = per_seller_day.setdefault((seller_id, day), {'views': 0})
+            seller_day['views'] += events['views']
+            seller = per_seller.setdefault(seller_id, {'total_views': 0})
+            seller['total_views'] += events['views']
+
+    with transaction.atomic():
+        # Missing rows are created empty first, so every delta is an UPDATE
+        BookPerformance.objects.bulk_create(
+            [BookPerformance(book_id=book_id) for book_id in per_book], ignore_conflicts=True
+        )
+        _increment(BookPerformance, per_book, lambda book_id: Q(book_id=book_id), EVENTS)
+
+        DailySales.objects.bulk_create(
+            [DailySales(seller_id=seller_id, date=day) for seller_id, day in per_seller_day], ignore_conflicts=True
+        )
+        _increment(DailySales, per_seller_day, lambda key: Q(seller_id=key[0], date=key[1]), ['views'])
+
+        SellerAnalytics.objects.bulk_create(
+            [SellerAnalytics(seller_id=seller_id) for seller_id in per_seller], ignore_conflicts=True
+        )
+        _increment(SellerAnalytics, per_seller, lambda seller_id: Q(seller_id=seller_id), ['total_views'])
+
+    return sum(sum(events.values()) for events in counts.values())
+
+
+buffer = CounterBuffer(_write, _flush_interval, _flush_size)
+
+
+def flush():
+    """Write buffered counts to the database. Returns the number of events written."""
+    return buffer.flush()
@@ -0,0 +1,131 @@
+"""
+Set-based inventory alerts.
+
+sync_inventory_alerts() evaluates the stock rules for any number of books.
+Each chunk of books costs a fixed handful of queries, however many alerts
+change:
+
+- out of stock (0 units): an out_of_stock alert, high priority;
+- low stock (1 unit up to the seller's low_stock_threshold): a low_stock
+  alert, high priority at or below high_priority_threshold, medium above;
+- otherwise: no alert.
+
+Open low/out of stock alerts that no longer match the book's stock are
+resolved. Open alerts that still match get the current stock and priority.
+Missing alerts are created with one bulk insert.
+
+It is called by the writers that change stock (checkout, bulk stock updates,
+imports, book saves that change stock_quantity), and on a schedule by
+`manage.py evaluate_inventory_alerts` for all books.
+"""
+from django.db.models import Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from bnc_books.batching import chunked
+from books.models import Book
+from .models import InventoryAlert, InventoryAlertSettings
+
+LOW_STOCK_THRESHOLD = InventoryAlertSettings.DEFAULT_LOW_STOCK_THRESHOLD
+HIGH_PRIORITY_THRESHOLD = InventoryAlertSettings.DEFAULT_HIGH_PRIORITY_THRESHOLD
+STOCK_ALERT_TYPES = ('low_stock', 'out_of_stock')
+ID_CHUNK_SIZE = 500
+
+
+def _books_with_thresholds(book_ids):
+    return Book.objects.filter(pk__in=book_ids).annotate(
+        low_threshold=Coalesce(
+            'seller__inventory_alert_settings__low_stock_threshold', Value(LOW_STOCK_THRESHOLD)
+        ),
+        high_priority_threshold=Coalesce(
+            'seller__inventory_alert_settings__high_priority_threshold', Value(HIGH_PRIORITY_THRESHOLD)
+        )
+    ).values('id', 'seller_id', 'stock_quantity', 'low_threshold', 'high_priority_threshold').order_by()
+
+
+def expected_alert(book):
+    """(alert_type, priority, threshold) the book should have open, or None"""
+    stock = book['stock_quantity']
+    if stock == 0:
+        return 'out_of_stock', 'high', 1
+    if stock <= book['low_threshold']:
+        priority = 'high' if stock <= book['high_priority_threshold'] else 'medium'
+        return 'low_stock', priority, book['low_threshold']
+    return None
+
+
+def _message(alert_type, stock):
+    if alert_type == 'out_of_stock':
+        return 'Out of stock: 0 units in inventory'
+    return f'Low stock: Only {stock} units left'
+
+
+def sync_inventory_alerts(book_ids):
+    """Bring the open stock alerts of `book_ids` in line with their stock"""
+    resolved = created = updated = 0
+    now = timezone.now()
+
+    for chunk in chunked(book_ids, ID_CHUNK_SIZE):
+        books = list(_books_with_thresholds(chunk))
+        open_alerts = {}
+        for alert in InventoryAlert.objects.filter(
+            book_id__in=chunk,
+            alert_type__in=STOCK_ALERT_TYPES,
+            is_resolved=False
+        ).only('id', 'book_id', 'alert_type', 'priority', 'current_stock', 'threshold', 'message'):
+            open_alerts.setdefault(alert.book_id, []).append(alert)
+
+        to_resolve = []
+        to_update = []
+        to_create = []
+        for book in books:
+            expected = expected_alert(book)
+            stock = book['stock_quantity']
+            kept = False
+            for alert in open_alerts.get(book['id'], []):
+                if expected is None or alert.alert_type != expected[0] or kept:
+                    to_resolve.append(alert.pk)
+                    continue
+                kept = True
+                alert_type, priority, threshold = expected
+                if (alert.current_stock, alert.priority, alert.threshold) != (stock, priority, threshold):
+                    alert.current_stock, alert.priority, alert.threshold = stock, priority, threshold
+                    alert.message = _message(alert_type, stock)
+                    to_update.append(alert)
+
+            if expected is not None and not kept:
+                alert_type, priority, threshold = expected
+                to_create.append(InventoryAlert(
+                    seller_id=book['seller_id'],
+                    book_id=book['id'],
+                    alert_type=alert_type,
+                    priority=priority,
+                    message=_message(alert_type, stock),
+                    current_stock=stock,
+                    threshold=threshold
+                ))
+
+        if to_resolve:
+            resolved += InventoryAlert.objects.filter(pk__in=to_resolve).update(is_resolved=True, resolved_at=now)
+        if to_update:
+            updated += InventoryAlert.objects.bulk_update(
+                to_update, ['current_stock', 'priority', 'threshold', 'message']
+            )
+        if to_create:
+            InventoryAlert.objects.bulk_create(to_create)
+            created += len(to_create)
+
+    return {'resolved': resolved, 'created': created, 'updated': updated}
+
+
+def sync_seller_alerts(seller_ids=None):
+    """Evaluate every book of `seller_ids`, or of all sellers"""
+    books = Book.objects.order_by('id')
+    if seller_ids is not None:
+        books = books.filter(seller_id__in=seller_ids)
+
+    totals = {'resolved': 0, 'created': 0, 'updated': 0}
+    for chunk in chunked(books.values_list('id', flat=True).iterator(), ID_CHUNK_SIZE):
+        for key, count in sync_inventory_alerts(chunk).items():
+            totals[key] += count
+    return totals
@@ -0,0 +1,127 @@
+"""
+A small database-backed job queue for sales reports.
+
+Requests only record a ReportJob; `manage.py run_report_worker` picks queued
+jobs up and builds the reports (any number of workers can run, no broker is
+needed). A job is claimed with a compare-and-set UPDATE on its status, so two
+workers never run the same job. A failed job is queued again after an
+exponentially growing delay (RETRY_BACKOFF, doubled on every attempt) and
+marked failed after MAX_ATTEMPTS.
+
+Identical requests (seller, report type, date range) share one job while it
+is queued or running, enforced by a partial unique index. Once it has
+completed, the same request is answered with the finished report for as
+long as the data behind it has not changed (see reports.data_fingerprint).
+"""
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from bnc_books.replicas import replica_reads
+from .models import ReportJob
+from .reports import data_fingerprint, generate_sales_report
+
+MAX_ATTEMPTS = 3
+# Delay before the first retry of a failed job; doubled for every further one
+RETRY_BACKOFF = timedelta(seconds=30)
+# A running job whose worker has not finished it by then is assumed dead
+STALE_AFTER = timedelta(minutes=10)
+CLAIM_CANDIDATES = 10
+
+
+def request_report(seller, report_type, start_date, end_date):
+    """
+    Return (job, created) for a report request: a completed job whose report
+    is still current, the queued or running job for the same request, or a
+    newly queued job.
+    """
+    key = {'seller': seller, 'report_type': report_type, 'start_date': start_date, 'end_date': end_date}
+
+    done = ReportJob.objects.filter(
+        **key,
+        status='completed',
+        report__isnull=False,
+        data_fingerprint=data_fingerprint(seller, start_date, end_date)
+    ).select_related('report').order_by('-finished_at').first()
+    if done:
+        return done, False
+
+    active = ReportJob.objects.filter(**key, status__in=ReportJob.ACTIVE_STATUSES).first()
+    if active:
+        return active, False
+
+    try:
+        # Savepoint: an identical request may queue its job first
+        with transaction.atomic():
+            return ReportJob.objects.create(**key), True
+    except IntegrityError:
+        return ReportJob.objects.filter(**key, status__in=ReportJob.ACTIVE_STATUSES).first(), False
+
+
+def _claimable(now):
+    return (
+        Q(status='queued') & (Q(run_after__isnull=True) | Q(run_after__lte=now))
+        | Q(status='running', started_at__lt=now - STALE_AFTER)
+    )
+
+
+def claim_next_job():
+    """Mark the oldest claimable job as running and return it, or None"""
+    now = timezone.now()
+    candidates = ReportJob.objects.filter(_claimable(now)).order_by('created_at').values_list('id', flat=True)
+
+    for job_id in candidates[:CLAIM_CANDIDATES]:
+        claimed = ReportJob.objects.filter(_claimable(now), pk=job_id).update(
+            status='running',
+            started_at=now,
+            attempts=F('attempts') + 1
+        )
+        if claimed:
+            return ReportJob.objects.select_related('seller').get(pk=job_id)
+    return None
+
+
+def run_job(job):
+    """Build the job's report. Failures are retried up to MAX_ATTEMPTS times."""
+    jobs = ReportJob.objects.filter(pk=job.pk, status='running')
+    if job.attempts > MAX_ATTEMPTS:
+        jobs.update(status='failed', finished_at=timezone.now(), error='Worker stopped while running the report')
+        return
+
+    try:
+        # The report's queries run on the read replica, if there is one, and
+        # outside the transaction: they hold no write lock while they run.
+        # The fingerprint is taken first: if orders change while the report
+        # is built, it no longer matches and the next request rebuilds it
+        with replica_reads():
+            fingerprint = data_fingerprint(job.seller, job.start_date, job.end_date)
+            report = generate_sales_report(job.seller, job.start_date, job.end_date, job.report_type, commit=False)
+        with transaction.atomic():
+            report.save()
+            jobs.update(
+                status='completed',
+                report=report,
+                data_fingerprint=fingerprint,
+                finished_at=timezone.now(),
+                error=''
+            )
+    except Exception as e:
+        if job.attempts < MAX_ATTEMPTS:
+            run_after = timezone.now() + RETRY_BACKOFF * 2 ** (job.attempts - 1)
+            jobs.update(status='queued', run_after=run_after, error=str(e))
+        else:
+            jobs.update(status='failed', finished_at=timezone.now(), error=str(e))
+
+
+def run_pending(limit=None):
+    """Run claimable jobs until there are none left (or `limit` ran). Returns the count."""
+    count = 0
+    while limit is None or count < limit:
+        job = claim_next_job()
+        if job is None:
+            break
+        run_job(job)
+        count += 1
+    return count
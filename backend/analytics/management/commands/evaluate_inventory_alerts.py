@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from analytics.inventory import sync_seller_alerts
+
+class Command(BaseCommand):
+    help = "Re-evaluate low and out of stock alerts for every book (or one seller's books)"
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--seller', type=int, action='append', dest='sellers',
+                            help="Only evaluate this seller's books (may be repeated)")
+    
+    def handle(self, *args, **options):
+        totals = sync_seller_alerts(options['sellers'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {totals['created']}, updated {totals['updated']} and resolved {totals['resolved']} alerts"
+        ))
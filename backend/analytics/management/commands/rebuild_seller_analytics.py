@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from analytics.counters import rebuild
+
+class Command(BaseCommand):
+    help = 'Recompute seller analytics, daily sales and book performance totals from the orders tables'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--seller', type=int, action='append', dest='sellers',
+                            help='Only rebuild this seller (may be repeated)')
+    
+    def handle(self, *args, **options):
+        count = rebuild(options['sellers'])
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt analytics for {count} sellers'))
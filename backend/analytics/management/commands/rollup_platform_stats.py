@@ -0,0 +1,57 @@
+import time
+from datetime import date, timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Min
+from django.utils import timezone
+from accounts.models import User
+from analytics.rollups import refresh_recent, rollup_days
+from books.models import Book
+from orders.models import Order
+
+class Command(BaseCommand):
+    help = 'Recompute the daily platform and category rollups (the last few days by default)'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=7,
+                            help='Recompute this many days up to today (default 7)')
+        parser.add_argument('--since', type=date.fromisoformat,
+                            help='Recompute every day from this date (YYYY-MM-DD) to today')
+        parser.add_argument('--all', action='store_true',
+                            help='Backfill from the first order, signup or listing to today')
+        parser.add_argument('--interval', type=float, default=0,
+                            help='Then keep checking, this many seconds apart, and recompute today and '
+                                 'yesterday once their rows are out of date')
+    
+    def handle(self, *args, **options):
+        if options['interval'] < 0:
+            raise CommandError('--interval must not be negative')
+        
+        today = timezone.localdate()
+        if options['all']:
+            firsts = [
+                Order.objects.aggregate(first=Min('created_at'))['first'],
+                User.objects.aggregate(first=Min('date_joined'))['first'],
+                Book.objects.aggregate(first=Min('created_at'))['first'],
+            ]
+            firsts = [timezone.localdate(first) for first in firsts if first]
+            start = min(firsts) if firsts else today
+        elif options['since']:
+            start = options['since']
+        else:
+            if options['days'] < 1:
+                raise CommandError('--days must be at least 1')
+            start = today - timedelta(days=options['days'] - 1)
+        
+        # A year at a time keeps each transaction and its queries bounded
+        count = 0
+        while start <= today:
+            end = min(start + timedelta(days=365), today)
+            count += rollup_days(start, end)
+            start = end + timedelta(days=1)
+        self.stdout.write(self.style.SUCCESS(f'Rolled up {count} days'))
+        
+        while options['interval']:
+            time.sleep(options['interval'])
+            count = refresh_recent()
+            if count:
+                self.stdout.write(f'Rolled up {count} recent days')
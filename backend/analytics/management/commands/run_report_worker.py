@@ -0,0 +1,21 @@
+import time
+from django.core.management.base import BaseCommand
+from analytics.jobs import run_pending
+
+class Command(BaseCommand):
+    help = 'Generate queued sales reports, polling the job table until stopped'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Exit once the queue is empty instead of polling')
+        parser.add_argument('--interval', type=float, default=2.0,
+                            help='Seconds to wait between polls of an empty queue')
+    
+    def handle(self, *args, **options):
+        while True:
+            count = run_pending()
+            if count:
+                self.stdout.write(f'Ran {count} report jobs')
+            if options['once']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='selleranalytics',
+            name='total_books',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0004_platform_rollups'),
+        ('books', '0004_book_shelf'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InventoryAlertSettings',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('low_stock_threshold', models.PositiveIntegerField(default=10)),
+                ('high_priority_threshold', models.PositiveIntegerField(default=3)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Inventory alert settings',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='inventoryalert',
+            index=models.Index(fields=['book', 'is_resolved'], name='analytics_i_book_id_cd0c57_idx'),
+        ),
+        migrations.AddField(
+            model_name='inventoryalertsettings',
+            name='seller',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='inventory_alert_settings', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0005_inventory_alert_settings'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='reportjob',
+            name='run_after',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
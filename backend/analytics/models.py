@@ -1,9 +1,16 @@
+from decimal import Decimal
 from django.db import models
 from django.core.validators import MinValueValidator
 from accounts.models import User
-from books.models import Book
+from books.models import Book, Category
 from orders.models import Order, OrderItem
 
+def conversion_rate(purchases, views):
+    """Purchases per 100 views, rounded to two places"""
+    if views > 0:
+        return round(Decimal(purchases * 100) / views, 2)
+    return Decimal('0')
+
 class SellerAnalytics(models.Model):
     seller = models.OneToOneField(
         User, 
@@ -17,6 +24,7 @@ class SellerAnalytics(models.Model):
     )
     total_orders = models.PositiveIntegerField(default=0)
     total_books_sold = models.PositiveIntegerField(default=0)
+    total_books = models.PositiveIntegerField(default=0)
     total_views = models.PositiveIntegerField(default=0)
     conversion_rate = models.DecimalField(
         max_digits=5, 
@@ -35,6 +43,14 @@ class SellerAnalytics(models.Model):
     
     def __str__(self):
         return f"Analytics for {self.seller.email}"
+    
+    def update_ratios(self):
+        """Derive conversion rate and average order value from the counters"""
+        self.conversion_rate = conversion_rate(self.total_books_sold, self.total_views)
+        if self.total_orders > 0:
+            self.average_order_value = round(self.total_revenue / self.total_orders, 2)
+        else:
+            self.average_order_value = Decimal('0')
 
 class DailySales(models.Model):
     seller = models.ForeignKey(
@@ -110,10 +126,36 @@ class InventoryAlert(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Open alerts of a set of books, looked up by the alert engine
+            models.Index(fields=['book', 'is_resolved']),
+        ]
     
     def __str__(self):
         return f"{self.alert_type} alert for {self.book.title}"
 
+class InventoryAlertSettings(models.Model):
+    """A seller's stock thresholds; sellers without a row use the defaults"""
+    DEFAULT_LOW_STOCK_THRESHOLD = 10
+    DEFAULT_HIGH_PRIORITY_THRESHOLD = 3
+    
+    seller = models.OneToOneField(
+        User, 
+        on_delete=models.CASCADE, 
+        related_name='inventory_alert_settings'
+    )
+    # Stock at or below this (and above zero) raises a low stock alert
+    low_stock_threshold = models.PositiveIntegerField(default=DEFAULT_LOW_STOCK_THRESHOLD)
+    # Low stock alerts at or below this are high priority
+    high_priority_threshold = models.PositiveIntegerField(default=DEFAULT_HIGH_PRIORITY_THRESHOLD)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name_plural = "Inventory alert settings"
+    
+    def __str__(self):
+        return f"Inventory alert settings for {self.seller.email}"
+
 class SalesReport(models.Model):
     REPORT_TYPES = [
         ('daily', 'Daily'),
@@ -142,4 +184,100 @@ class SalesReport(models.Model):
         ordering = ['-created_at']
     
     def __str__(self):
-        return f"{self.report_type} report for {self.seller.email}"
\ No newline at end of file
+        return f"{self.report_type} report for {self.seller.email}"
+
+class ReportJob(models.Model):
+    """A queued sales report, generated by the `run_report_worker` command"""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    ]
+    ACTIVE_STATUSES = ('queued', 'running')
+    
+    seller = models.ForeignKey(
+        User, 
+        on_delete=models.CASCADE, 
+        related_name='report_jobs'
+    )
+    report_type = models.CharField(max_length=10, choices=SalesReport.REPORT_TYPES)
+    start_date = models.DateField()
+    end_date = models.DateField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    # Summary of the orders the report covers, to tell whether it is stale
+    data_fingerprint = models.CharField(max_length=128, blank=True)
+    report = models.ForeignKey(
+        SalesReport, 
+        on_delete=models.SET_NULL, 
+        null=True, 
+        blank=True, 
+        related_name='jobs'
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    error = models.TextField(blank=True)
+    # A failed attempt is retried no earlier than this
+    run_after = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+            models.Index(fields=['seller', 'report_type', 'start_date', 'end_date']),
+        ]
+        constraints = [
+            # At most one queued or running job per identical request
+            models.UniqueConstraint(
+                fields=['seller', 'report_type', 'start_date', 'end_date'],
+                condition=models.Q(status__in=('queued', 'running')),
+                name='unique_active_report_job'
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.report_type} report job for {self.seller.email} ({self.status})"
+
+
+class PlatformDailyStats(models.Model):
+    """Platform-wide totals for one day, written by analytics.rollups"""
+    date = models.DateField(unique=True)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    orders = models.PositiveIntegerField(default=0)
+    units_sold = models.PositiveIntegerField(default=0)
+    signups = models.PositiveIntegerField(default=0)
+    books_listed = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['-date']
+        verbose_name_plural = "Platform daily stats"
+    
+    def __str__(self):
+        return f"Platform stats for {self.date}"
+
+
+class CategoryDailySales(models.Model):
+    """Sales of one category's books on one day, written by analytics.rollups"""
+    date = models.DateField()
+    category = models.ForeignKey(
+        Category, 
+        on_delete=models.CASCADE, 
+        related_name='daily_sales'
+    )
+    items = models.PositiveIntegerField(default=0)
+    units_sold = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    
+    class Meta:
+        ordering = ['-date']
+        unique_together = ['category', 'date']
+        indexes = [
+            models.Index(fields=['date']),
+        ]
+        verbose_name_plural = "Category daily sales"
+    
+    def __str__(self):
+        return f"{self.category.name} sales on {self.date}"
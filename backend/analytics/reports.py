@@ -0,0 +1,96 @@
+"""
+Sales report generation.
+
+generate_sales_report() does the actual work and is run by the report job
+worker (analytics.jobs), not inside a request. data_fingerprint() summarises
+the order data a report is built from, so a finished report can be handed out
+again for as long as that data is unchanged.
+"""
+from django.db.models import Count, Max, Sum
+
+from books.models import Book
+from orders.models import SellerOrder
+from .models import SalesReport
+from .timeseries import time_series
+
+
+def data_fingerprint(seller, start_date, end_date):
+    """
+    One aggregate over the seller's parts of orders in the range. Any order
+    placed, cancelled or moved between statuses in the range changes it
+    (status changes bump the parts' updated_at).
+    """
+    summary = SellerOrder.objects.filter(
+        seller=seller,
+        created_at__date__range=[start_date, end_date]
+    ).aggregate(
+        orders=Count('id'),
+        quantity=Sum('item_count'),
+        revenue=Sum('subtotal'),
+        updated=Max('updated_at')
+    )
+    updated = summary['updated'].isoformat() if summary['updated'] else ''
+    return f"{summary['orders']}:{summary['quantity'] or 0}:{summary['revenue'] or 0}:{updated}"
+
+
+def generate_sales_report(seller, start_date, end_date, report_type, commit=True):
+    """Build a SalesReport for the seller's counted orders in the range, and save it unless commit=False"""
+    # The seller's counted parts of orders in the range, totalled in one query
+    orders = SellerOrder.objects.filter(
+        seller=seller,
+        created_at__date__range=[start_date, end_date],
+        status__in=['delivered', 'shipped', 'processing']
+    )
+    totals = orders.aggregate(
+        orders=Count('id'),
+        revenue=Sum('subtotal'),
+        books_sold=Sum('item_count')
+    )
+    total_orders = totals['orders']
+    total_revenue = totals['revenue'] or 0
+    total_books_sold = totals['books_sold'] or 0
+
+    average_order_value = total_revenue / total_orders if total_orders > 0 else 0
+
+    # Get top selling books
+    top_books = Book.objects.filter(
+        seller=seller,
+        orderitem__seller_order__in=orders
+    ).annotate(
+        sales=Count('orderitem'),
+        revenue=Sum('orderitem__total_price')
+    ).order_by('-sales')[:10]
+
+    top_books_data = []
+    for book in top_books:
+        top_books_data.append({
+            'id': book.id,
+            'title': book.title,
+            'sales': book.sales,
+            'revenue': float(book.revenue or 0)
+        })
+
+    # Get revenue by date, one grouped query for the whole range
+    revenue_by_date = [
+        {'date': day['date'].isoformat(), 'revenue': float(day['revenue'])}
+        for day in time_series(
+            orders, 'created_at', start_date, end_date,
+            revenue=Sum('subtotal')
+        )
+    ]
+
+    report = SalesReport(
+        seller=seller,
+        report_type=report_type,
+        start_date=start_date,
+        end_date=end_date,
+        total_revenue=total_revenue,
+        total_orders=total_orders,
+        total_books_sold=total_books_sold,
+        average_order_value=average_order_value,
+        top_selling_books=top_books_data,
+        revenue_by_date=revenue_by_date
+    )
+    if commit:
+        report.save()
+    return report
@@ -0,0 +1,159 @@
+"""
+Daily rollups behind the platform admin dashboard.
+
+PlatformDailyStats (revenue, orders, units, signups, new listings) and
+CategoryDailySales (order lines, units, revenue per category) hold one row
+per day. The dashboard sums a window of those rows instead of aggregating
+orders, users and books on every request.
+
+rollup_days() recomputes a range of days from the source tables with one
+grouped query per table. It runs:
+
+- nightly, via `manage.py rollup_platform_stats`, over the last few days,
+  so that late status changes (cancellations, refunds) are picked up;
+- for history, via `manage.py rollup_platform_stats --since` / `--all`;
+- every few minutes, via `manage.py rollup_platform_stats --interval`,
+  which runs refresh_recent() for today and yesterday when their rows are
+  missing or out of date.
+
+Dashboard reads never recompute anything: they serve the rows as last
+written. Rows are upserted on their unique keys, so overlapping runs (the
+nightly one and the interval one) overwrite each other instead of failing.
+
+Revenue and sales only count orders in COUNTED_STATUSES and are booked on the
+day each order was placed.
+"""
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from accounts.models import User
+from books.models import Book
+from orders.models import Order, OrderItem
+from .counters import COUNTED_STATUSES
+from .models import CategoryDailySales, PlatformDailyStats
+from .timeseries import periods
+
+# How old today's rollup may get before refresh_recent() recomputes it
+MAX_AGE = timedelta(minutes=5)
+PLATFORM_FIELDS = ['revenue', 'orders', 'units_sold', 'signups', 'books_listed', 'updated_at']
+CATEGORY_FIELDS = ['items', 'units_sold', 'revenue']
+
+
+def _per_day(queryset, date_field, start, end, *group_by, **aggregates):
+    return queryset.filter(**{
+        f'{date_field}__date__range': (start, end)
+    }).annotate(day=TruncDate(date_field)).values('day', *group_by).annotate(**aggregates).order_by()
+
+
+def rollup_days(start, end):
+    """Recompute the rollup rows for every day from `start` to `end` (inclusive)"""
+    counted = Q(status__in=COUNTED_STATUSES)
+    orders = {
+        row['day']: row for row in _per_day(
+            Order.objects.all(), 'created_at', start, end,
+            orders=Count('id'), revenue=Sum('total_amount', filter=counted)
+        )
+    }
+    signups = {
+        row['day']: row['signups']
+        for row in _per_day(User.objects.all(), 'date_joined', start, end, signups=Count('id'))
+    }
+    listed = {
+        row['day']: row['books']
+        for row in _per_day(Book.objects.filter(is_published=True), 'created_at', start, end, books=Count('id'))
+    }
+    categories = list(_per_day(
+        OrderItem.objects.filter(order__status__in=COUNTED_STATUSES), 'order__created_at', start, end,
+        'book__category_id',
+        items=Count('id'), units=Sum('quantity'), revenue=Sum('total_price')
+    ))
+    units = {}
+    for row in categories:
+        units[row['day']] = units.get(row['day'], 0) + row['units']
+
+    days = []
+    for day in periods(start, end):
+        day_orders = orders.get(day, {})
+        days.append(PlatformDailyStats(
+            date=day,
+            revenue=day_orders.get('revenue') or Decimal('0'),
+            orders=day_orders.get('orders', 0),
+            units_sold=units.get(day, 0),
+            signups=signups.get(day, 0),
+            books_listed=listed.get(day, 0)
+        ))
+
+    with transaction.atomic():
+        # Every day gets a row; categories without sales any more lose theirs
+        PlatformDailyStats.objects.bulk_create(
+            days, batch_size=500,
+            update_conflicts=True, unique_fields=['date'], update_fields=PLATFORM_FIELDS
+        )
+        CategoryDailySales.objects.filter(date__range=(start, end)).delete()
+        CategoryDailySales.objects.bulk_create([
+            CategoryDailySales(
+                date=row['day'],
+                category_id=row['book__category_id'],
+                items=row['items'],
+                units_sold=row['units'],
+                revenue=row['revenue']
+            )
+            for row in categories
+        ], batch_size=500, update_conflicts=True, unique_fields=['category', 'date'], update_fields=CATEGORY_FIELDS)
+    return len(days)
+
+
+def refresh_recent():
+    """
+    Recompute today's and yesterday's rollups if they are missing or stale:
+    today's after MAX_AGE, yesterday's if last written before it ended.
+    """
+    now = timezone.now()
+    today = timezone.localdate(now)
+    yesterday = today - timedelta(days=1)
+    end_of_yesterday = timezone.make_aware(datetime.combine(today, time.min))
+
+    written = dict(
+        PlatformDailyStats.objects.filter(date__in=(yesterday, today)).values_list('date', 'updated_at')
+    )
+    stale = [
+        day for day, fresh_after in ((yesterday, end_of_yesterday), (today, now - MAX_AGE))
+        if day not in written or written[day] < fresh_after
+    ]
+    if stale:
+        return rollup_days(min(stale), max(stale))
+    return 0
+
+
+def window_totals(start, end, previous_start):
+    """
+    Platform totals for start..end and for the preceding window
+    previous_start..start-1, from the daily rollups in one query.
+    """
+    current = Q(date__range=(start, end))
+    previous = Q(date__range=(previous_start, start - timedelta(days=1)))
+    fields = ('revenue', 'orders', 'units_sold', 'signups', 'books_listed')
+    aggregates = {f'current_{field}': Sum(field, filter=current) for field in fields}
+    aggregates.update({f'previous_{field}': Sum(field, filter=previous) for field in ('revenue', 'orders', 'signups')})
+    totals = PlatformDailyStats.objects.filter(date__range=(previous_start, end)).aggregate(**aggregates)
+    return {key.removeprefix('current_'): value or 0 for key, value in totals.items()}
+
+
+def top_categories(start, end, limit=5):
+    return list(
+        CategoryDailySales.objects.filter(date__range=(start, end))
+        .values('category__name')
+        .annotate(sales=Sum('items'), revenue=Sum('revenue'))
+        .order_by('-revenue', 'category__name')[:limit]
+    )
+
+
+def daily_revenue(start, end):
+    """[{'date', 'revenue'}] for every day from start to end, from the rollups"""
+    revenue = dict(PlatformDailyStats.objects.filter(date__range=(start, end)).values_list('date', 'revenue'))
+    return [{'date': day, 'revenue': revenue.get(day, Decimal('0'))} for day in periods(start, end)]
@@ -1,10 +1,10 @@
 from rest_framework import serializers
-from django.db.models import Sum, Count, Avg
+from django.db.models import Sum, Count, Avg, Q
 from django.utils import timezone
 from datetime import timedelta
 from books.models import Book
-from orders.models import Order, OrderItem
-from .models import SellerAnalytics, DailySales, BookPerformance, InventoryAlert, SalesReport
+from orders.models import Order, OrderItem, SellerOrder
+from .models import SellerAnalytics, DailySales, BookPerformance, InventoryAlert, InventoryAlertSettings, ReportJob, SalesReport, conversion_rate
 
 class TopSellingBookSerializer(serializers.Serializer):
     id = serializers.IntegerField()
@@ -38,16 +38,21 @@ class SellerAnalyticsSerializer(serializers.ModelSerializer):
         return self._calculate_growth(obj, 'orders')
     
     def get_top_selling_books(self, obj):
-        # Get top 5 selling books for this seller
-        top_books = Book.objects.filter(
-            seller=obj.seller,
-            orderitem__isnull=False
-        ).annotate(
-            sales=Count('orderitem'),
-            revenue=Sum('orderitem__total_price')
-        ).order_by('-sales')[:5]
+        # Top 5 by units sold, from the running per-book totals
+        top_books = BookPerformance.objects.filter(
+            book__seller_id=obj.seller_id,
+            purchases__gt=0
+        ).select_related('book').order_by('-purchases', '-revenue')[:5]
         
-        return TopSellingBookSerializer(top_books, many=True).data
+        return TopSellingBookSerializer([
+            {
+                'id': performance.book_id,
+                'title': performance.book.title,
+                'sales': performance.purchases,
+                'revenue': performance.revenue
+            }
+            for performance in top_books
+        ], many=True).data
     
     def get_revenue_by_period(self, obj):
         # Get revenue for last 7 days
@@ -55,7 +60,7 @@ class SellerAnalyticsSerializer(serializers.ModelSerializer):
         start_date = end_date - timedelta(days=6)
         
         daily_sales = DailySales.objects.filter(
-            seller=obj.seller,
+            seller_id=obj.seller_id,
             date__range=[start_date, end_date]
         ).order_by('date')
         
@@ -66,32 +71,31 @@ class SellerAnalyticsSerializer(serializers.ModelSerializer):
         # This would typically come from your commission settings
         return 12.50
     
+    def _period_totals(self, obj):
+        # Last 30 days against the 30 before, both metrics in one query
+        if not hasattr(self, '_totals'):
+            end_date = timezone.now().date()
+            start_date_current = end_date - timedelta(days=30)
+            start_date_previous = start_date_current - timedelta(days=30)
+            current = Q(date__range=[start_date_current, end_date])
+            previous = Q(date__range=[start_date_previous, start_date_current - timedelta(days=1)])
+            
+            self._totals = DailySales.objects.filter(
+                seller_id=obj.seller_id,
+                date__range=[start_date_previous, end_date]
+            ).aggregate(
+                current_revenue=Sum('revenue', filter=current),
+                previous_revenue=Sum('revenue', filter=previous),
+                current_orders=Sum('orders', filter=current),
+                previous_orders=Sum('orders', filter=previous)
+            )
+        return self._totals
+    
     def _calculate_growth(self, obj, metric):
         # Calculate growth compared to previous period
-        end_date = timezone.now().date()
-        start_date_current = end_date - timedelta(days=30)
-        start_date_previous = start_date_current - timedelta(days=30)
-        
-        if metric == 'revenue':
-            current_period = DailySales.objects.filter(
-                seller=obj.seller,
-                date__range=[start_date_current, end_date]
-            ).aggregate(total=Sum('revenue'))['total'] or 0
-            
-            previous_period = DailySales.objects.filter(
-                seller=obj.seller,
-                date__range=[start_date_previous, start_date_current - timedelta(days=1)]
-            ).aggregate(total=Sum('revenue'))['total'] or 0
-        else:  # orders
-            current_period = DailySales.objects.filter(
-                seller=obj.seller,
-                date__range=[start_date_current, end_date]
-            ).aggregate(total=Sum('orders'))['total'] or 0
-            
-            previous_period = DailySales.objects.filter(
-                seller=obj.seller,
-                date__range=[start_date_previous, start_date_current - timedelta(days=1)]
-            ).aggregate(total=Sum('orders'))['total'] or 0
+        totals = self._period_totals(obj)
+        current_period = totals[f'current_{metric}'] or 0
+        previous_period = totals[f'previous_{metric}'] or 0
         
         if previous_period > 0:
             growth = ((current_period - previous_period) / previous_period) * 100
@@ -105,6 +109,7 @@ class BookPerformanceSerializer(serializers.ModelSerializer):
     book_title = serializers.CharField(source='book.title', read_only=True)
     book_author = serializers.CharField(source='book.author', read_only=True)
     book_price = serializers.DecimalField(source='book.price', read_only=True, max_digits=8, decimal_places=2)
+    conversion_rate = serializers.SerializerMethodField()
     
     class Meta:
         model = BookPerformance
@@ -113,6 +118,10 @@ class BookPerformanceSerializer(serializers.ModelSerializer):
             'views', 'add_to_cart_count', 'purchases', 'revenue',
             'conversion_rate', 'last_updated'
         )
+    
+    def get_conversion_rate(self, obj):
+        # Purchases per 100 views, from the live counters
+        return conversion_rate(obj.purchases, obj.views)
 
 class InventoryAlertSerializer(serializers.ModelSerializer):
     book_title = serializers.CharField(source='book.title', read_only=True)
@@ -126,6 +135,21 @@ class InventoryAlertSerializer(serializers.ModelSerializer):
             'is_resolved', 'created_at', 'resolved_at'
         )
 
+class InventoryAlertSettingsSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = InventoryAlertSettings
+        fields = ('low_stock_threshold', 'high_priority_threshold', 'updated_at')
+        read_only_fields = ('updated_at',)
+    
+    def validate(self, data):
+        low = data.get('low_stock_threshold', getattr(self.instance, 'low_stock_threshold', None))
+        high = data.get('high_priority_threshold', getattr(self.instance, 'high_priority_threshold', None))
+        if low is not None and high is not None and high > low:
+            raise serializers.ValidationError({
+                'high_priority_threshold': 'High priority threshold cannot exceed the low stock threshold'
+            })
+        return data
+
 class SalesReportSerializer(serializers.ModelSerializer):
     class Meta:
         model = SalesReport
@@ -136,6 +160,16 @@ class SalesReportSerializer(serializers.ModelSerializer):
             'created_at'
         )
 
+class ReportJobSerializer(serializers.ModelSerializer):
+    report = SalesReportSerializer(read_only=True)
+    
+    class Meta:
+        model = ReportJob
+        fields = (
+            'id', 'report_type', 'start_date', 'end_date', 'status',
+            'error', 'report', 'created_at', 'started_at', 'finished_at'
+        )
+
 class CreateSalesReportSerializer(serializers.Serializer):
     report_type = serializers.ChoiceField(choices=SalesReport.REPORT_TYPES)
     start_date = serializers.DateField()
@@ -163,21 +197,21 @@ class SellerDashboardSerializer(serializers.Serializer):
     top_performing_books = serializers.SerializerMethodField()
     
     def get_recent_orders(self, obj):
-        from orders.serializers import OrderSerializer
-        recent_orders = Order.objects.filter(
-            items__book__seller=obj
-        ).distinct().order_by('-created_at')[:5]
-        return OrderSerializer(recent_orders, many=True).data
+        from orders.serializers import SellerOrderSerializer
+        recent_orders = SellerOrderSerializer.setup_eager_loading(SellerOrder.objects.filter(
+            seller_id=obj['overview'].seller_id
+        )).order_by('-created_at', '-id')[:5]
+        return SellerOrderSerializer(recent_orders, many=True).data
     
     def get_inventory_alerts(self, obj):
         alerts = InventoryAlert.objects.filter(
-            seller=obj,
+            seller_id=obj['overview'].seller_id,
             is_resolved=False
-        ).order_by('-priority', '-created_at')[:10]
+        ).select_related('book').order_by('-priority', '-created_at')[:10]
         return InventoryAlertSerializer(alerts, many=True).data
     
     def get_top_performing_books(self, obj):
         top_books = BookPerformance.objects.filter(
-            book__seller=obj
-        ).order_by('-revenue')[:5]
+            book__seller_id=obj['overview'].seller_id
+        ).select_related('book').order_by('-revenue')[:5]
         return BookPerformanceSerializer(top_books, many=True).data
\ No newline at end of file
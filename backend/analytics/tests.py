@@ -1,3 +1,665 @@
-from django.test import TestCase
+from datetime import date, timedelta
+from unittest import mock
+from decimal import Decimal
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import IntegrityError, OperationalError, connection
+from django.db.models import Sum
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from accounts.models import User
+from bnc_books import metrics
+from bnc_books.testing import QueryScalingAssertionsMixin
+from books.models import Book, Category
+from books.tests import make_book, make_seller
+from orders.models import Order, OrderItem, ShippingMethod
+from .inventory import sync_inventory_alerts, sync_seller_alerts
+from .jobs import claim_next_job, request_report, run_pending
+from . import counters, events, rollups
+from .models import BookPerformance, CategoryDailySales, InventoryAlert, InventoryAlertSettings, PlatformDailyStats, DailySales, ReportJob, SalesReport, SellerAnalytics
+from .timeseries import time_series
 
-# Create your tests here.
+def make_order(buyer, shipping_method, items, status='pending', created_at=None):
+    """Create an order with `items` as (book, quantity) pairs"""
+    order = Order.objects.create(
+        user=buyer,
+        shipping_address={},
+        billing_address={},
+        shipping_method=shipping_method,
+        payment_method='credit_card',
+        subtotal=0,
+        shipping_cost=0,
+        tax_amount=0,
+        total_amount=0,
+        status=status
+    )
+    if created_at:
+        Order.objects.filter(pk=order.pk).update(created_at=created_at)
+        order.refresh_from_db()
+    for book, quantity in items:
+        OrderItem.objects.create(
+            order=order, book=book, quantity=quantity,
+            unit_price=book.price, total_price=book.price * quantity
+        )
+    return order
+
+class SellerAnalyticsCounterTests(QueryScalingAssertionsMixin, TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.seller = make_seller()
+        self.other_seller = make_seller('other@example.com', 'Other Store')
+        self.client.force_authenticate(self.seller)
+        self.buyer = User.objects.create_user(
+            username='buyer@example.com', email='buyer@example.com', role='buyer'
+        )
+        self.category = Category.objects.create(name='Fiction')
+        self.shipping_method = ShippingMethod.objects.create(
+            name='Standard', price=Decimal('5.00'), delivery_days='3-5'
+        )
+        self.book = make_book(self.seller, self.category, 1, price=Decimal('12.50'))
+        self.other_book = make_book(self.other_seller, self.category, 2)
+
+    def set_status(self, order, status):
+        order.status = status
+        order.save()
+
+    def analytics(self, seller=None):
+        return SellerAnalytics.objects.get(seller=seller or self.seller)
+
+    def test_totals_follow_the_order_lifecycle(self):
+        order = make_order(self.buyer, self.shipping_method, [(self.book, 2), (self.other_book, 1)])
+        self.assertEqual(self.analytics().total_orders, 0)
+
+        self.set_status(order, 'processing')
+        analytics = self.analytics()
+        self.assertEqual(
+            (analytics.total_orders, analytics.total_books_sold, analytics.total_revenue),
+            (1, 2, Decimal('25.00'))
+        )
+        self.assertEqual(self.analytics(self.other_seller).total_orders, 1)
+        self.assertEqual(BookPerformance.objects.get(book=self.book).purchases, 2)
+
+        # Moving between counted statuses changes nothing
+        self.set_status(order, 'shipped')
+        self.assertEqual(self.analytics().total_books_sold, 2)
+
+        self.set_status(order, 'refunded')
+        analytics = self.analytics()
+        self.assertEqual(
+            (analytics.total_orders, analytics.total_books_sold, analytics.total_revenue),
+            (0, 0, Decimal('0.00'))
+        )
+        self.assertEqual(BookPerformance.objects.get(book=self.book).purchases, 0)
+
+    def test_daily_sales_are_booked_on_the_order_date(self):
+        placed = timezone.now() - timedelta(days=3)
+        order = make_order(self.buyer, self.shipping_method, [(self.book, 3)], created_at=placed)
+        self.set_status(order, 'processing')
+
+        day = DailySales.objects.get(seller=self.seller)
+        self.assertEqual(day.date, timezone.localtime(placed).date())
+        self.assertEqual((day.orders, day.books_sold, day.revenue), (1, 3, Decimal('37.50')))
+
+    def test_listed_books_are_counted(self):
+        self.assertEqual(self.analytics().total_books, 1)
+        make_book(self.seller, self.category, 3)
+        self.assertEqual(self.analytics().total_books, 2)
+        self.book.delete()
+        self.assertEqual(self.analytics().total_books, 1)
+
+    def test_rebuild_matches_incremental_totals(self):
+        for quantity in (1, 2, 3):
+            order = make_order(self.buyer, self.shipping_method, [(self.book, quantity), (self.other_book, 1)])
+            self.set_status(order, 'delivered')
+        make_order(self.buyer, self.shipping_method, [(self.book, 5)])
+
+        expected = {
+            row['seller_id']: row for row in SellerAnalytics.objects.values(
+                'seller_id', 'total_orders', 'total_books_sold', 'total_revenue', 'total_books'
+            )
+        }
+        expected_days = sorted(DailySales.objects.values_list('seller_id', 'date', 'orders', 'books_sold', 'revenue'))
+        SellerAnalytics.objects.update(total_orders=0, total_books_sold=0, total_revenue=0, total_books=0)
+        DailySales.objects.all().delete()
+
+        call_command('rebuild_seller_analytics', stdout=open('/dev/null', 'w'))
+
+        self.assertEqual({
+            row['seller_id']: row for row in SellerAnalytics.objects.values(
+                'seller_id', 'total_orders', 'total_books_sold', 'total_revenue', 'total_books'
+            )
+        }, expected)
+        self.assertEqual(
+            sorted(DailySales.objects.values_list('seller_id', 'date', 'orders', 'books_sold', 'revenue')),
+            expected_days
+        )
+
+    def test_rebuild_in_chunks_creates_and_updates_rows(self):
+        order = make_order(self.buyer, self.shipping_method, [(self.book, 2), (self.other_book, 1)])
+        self.set_status(order, 'delivered')
+        fields = ('seller_id', 'total_orders', 'total_books_sold', 'total_revenue', 'total_books')
+        expected = sorted(SellerAnalytics.objects.values_list(*fields))
+        expected_purchases = sorted(BookPerformance.objects.values_list('book_id', 'purchases'))
+        SellerAnalytics.objects.filter(seller=self.other_seller).delete()
+        SellerAnalytics.objects.update(total_orders=0, total_books_sold=0, total_revenue=0)
+        BookPerformance.objects.update(purchases=0)
+
+        with mock.patch.object(counters, 'ID_CHUNK_SIZE', 1):
+            counters.rebuild()
+
+        self.assertEqual(sorted(SellerAnalytics.objects.values_list(*fields)), expected)
+        self.assertEqual(sorted(BookPerformance.objects.values_list('book_id', 'purchases')), expected_purchases)
+
+    def test_dashboard_queries_do_not_scale_with_order_history(self):
+        def grow(size):
+            while Order.objects.count() < size:
+                order = make_order(self.buyer, self.shipping_method, [(self.book, 1)])
+                self.set_status(order, 'delivered')
+
+        self.assertQueriesDoNotScale(lambda: self.client.get('/api/analytics/seller/dashboard/'), grow)
+        self.assertQueriesDoNotScale(lambda: self.client.get('/api/analytics/seller/analytics/'), grow)
+
+class TimeSeriesTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.seller = make_seller()
+        self.client.force_authenticate(self.seller)
+        self.buyer = User.objects.create_user(
+            username='buyer@example.com', email='buyer@example.com', role='buyer'
+        )
+        self.category = Category.objects.create(name='Fiction')
+        self.shipping_method = ShippingMethod.objects.create(
+            name='Standard', price=Decimal('5.00'), delivery_days='3-5'
+        )
+        self.book = make_book(self.seller, self.category, 1, price=Decimal('10.00'))
+    
+    def order_on(self, day, quantity=1, status='delivered'):
+        placed = timezone.make_aware(timezone.datetime(day.year, day.month, day.day, 12))
+        return make_order(self.buyer, self.shipping_method, [(self.book, quantity)], status=status, created_at=placed)
+    
+    def test_periods_are_grouped_and_gaps_filled(self):
+        self.order_on(date(2024, 1, 2), 1)
+        self.order_on(date(2024, 1, 2), 2)
+        self.order_on(date(2024, 1, 9), 4)
+        self.order_on(date(2024, 2, 29), 8)
+        self.order_on(date(2024, 1, 3), 16, status='pending')
+        items = OrderItem.objects.filter(order__status='delivered')
+        
+        with self.assertNumQueries(1):
+            days = time_series(items, 'order__created_at', date(2024, 1, 1), date(2024, 1, 4), sold=Sum('quantity'))
+        self.assertEqual(days, [
+            {'date': date(2024, 1, 1), 'sold': 0},
+            {'date': date(2024, 1, 2), 'sold': 3},
+            {'date': date(2024, 1, 3), 'sold': 0},
+            {'date': date(2024, 1, 4), 'sold': 0},
+        ])
+        
+        weeks = time_series(items, 'order__created_at', date(2024, 1, 1), date(2024, 1, 15), 'week', sold=Sum('quantity'))
+        self.assertEqual([(week['date'], week['sold']) for week in weeks], [
+            (date(2024, 1, 1), 3), (date(2024, 1, 8), 4), (date(2024, 1, 15), 0)
+        ])
+        
+        months = time_series(items, 'order__created_at', date(2023, 12, 1), date(2024, 3, 31), 'month', sold=Sum('quantity'))
+        self.assertEqual([(month['date'], month['sold']) for month in months], [
+            (date(2023, 12, 1), 0), (date(2024, 1, 1), 7), (date(2024, 2, 1), 8), (date(2024, 3, 1), 0)
+        ])
+    
+    def test_yearly_report_uses_one_query_for_the_series(self):
+        self.order_on(date(2024, 3, 1), 2)
+        self.order_on(date(2024, 12, 31), 1)
+        job, created = request_report(self.seller, 'custom', date(2024, 1, 1), date(2024, 12, 31))
+        
+        with CaptureQueriesContext(connection) as context:
+            run_pending()
+        
+        self.assertLess(len(context.captured_queries), 20)
+        job.refresh_from_db()
+        revenue = {day['date']: day['revenue'] for day in job.report.revenue_by_date}
+        self.assertEqual(len(revenue), 366)
+        self.assertEqual((revenue['2024-03-01'], revenue['2024-12-31'], revenue['2024-06-01']), (20.0, 10.0, 0.0))
+
+class ReportJobTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.seller = make_seller()
+        self.client.force_authenticate(self.seller)
+        self.buyer = User.objects.create_user(
+            username='buyer@example.com', email='buyer@example.com', role='buyer'
+        )
+        self.category = Category.objects.create(name='Fiction')
+        self.shipping_method = ShippingMethod.objects.create(
+            name='Standard', price=Decimal('5.00'), delivery_days='3-5'
+        )
+        self.book = make_book(self.seller, self.category, 1, price=Decimal('10.00'))
+        self.order = make_order(self.buyer, self.shipping_method, [(self.book, 2)], status='delivered')
+        today = timezone.localdate()
+        self.request = {
+            'report_type': 'weekly',
+            'start_date': (today - timedelta(days=6)).isoformat(),
+            'end_date': today.isoformat(),
+        }
+    
+    def generate(self):
+        return self.client.post('/api/analytics/seller/reports/generate/', self.request, format='json')
+    
+    def test_report_is_built_by_the_worker_and_polled(self):
+        response = self.generate()
+        self.assertEqual(response.status_code, 202, response.data)
+        self.assertEqual((response.data['status'], response.data['report']), ('queued', None))
+        self.assertEqual(SalesReport.objects.count(), 0)
+        
+        call_command('run_report_worker', once=True, stdout=open('/dev/null', 'w'))
+        
+        response = self.client.get(f"/api/analytics/seller/reports/jobs/{response.data['id']}/")
+        self.assertEqual(response.data['status'], 'completed')
+        self.assertEqual(response.data['report']['total_books_sold'], 2)
+        
+        report = self.client.get(f"/api/analytics/seller/reports/{response.data['report']['id']}/")
+        self.assertEqual(report.status_code, 200)
+        self.assertEqual(report.data['total_orders'], 1)
+    
+    def test_identical_requests_share_a_job(self):
+        first = self.generate()
+        second = self.generate()
+        self.assertEqual(first.data['id'], second.data['id'])
+        self.assertEqual(ReportJob.objects.count(), 1)
+        
+        self.request['report_type'] = 'custom'
+        self.assertNotEqual(self.generate().data['id'], first.data['id'])
+    
+    def test_racing_requests_get_the_active_job(self):
+        failed = self.generate()
+        ReportJob.objects.filter(pk=failed.data['id']).update(
+            status='failed', created_at=timezone.now() + timedelta(days=1)
+        )
+        queued = []
+        create = ReportJob.objects.create
+        
+        def create_first(**kwargs):
+            # Another request queues the job between our lookup and our insert
+            queued.append(create(**kwargs))
+            raise IntegrityError
+        
+        today = timezone.localdate()
+        with mock.patch.object(ReportJob.objects, 'create', side_effect=create_first), \
+                mock.patch('analytics.jobs.transaction'):
+            job, created = request_report(self.seller, 'weekly', today - timedelta(days=6), today)
+        self.assertEqual((job, created), (queued[0], False))
+    
+    def test_completed_report_is_reused_until_the_data_changes(self):
+        first = self.generate()
+        run_pending()
+        
+        reused = self.generate()
+        self.assertEqual(reused.status_code, 200)
+        self.assertEqual(reused.data['id'], first.data['id'])
+        self.assertEqual(SalesReport.objects.count(), 1)
+        
+        self.order.status = 'refunded'
+        self.order.save()
+        stale = self.generate()
+        self.assertEqual(stale.status_code, 202)
+        self.assertNotEqual(stale.data['id'], first.data['id'])
+        run_pending()
+        self.assertEqual(ReportJob.objects.get(pk=stale.data['id']).report.total_orders, 0)
+    
+    def test_a_job_is_claimed_once(self):
+        self.generate()
+        job = claim_next_job()
+        self.assertEqual(job.status, 'running')
+        self.assertIsNone(claim_next_job())
+        
+        # Until its worker is presumed dead
+        ReportJob.objects.filter(pk=job.pk).update(started_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(claim_next_job().pk, job.pk)
+    
+    def test_failing_jobs_are_retried_with_backoff_then_failed(self):
+        response = self.generate()
+        jobs = ReportJob.objects.filter(pk=response.data['id'])
+        delays = []
+        with mock.patch('analytics.jobs.generate_sales_report', side_effect=RuntimeError('boom')):
+            for attempt in range(3):
+                self.assertEqual(run_pending(), 1)
+                job = jobs.get()
+                if job.status == 'queued':
+                    delays.append(job.run_after - job.started_at)
+                    # Not retried before its time
+                    self.assertEqual(run_pending(), 0)
+                    jobs.update(run_after=timezone.now())
+        
+        self.assertEqual(len(delays), 2)
+        self.assertGreater(delays[1], delays[0] * 1.5)
+        job = jobs.get()
+        self.assertEqual((job.status, job.attempts, job.error), ('failed', 3, 'boom'))
+        self.assertEqual(SalesReport.objects.count(), 0)
+        # A failed job doesn't block a new request
+        self.assertEqual(self.generate().status_code, 202)
+    
+    def test_jobs_are_private_to_their_seller(self):
+        job_id = self.generate().data['id']
+        self.client.force_authenticate(make_seller('other@example.com', 'Other Store'))
+        self.assertEqual(self.client.get(f'/api/analytics/seller/reports/jobs/{job_id}/').status_code, 404)
+
+class PlatformRollupTests(QueryScalingAssertionsMixin, TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.admin = User.objects.create_user(
+            username='admin@example.com', email='admin@example.com', role='buyer', is_staff=True
+        )
+        self.client.force_authenticate(self.admin)
+        self.seller = make_seller()
+        self.buyer = User.objects.create_user(
+            username='buyer@example.com', email='buyer@example.com', role='buyer'
+        )
+        self.fiction = Category.objects.create(name='Fiction')
+        self.poetry = Category.objects.create(name='Poetry')
+        self.shipping_method = ShippingMethod.objects.create(
+            name='Standard', price=Decimal('5.00'), delivery_days='3-5'
+        )
+        self.novel = make_book(self.seller, self.fiction, 1, price=Decimal('10.00'))
+        self.poems = make_book(self.seller, self.poetry, 2, price=Decimal('30.00'))
+        self.today = timezone.localdate()
+    
+    def order(self, days_ago, items, status='delivered', total=None):
+        order = make_order(
+            self.buyer, self.shipping_method, items, status=status,
+            created_at=timezone.now() - timedelta(days=days_ago)
+        )
+        Order.objects.filter(pk=order.pk).update(
+            total_amount=total if total is not None else sum(book.price * quantity for book, quantity in items)
+        )
+        return order
+    
+    def platform(self, period='7d'):
+        response = self.client.get(f'/api/analytics/platform/?period={period}')
+        self.assertEqual(response.status_code, 200, getattr(response, 'data', response))
+        return response.data
+    
+    def test_dashboard_reads_windows_from_the_rollups(self):
+        self.order(1, [(self.novel, 2)])
+        self.order(2, [(self.poems, 1), (self.novel, 1)])
+        self.order(3, [(self.novel, 5)], status='cancelled')
+        self.order(10, [(self.poems, 2)])
+        call_command('rollup_platform_stats', all=True, stdout=open('/dev/null', 'w'))
+        
+        data = self.platform()
+        self.assertEqual(data['total_revenue'], 60.0)
+        self.assertEqual(data['total_orders'], 3)
+        self.assertEqual(data['order_growth'], 200.0)
+        self.assertEqual(data['revenue_growth'], 0.0)
+        self.assertEqual(data['active_sellers'], 1)
+        self.assertEqual(data['top_selling_categories'], [
+            {'category': 'Fiction', 'sales': 2, 'revenue': 30.0},
+            {'category': 'Poetry', 'sales': 1, 'revenue': 30.0},
+        ])
+        revenue = {day['date']: day['revenue'] for day in data['revenue_by_period']}
+        self.assertEqual(len(revenue), 7)
+        self.assertEqual(revenue[(self.today - timedelta(days=1)).isoformat()], 20.0)
+        self.assertEqual(revenue[(self.today - timedelta(days=3)).isoformat()], 0.0)
+        
+        day = PlatformDailyStats.objects.get(date=self.today - timedelta(days=2))
+        self.assertEqual((day.orders, day.units_sold, day.revenue), (1, 2, Decimal('40.00')))
+    
+    def test_stale_recent_days_are_recomputed_by_refresh_recent(self):
+        self.assertEqual(rollups.refresh_recent(), 2)
+        self.order(0, [(self.novel, 1)])
+        # Within MAX_AGE the rollup is kept as is
+        self.assertEqual(rollups.refresh_recent(), 0)
+        self.assertEqual(self.platform()['total_orders'], 0)
+        
+        PlatformDailyStats.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(rollups.refresh_recent(), 1)
+        self.assertEqual(self.platform()['total_orders'], 1)
+    
+    def test_dashboard_does_not_write_rollups(self):
+        self.order(0, [(self.novel, 1)])
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(self.platform()['total_orders'], 0)
+        self.assertFalse(PlatformDailyStats.objects.exists())
+        self.assertFalse([query for query in context.captured_queries if not query['sql'].startswith('SELECT')])
+    
+    def test_rollup_overwrites_rows_written_meanwhile(self):
+        rollups.rollup_days(self.today, self.today)
+        written = PlatformDailyStats.objects.get(date=self.today)
+        self.order(0, [(self.poems, 1)])
+        # Rows another run inserted are updated in place, not a unique violation
+        rollups.rollup_days(self.today - timedelta(days=1), self.today)
+        
+        day = PlatformDailyStats.objects.get(date=self.today)
+        self.assertEqual((day.pk, day.orders, day.revenue), (written.pk, 1, Decimal('30.00')))
+        self.assertEqual(CategoryDailySales.objects.get(date=self.today).category, self.poetry)
+    
+    def test_dashboard_queries_do_not_scale(self):
+        def grow(size):
+            while Order.objects.count() < size:
+                self.order(Order.objects.count() % 60, [(self.novel, 1), (self.poems, 1)])
+            rollups.rollup_days(self.today - timedelta(days=180), self.today)
+        
+        for period in ('7d', '90d'):
+            self.assertQueriesDoNotScale(lambda: self.client.get(f'/api/analytics/platform/?period={period}'), grow)
+
+class EventCounterTests(TestCase):
+    def setUp(self):
+        events.buffer.drain()
+        self.client = APIClient()
+        self.seller = make_seller()
+        self.buyer = User.objects.create_user(
+            username='buyer@example.com', email='buyer@example.com', role='buyer'
+        )
+        self.category = Category.objects.create(name='Fiction')
+        self.books = [make_book(self.seller, self.category, index) for index in range(3)]
+    
+    def tearDown(self):
+        events.buffer.drain()
+    
+    def test_page_views_do_not_write(self):
+        book = self.books[0]
+        with CaptureQueriesContext(connection) as context:
+            for _ in range(3):
+                # Cache miss, then hits
+                self.assertEqual(self.client.get(f'/api/books/{book.pk}/').status_code, 200)
+        
+        writes = [query['sql'] for query in context.captured_queries if not query['sql'].startswith('SELECT')]
+        self.assertEqual(writes, [])
+        self.assertEqual(events.buffer.drain(), {(book.pk, timezone.localdate()): {'views': 3, 'add_to_cart_count': 0}})
+    
+    def test_flush_writes_aggregated_deltas_in_batches(self):
+        BookPerformance.objects.create(book=self.books[0], views=10, purchases=2)
+        for book in self.books:
+            for _ in range(5):
+                events.record('views', book.pk)
+        events.record('add_to_cart_count', self.books[1].pk)
+        
+        # Book lookup, then insert-missing + update per table, in a savepoint
+        with self.assertNumQueries(9):
+            self.assertEqual(events.flush(), 16)
+        
+        performance = {row.book_id: row for row in BookPerformance.objects.all()}
+        self.assertEqual(performance[self.books[0].pk].views, 15)
+        self.assertEqual((performance[self.books[1].pk].views, performance[self.books[1].pk].add_to_cart_count), (5, 1))
+        self.assertEqual(DailySales.objects.get(seller=self.seller, date=timezone.localdate()).views, 15)
+        self.assertEqual(SellerAnalytics.objects.get(seller=self.seller).total_views, 15)
+        self.assertEqual(events.flush(), 0)
+    
+    @override_settings(COUNTER_FLUSH_SIZE=2)
+    def test_buffer_flushes_itself_when_full(self):
+        events.record('views', self.books[0].pk)
+        self.assertFalse(BookPerformance.objects.filter(views__gt=0).exists())
+        events.record('views', self.books[1].pk)
+        self.assertEqual(BookPerformance.objects.filter(views=1).count(), 2)
+    
+    @override_settings(COUNTER_FLUSH_SIZE=1)
+    def test_failed_flush_keeps_the_counts_and_the_page_view(self):
+        book = self.books[0]
+        locked = OperationalError('database is locked')
+        with mock.patch.object(BookPerformance.objects, 'bulk_create', side_effect=locked), \
+                self.assertLogs('bnc_books.batching', 'ERROR'):
+            self.assertEqual(self.client.get(f'/api/books/{book.pk}/').status_code, 200)
+        
+        self.assertEqual(events.flush(), 1)
+        self.assertEqual(BookPerformance.objects.get(book=book).views, 1)
+    
+    def test_add_to_cart_is_counted(self):
+        self.client.force_authenticate(self.buyer)
+        response = self.client.post('/api/orders/cart/items/', {'book': self.books[2].pk, 'quantity': 1}, format='json')
+        self.assertEqual(response.status_code, 201)
+        events.flush()
+        self.assertEqual(BookPerformance.objects.get(book=self.books[2]).add_to_cart_count, 1)
+        self.assertEqual(SellerAnalytics.objects.get(seller=self.seller).total_views, 0)
+
+class InventoryAlertEngineTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.seller = make_seller()
+        self.client.force_authenticate(self.seller)
+        self.category = Category.objects.create(name='Fiction')
+        self.next_index = 0
+    
+    def book(self, stock, seller=None):
+        self.next_index += 1
+        return make_book(seller or self.seller, self.category, self.next_index, stock_quantity=stock)
+    
+    def open_alerts(self, book):
+        return list(InventoryAlert.objects.filter(book=book, is_resolved=False).values_list(
+            'alert_type', 'priority', 'current_stock'
+        ))
+    
+    def set_stock(self, book, stock):
+        Book.objects.filter(pk=book.pk).update(stock_quantity=stock)
+        sync_inventory_alerts([book.pk])
+    
+    def test_alerts_follow_stock_changes(self):
+        book = self.book(50)
+        self.assertEqual(self.open_alerts(book), [])
+        
+        self.set_stock(book, 8)
+        self.assertEqual(self.open_alerts(book), [('low_stock', 'medium', 8)])
+        self.set_stock(book, 2)
+        self.assertEqual(self.open_alerts(book), [('low_stock', 'high', 2)])
+        self.set_stock(book, 0)
+        self.assertEqual(self.open_alerts(book), [('out_of_stock', 'high', 0)])
+        self.set_stock(book, 40)
+        self.assertEqual(self.open_alerts(book), [])
+        self.assertEqual(InventoryAlert.objects.filter(book=book).count(), 2)
+    
+    def test_thresholds_are_per_seller(self):
+        InventoryAlertSettings.objects.create(seller=self.seller, low_stock_threshold=25, high_priority_threshold=5)
+        other = make_seller('other@example.com', 'Other Store')
+        mine, theirs = self.book(20), self.book(20, seller=other)
+        self.assertEqual(self.open_alerts(mine), [('low_stock', 'medium', 20)])
+        self.assertEqual(self.open_alerts(theirs), [])
+    
+    def test_changing_thresholds_reevaluates_the_catalog(self):
+        book = self.book(15)
+        response = self.client.put('/api/analytics/seller/alerts/settings/', {'low_stock_threshold': 20}, format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(self.open_alerts(book), [('low_stock', 'medium', 15)])
+        
+        response = self.client.put('/api/analytics/seller/alerts/settings/', {'high_priority_threshold': 30}, format='json')
+        self.assertEqual(response.status_code, 400)
+    
+    def test_evaluation_runs_in_constant_queries(self):
+        def evaluate(count):
+            books = [self.book(stock) for stock in range(count)]
+            Book.objects.filter(pk__in=[book.pk for book in books]).update(stock_quantity=5)
+            with CaptureQueriesContext(connection) as context:
+                sync_inventory_alerts([book.pk for book in books])
+            return len(context.captured_queries)
+        
+        self.assertEqual(evaluate(3), evaluate(30))
+        self.assertEqual(sync_seller_alerts(), {'resolved': 0, 'created': 0, 'updated': 0})
+    
+    def test_saves_that_keep_stock_skip_the_engine(self):
+        book = self.book(5)
+        book = Book.objects.get(pk=book.pk)
+        book.average_rating = 4
+        with CaptureQueriesContext(connection) as context:
+            book.save()
+        self.assertFalse(any('analytics_inventoryalert' in query['sql'] for query in context.captured_queries))
+        
+        book.stock_quantity = 0
+        book.save()
+        self.assertEqual(self.open_alerts(book), [('out_of_stock', 'high', 0)])
+
+class RequestMetricsTests(TestCase):
+    def setUp(self):
+        metrics.store.reset()
+        metrics._cache().delete(metrics.WORKERS_KEY)
+        # The first detail request is a cache miss and queries the database
+        cache.clear()
+        self.client = APIClient()
+        self.book = make_book(make_seller(), Category.objects.create(name='Fiction'), 1)
+        self.staff = User.objects.create_user(username='admin@example.com', email='admin@example.com', is_staff=True)
+    
+    def tearDown(self):
+        metrics.store.reset()
+    
+    def test_requests_are_recorded_per_route(self):
+        for _ in range(2):
+            self.client.get(f'/api/books/{self.book.pk}/')
+        self.client.get('/api/no-such-endpoint/')
+        
+        routes = metrics.store.snapshot()['routes']
+        detail = routes['GET api/books/<int:pk>/']
+        self.assertEqual(detail['requests'], 2)
+        self.assertEqual(detail['statuses']['2xx'], 2)
+        self.assertGreater(detail['sql_queries'], 0)
+        self.assertGreater(detail['response_bytes'], 0)
+        self.assertEqual(routes[f'GET {metrics.UNMATCHED_ROUTE}']['statuses']['4xx'], 1)
+    
+    @override_settings(METRICS_MAX_ROUTES=2)
+    def test_route_count_is_bounded(self):
+        for index in range(5):
+            metrics.store.observe(f'route/{index}/', 'GET', 200, 10)
+        
+        routes = metrics.store.snapshot()['routes']
+        self.assertEqual(len(routes), 3)
+        self.assertEqual(routes[f'GET {metrics.OTHER_ROUTE}']['requests'], 3)
+    
+    def test_percentiles_come_from_the_histogram(self):
+        for duration in [8] * 90 + [400] * 8 + [3000] * 2:
+            metrics.store.observe('slow/', 'GET', 200, duration)
+        
+        summary = metrics.summarize(metrics.store.snapshot()['routes']['GET slow/'])
+        self.assertTrue(5 < summary['p50_ms'] <= 10)
+        self.assertTrue(250 < summary['p95_ms'] <= 500)
+        self.assertTrue(2500 < summary['p99_ms'] <= 5000)
+    
+    def test_snapshots_of_other_workers_are_merged(self):
+        other = metrics.MetricsStore()
+        other.observe('api/books/', 'GET', 500, 20)
+        other.publish()
+        metrics.store.observe('api/books/', 'GET', 200, 20)
+        
+        collected = metrics.collect()
+        self.assertEqual(collected['workers'], 2)
+        totals = metrics.summarize(collected['routes']['GET api/books/'])
+        self.assertEqual((totals['requests'], totals['error_rate']), (2, 50.0))
+    
+    def test_system_health_reports_measured_latency(self):
+        self.client.get('/api/books/categories/')
+        self.client.force_authenticate(self.staff)
+        
+        performance = self.client.get('/api/analytics/admin/health/').data['performance']
+        self.assertEqual(performance['requests'], 1)
+        self.assertGreater(performance['p95_response_time'], 0)
+        self.assertEqual(performance['error_rate'], 0)
+    
+    def test_prometheus_export(self):
+        self.client.get('/api/books/categories/')
+        self.assertEqual(self.client.get('/metrics/').status_code, 403)
+        
+        self.client.force_login(self.staff)
+        response = self.client.get('/metrics/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(
+            'bnc_http_request_duration_seconds_bucket{method="GET",route="api/books/categories/",le="+Inf"} 1',
+            response.content.decode()
+        )
+    
+    @override_settings(METRICS_SCRAPE_TOKEN='scrape-token')
+    def test_prometheus_export_accepts_the_scrape_token(self):
+        self.assertEqual(self.client.get('/metrics/', HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+        self.assertEqual(self.client.get('/metrics/', HTTP_AUTHORIZATION='Bearer scrape-token').status_code, 200)
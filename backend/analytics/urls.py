@@ -12,8 +12,11 @@ urlpatterns = [
     path('seller/orders/<int:order_id>/', views.SellerOrdersView.as_view(), name='seller-order-detail'),
     path('seller/performance/', views.BookPerformanceView.as_view(), name='book-performance'),
     path('seller/alerts/', views.InventoryAlertsView.as_view(), name='inventory-alerts'),
+    path('seller/alerts/settings/', views.InventoryAlertSettingsView.as_view(), name='inventory-alert-settings'),
     path('seller/alerts/<int:alert_id>/resolve/', views.InventoryAlertsView.as_view(), name='resolve-alert'),
     path('seller/reports/generate/', views.GenerateSalesReportView.as_view(), name='generate-sales-report'),
+    path('seller/reports/jobs/<int:job_id>/', views.ReportJobView.as_view(), name='sales-report-job'),
+    path('seller/reports/<int:report_id>/', views.SalesReportDetailView.as_view(), name='sales-report-detail'),
     
     # Admin endpoints
     path('platform/', PlatformAnalyticsView.as_view(), name='platform-analytics'),
@@ -0,0 +1,103 @@
+"""
+Helpers for working through large sets of rows in bounded batches, and for
+writing rows recorded on the request path in batches behind it.
+"""
+import atexit
+import logging
+import threading
+import time
+from itertools import islice
+
+logger = logging.getLogger(__name__)
+
+# A buffer whose flushes keep failing holds at most this many flushes' worth
+MAX_BACKLOG_FLUSHES = 10
+
+
+def chunked(values, size):
+    """
+    Yield lists of up to `size` items from any iterable, consuming it as it
+    goes: a queryset's .iterator() is never loaded whole.
+    """
+    values = iter(values)
+    while chunk := list(islice(values, size)):
+        yield chunk
+
+
+class WriteBehindBuffer:
+    """
+    Thread-safe buffer of items recorded in memory and written to the
+    database in batches by write(items), which returns the number written.
+
+    add() flushes the buffer once it is flush_interval() seconds old or holds
+    flush_size() entries, and it is flushed again at interpreter exit. A flush
+    that fails is logged and its items are put back, to be retried no sooner
+    than flush_interval() seconds later: the request that triggered it never
+    fails because of it. Past MAX_BACKLOG_FLUSHES flushes' worth, items that
+    could not be written are dropped.
+
+    Items are kept in a list; subclasses override empty(), put() and merge()
+    to aggregate them instead.
+    """
+    def __init__(self, write, flush_interval, flush_size):
+        self._write = write
+        self._flush_interval = flush_interval
+        self._flush_size = flush_size
+        self._lock = threading.Lock()
+        self._items = self.empty()
+        self._started = None
+        self._retry_at = 0
+        atexit.register(self.flush)
+
+    def empty(self):
+        return []
+
+    def put(self, items, item):
+        items.append(item)
+
+    def merge(self, items, restored):
+        """Return `items` with `restored`, the items of a failed flush, put back"""
+        return restored + items
+
+    def add(self, item):
+        with self._lock:
+            now = time.monotonic()
+            if self._started is None:
+                self._started = now
+            self.put(self._items, item)
+            due = now >= self._retry_at and (
+                len(self._items) >= self._flush_size()
+                or now - self._started >= self._flush_interval()
+            )
+        if due:
+            self.flush()
+
+    def drain(self):
+        with self._lock:
+            items, self._items = self._items, self.empty()
+            self._started = None
+            self._retry_at = 0
+            return items
+
+    def flush(self):
+        """Write the buffered items. Returns the number written."""
+        items = self.drain()
+        if not items:
+            return 0
+
+        try:
+            return self._write(items)
+        except Exception:
+            logger.exception('Could not write %d buffered entries; keeping them for a later flush', len(items))
+            self._restore(items)
+            return 0
+
+    def _restore(self, items):
+        with self._lock:
+            self._retry_at = time.monotonic() + self._flush_interval()
+            if len(self._items) + len(items) > self._flush_size() * MAX_BACKLOG_FLUSHES:
+                logger.error('Dropping %d buffered entries that could not be written', len(items))
+                return
+            self._items = self.merge(self._items, items)
+            if self._started is None:
+                self._started = time.monotonic()
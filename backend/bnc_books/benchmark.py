@@ -0,0 +1,597 @@
+"""
+Endpoint benchmarks.
+
+ENDPOINTS describes one or more requests for every route in bnc_books/urls.py
+(except the Django admin and media serving). run() generates a dataset of
+each requested size with bnc_books.dataset, sends every request through the
+test client a few times, and records the median wall time and the number of
+SQL queries per request, reads routed to the replica included. The response
+cache is cleared before each request, so the numbers are those of a cache
+miss. Requests that write get fresh rows (a new user, cart or order) from
+their `prepare` step, which is not timed.
+
+check() compares the results with the budgets checked in next to this module
+(benchmark_budgets.json): the query count and a generous ceiling on the
+median time, both holding at every size. format_table() prints
+the results side by side per size, with the growth exponent of the time
+(0 = flat, 1 = linear in the data size) so endpoints that scan grow visibly.
+
+Run it with `manage.py benchmark_endpoints`, which works on a scratch
+database and never touches the configured ones: the read replica, if
+routing is on, reads the scratch database too.
+"""
+import json
+import math
+import re
+import statistics
+import tempfile
+import time
+from contextlib import ExitStack, contextmanager
+from datetime import timedelta
+from itertools import count
+from pathlib import Path
+
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.db.models import F
+from django.test.utils import (
+    CaptureQueriesContext, override_settings, setup_test_environment, teardown_test_environment,
+)
+from django.urls import URLPattern, URLResolver, get_resolver
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from accounts.models import User
+from affiliates import tracking
+from affiliates.models import Affiliate
+from analytics import events
+from analytics.jobs import request_report, run_pending
+from analytics.models import InventoryAlert
+from books.models import Book
+from orders.checkout import place_order
+from orders.models import Cart, CartItem, Order, ShippingMethod
+from orders.serializers import CreateOrderSerializer
+from reviews.models import Review
+from . import dataset
+from .replicas import replica_alias
+
+BUDGETS_PATH = Path(__file__).with_name('benchmark_budgets.json')
+DEFAULT_SIZES = (1000, 10000, 100000)
+DEFAULT_REPEAT = 5
+# Routes that are not part of the API
+SKIPPED_ROUTES = ('admin/', '^media/')
+# A time growth exponent from here up reads as "grows with the data"
+GROWTH_WARNING = 0.3
+# ... but only once the largest size is this slow, to ignore timer noise
+GROWTH_MIN_MS = 5
+# Time budgets below this would fail on timer noise and slower machines
+MIN_MS_BUDGET = 25
+
+ROUTE_PARAM = re.compile(r'<(?:\w+:)?(\w+)>')
+
+ADDRESS = {
+    'first_name': 'Bench', 'last_name': 'Buyer', 'street_address': '1 Main St',
+    'city': 'Springfield', 'state': 'IL', 'zip_code': '62701', 'country': 'US',
+}
+# A 1x1 GIF, for book covers
+COVER = (
+    b'GIF89a\x01\x00\x01\x00\x80\x00\x00\x00\x00\x00\xff\xff\xff!\xf9\x04\x01\x00\x00\x00\x00'
+    b',\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02\x02D\x01\x00;'
+)
+
+
+class Endpoint:
+    """
+    One benchmarked request. `prepare(fixtures)` returns the request's
+    parts: any of user, kwargs (URL parameters), query, data and format.
+    `user` is a role name ('buyer', 'seller', 'affiliate', 'staff') or a
+    User; None sends the request anonymously.
+    """
+    def __init__(self, name, method, route, user=None, status=200, prepare=None, session=False):
+        self.name = name
+        self.method = method
+        self.route = route
+        self.user = user
+        self.statuses = status if isinstance(status, tuple) else (status,)
+        self.prepare = prepare or (lambda fixtures: {})
+        # Authenticate with a session cookie instead of a JWT
+        self.session = session
+
+    def __repr__(self):
+        return f'<Endpoint {self.name}: {self.method.upper()} /{self.route}>'
+
+    def path(self, kwargs):
+        return '/' + ROUTE_PARAM.sub(lambda match: str(kwargs[match.group(1)]), self.route)
+
+
+class Fixtures:
+    """The rows the benchmarked requests act on, picked from a generated dataset"""
+    def __init__(self):
+        self.serial = count(1)
+        # Hashed once: new users are part of the setup, not the measurement
+        self.password = make_password(dataset.PASSWORD)
+        self.staff = User.objects.get(email='staff@example.com')
+        self.seller = User.objects.filter(role='seller').order_by('id').first()
+        self.affiliate = User.objects.filter(role='affiliate', affiliate__status='approved').order_by('id').first()
+        # Enough balance for every payout request the benchmark makes
+        Affiliate.objects.filter(user=self.affiliate).update(pending_earnings=F('pending_earnings') + 1000)
+
+        # The most reviewed book, and one of its reviewers as the buyer
+        self.book = Book.objects.filter(is_published=True).order_by('-review_count', 'id').first()
+        self.review = Review.objects.filter(book=self.book, is_approved=True).order_by('id').first()
+        if self.review is None:
+            raise ValueError('The dataset has no reviews to benchmark; generate more books')
+        self.buyer = self.review.user
+        self.order = Order.objects.filter(user=self.buyer, status='delivered').order_by('-created_at').first()
+        self.order_item = self.order.items.order_by('id').first()
+
+        self.seller_books = list(Book.objects.filter(seller=self.seller).order_by('id').values_list('id', flat=True)[:20])
+        self.seller_order = self.seller.seller_orders.order_by('-created_at').first()
+        self.in_stock = list(
+            Book.objects.filter(is_published=True, stock_quantity__gte=50).order_by('id').values_list('id', flat=True)[:50]
+        )
+        self.shipping_method = ShippingMethod.objects.filter(is_active=True).order_by('id').first()
+        self.fill_cart(self.buyer, 5)
+
+        today = timezone.localdate()
+        self.job, _ = request_report(self.seller, 'monthly', today - timedelta(days=30), today)
+        run_pending()
+        self.job.refresh_from_db()
+        self.report = self.job.report
+
+    def user(self, role):
+        return getattr(self, role) if isinstance(role, str) else role
+
+    def new_user(self, role='buyer'):
+        email = f'new-{role}-{next(self.serial)}@example.com'
+        return User.objects.create(
+            username=email, email=email, password=self.password, role=role, first_name='New', last_name='User'
+        )
+
+    def refresh_token(self, user):
+        return str(RefreshToken.for_user(user))
+
+    def fill_cart(self, user, size=3):
+        cart, _ = Cart.objects.get_or_create(user=user)
+        books = self.in_stock[next(self.serial) % len(self.in_stock):][:size] or self.in_stock[:size]
+        return CartItem.objects.bulk_create([CartItem(cart=cart, book_id=book_id) for book_id in books])
+
+    def checkout_data(self):
+        return {
+            'shipping_address': ADDRESS,
+            'shipping_method_id': self.shipping_method.pk,
+            'payment_method': 'credit_card',
+            'billing_same_as_shipping': True,
+        }
+
+    def place_order(self, user):
+        self.fill_cart(user)
+        serializer = CreateOrderSerializer(data=self.checkout_data())
+        serializer.is_valid(raise_exception=True)
+        return place_order(user, serializer.validated_data)
+
+    def delivered_purchase(self):
+        """A new buyer who has received a book. Returns (user, book_id)."""
+        user = self.new_user()
+        order = self.place_order(user)
+        Order.objects.filter(pk=order.pk).update(status='delivered', delivered_at=timezone.now())
+        return user, order.items.values_list('book_id', flat=True).first()
+
+    def open_alert(self):
+        return InventoryAlert.objects.create(
+            seller=self.seller, book_id=self.seller_books[0], alert_type='low_stock', priority='low',
+            message='Benchmark alert', current_stock=1, threshold=10
+        )
+
+    def import_file(self, rows=20):
+        start = next(self.serial) * 1000
+        lines = [json.dumps({
+            'title': f'Imported Book {start + index}', 'author': 'Bench Author', 'isbn': f'979{start + index:010d}',
+            'description': 'Imported by the benchmark.', 'price': '12.50', 'stock_quantity': 10,
+            'category': 'Fiction', 'genres': ['Classic'], 'publisher': 'Bench Press',
+            'publication_date': '2020-01-01', 'is_published': True,
+        }) for index in range(rows)]
+        return SimpleUploadedFile('catalog.jsonl', '\n'.join(lines).encode(), content_type='application/x-ndjson')
+
+
+def _with_cart(fixtures):
+    user = fixtures.new_user()
+    fixtures.fill_cart(user)
+    return user
+
+
+def _cart_item(fixtures):
+    user = fixtures.new_user()
+    return {'user': user, 'kwargs': {'item_id': fixtures.fill_cart(user)[0].pk}}
+
+
+def _new_book(fixtures):
+    number = next(fixtures.serial)
+    return {'format': 'multipart', 'data': {
+        'title': f'Benchmark Book {number}', 'author': 'Bench Author', 'isbn': f'977{number:010d}',
+        'description': 'Created by the benchmark.', 'price': '15.00', 'stock_quantity': 10,
+        'category': fixtures.book.category_id, 'genres': list(fixtures.book.genres.values_list('id', flat=True)),
+        'publisher': 'Bench Press', 'publication_date': '2020-01-01',
+        'cover_image': SimpleUploadedFile('cover.gif', COVER, content_type='image/gif'), 'is_published': True,
+    }}
+
+
+def _review(fixtures):
+    user, book_id = fixtures.delivered_purchase()
+    return {'user': user, 'data': {
+        'book': book_id, 'rating': 4, 'title': 'Benchmark review', 'comment': 'Read it in one sitting.',
+    }}
+
+
+ENDPOINTS = [
+    # Accounts
+    Endpoint('auth.register', 'post', 'api/auth/register/', status=201, prepare=lambda f: {'data': {
+        'first_name': 'New', 'last_name': 'Buyer', 'email': f'register-{next(f.serial)}@example.com',
+        'password': dataset.PASSWORD, 'password_confirm': dataset.PASSWORD, 'role': 'buyer',
+    }}),
+    Endpoint('auth.login', 'post', 'api/auth/login/', prepare=lambda f: {'data': {
+        'email': f.buyer.email, 'password': dataset.PASSWORD,
+    }}),
+    Endpoint('auth.token_refresh', 'post', 'api/auth/token/refresh/', prepare=lambda f: {'data': {
+        'refresh': f.refresh_token(f.buyer),
+    }}),
+    Endpoint('auth.password_change', 'post', 'api/auth/password/change/', prepare=lambda f: {
+        'user': f.new_user(), 'data': {
+            'old_password': dataset.PASSWORD, 'new_password': 'Bench-pass-456!', 'new_password_confirm': 'Bench-pass-456!',
+        },
+    }),
+    Endpoint('auth.profile', 'get', 'api/auth/profile/', user='buyer'),
+    # Without a refresh token: blacklisting one needs simplejwt's token_blacklist app, which isn't installed
+    Endpoint('auth.logout', 'post', 'api/auth/logout/', user='buyer'),
+
+    # Catalog
+    Endpoint('books.list', 'get', 'api/books/'),
+    Endpoint('books.search', 'get', 'api/books/', prepare=lambda f: {'query': {'search': 'shadow river'}}),
+    Endpoint('books.categories', 'get', 'api/books/categories/'),
+    Endpoint('books.featured', 'get', 'api/books/featured/'),
+    Endpoint('books.shelves', 'get', 'api/books/shelves/'),
+    Endpoint('books.detail', 'get', 'api/books/<int:pk>/', prepare=lambda f: {'kwargs': {'pk': f.book.pk}}),
+    Endpoint('books.seller_list', 'get', 'api/books/seller/books/', user='seller'),
+    Endpoint('books.seller_create', 'post', 'api/books/seller/books/', user='seller', status=201, prepare=_new_book),
+    Endpoint('books.inventory_bulk', 'post', 'api/books/seller/books/inventory/', user='seller', prepare=lambda f: {
+        'data': {'operations': [{'id': book_id, 'action': 'set', 'amount': 30} for book_id in f.seller_books]},
+    }),
+    Endpoint('books.import', 'post', 'api/books/seller/books/import/', user='seller', status=201, prepare=lambda f: {
+        'format': 'multipart', 'data': {'file': f.import_file()},
+    }),
+    Endpoint('books.seller_detail', 'get', 'api/books/seller/books/<int:pk>/', user='seller', prepare=lambda f: {
+        'kwargs': {'pk': f.seller_books[0]},
+    }),
+    Endpoint('books.inventory', 'patch', 'api/books/seller/books/<int:pk>/inventory/', user='seller', prepare=lambda f: {
+        'kwargs': {'pk': f.seller_books[0]}, 'data': {'stock_quantity': 40},
+    }),
+
+    # Cart and orders
+    Endpoint('orders.cart', 'get', 'api/orders/cart/', user='buyer'),
+    Endpoint('orders.cart_add', 'post', 'api/orders/cart/items/', status=201, prepare=lambda f: {
+        'user': f.new_user(), 'data': {'book': f.in_stock[0], 'quantity': 1},
+    }),
+    Endpoint('orders.cart_update', 'patch', 'api/orders/cart/items/<int:item_id>/', prepare=lambda f: {
+        **_cart_item(f), 'data': {'quantity': 2},
+    }),
+    Endpoint('orders.cart_remove', 'delete', 'api/orders/cart/items/<int:item_id>/remove/', prepare=_cart_item),
+    Endpoint('orders.cart_clear', 'delete', 'api/orders/cart/clear/', prepare=lambda f: {'user': _with_cart(f)}),
+    Endpoint('orders.list', 'get', 'api/orders/', user='buyer'),
+    Endpoint('orders.create', 'post', 'api/orders/create/', status=201, prepare=lambda f: {
+        'user': _with_cart(f), 'data': f.checkout_data(),
+    }),
+    Endpoint('orders.shipping_methods', 'get', 'api/orders/shipping-methods/', user='buyer'),
+    Endpoint('orders.detail', 'get', 'api/orders/<int:pk>/', user='buyer', prepare=lambda f: {
+        'kwargs': {'pk': f.order.pk},
+    }),
+    Endpoint('orders.cancel', 'post', 'api/orders/<int:order_id>/cancel/', prepare=lambda f: (lambda order: {
+        'user': order.user, 'kwargs': {'order_id': order.pk},
+    })(f.place_order(f.new_user()))),
+    Endpoint('orders.return', 'post', 'api/orders/<int:order_id>/return/', user='buyer', prepare=lambda f: {
+        'kwargs': {'order_id': f.order.pk}, 'data': {
+            'reason': 'damaged', 'return_items': [{'order_item': f.order_item.pk, 'quantity': 1, 'reason': 'damaged'}],
+        },
+    }),
+
+    # Reviews
+    Endpoint('reviews.feed', 'get', 'api/reviews/', prepare=lambda f: {'query': {'book': f.book.pk}}),
+    Endpoint('reviews.feed_helpful', 'get', 'api/reviews/', prepare=lambda f: {
+        'query': {'book': f.book.pk, 'sort': 'helpful'},
+    }),
+    Endpoint('reviews.create', 'post', 'api/reviews/', status=201, prepare=_review),
+    Endpoint('reviews.mine', 'get', 'api/reviews/my-reviews/', user='buyer'),
+    Endpoint('reviews.can_review', 'get', 'api/reviews/can-review/<int:book_id>/', user='buyer', prepare=lambda f: {
+        'kwargs': {'book_id': f.book.pk},
+    }),
+    Endpoint('reviews.detail', 'get', 'api/reviews/<int:pk>/', user='buyer', prepare=lambda f: {
+        'kwargs': {'pk': f.review.pk},
+    }),
+    Endpoint('reviews.vote', 'post', 'api/reviews/<int:review_id>/vote/', user='staff', prepare=lambda f: {
+        'kwargs': {'review_id': f.review.pk}, 'data': {'vote_type': 'helpful'},
+    }),
+    Endpoint('reviews.report', 'post', 'api/reviews/<int:review_id>/report/', status=201, prepare=lambda f: {
+        'user': f.new_user(), 'kwargs': {'review_id': f.review.pk}, 'data': {'review': f.review.pk, 'reason': 'spam'},
+    }),
+    Endpoint('reviews.summary', 'get', 'api/reviews/summary/<int:book_id>/', prepare=lambda f: {
+        'kwargs': {'book_id': f.book.pk},
+    }),
+
+    # Affiliates
+    Endpoint('affiliates.register', 'post', 'api/affiliate/register/', status=201, prepare=lambda f: {
+        'user': f.new_user('affiliate'), 'data': {'preferred_payment_method': 'paypal', 'paypal_email': 'pay@example.com'},
+    }),
+    Endpoint('affiliates.link', 'post', 'api/affiliate/referral-links/', user='affiliate', status=201, prepare=lambda f: {
+        'data': {'campaign': f'bench_{next(f.serial)}'},
+    }),
+    Endpoint('affiliates.commissions', 'get', 'api/affiliate/commissions/', user='affiliate'),
+    Endpoint('affiliates.payout', 'post', 'api/affiliate/payouts/', user='affiliate', status=201, prepare=lambda f: {
+        'data': {'amount': '10.00', 'payment_method': 'paypal'},
+    }),
+    Endpoint('affiliates.analytics', 'get', 'api/affiliate/analytics/', user='affiliate'),
+    Endpoint('affiliates.dashboard', 'get', 'api/affiliate/dashboard/', user='affiliate'),
+
+    # Seller analytics
+    Endpoint('seller.analytics', 'get', 'api/analytics/seller/analytics/', user='seller'),
+    Endpoint('seller.dashboard', 'get', 'api/analytics/seller/dashboard/', user='seller'),
+    Endpoint('seller.orders', 'get', 'api/analytics/seller/orders/', user='seller'),
+    Endpoint('seller.order_update', 'patch', 'api/analytics/seller/orders/<int:order_id>/', user='seller', prepare=lambda f: {
+        'kwargs': {'order_id': f.seller_order.order_id}, 'data': {'tracking_number': f'TRK{next(f.serial)}'},
+    }),
+    Endpoint('seller.performance', 'get', 'api/analytics/seller/performance/', user='seller'),
+    Endpoint('seller.alerts', 'get', 'api/analytics/seller/alerts/', user='seller'),
+    Endpoint('seller.alert_settings', 'get', 'api/analytics/seller/alerts/settings/', user='seller'),
+    Endpoint('seller.alert_settings_update', 'put', 'api/analytics/seller/alerts/settings/', user='seller', prepare=lambda f: {
+        'data': {'low_stock_threshold': 10, 'high_priority_threshold': 3},
+    }),
+    Endpoint('seller.alert_resolve', 'post', 'api/analytics/seller/alerts/<int:alert_id>/resolve/', user='seller',
+             prepare=lambda f: {'kwargs': {'alert_id': f.open_alert().pk}}),
+    Endpoint('seller.report_generate', 'post', 'api/analytics/seller/reports/generate/', user='seller', status=(200, 202),
+             prepare=lambda f: {'data': {
+                 'report_type': 'monthly', 'start_date': str(f.job.start_date), 'end_date': str(f.job.end_date),
+             }}),
+    Endpoint('seller.report_job', 'get', 'api/analytics/seller/reports/jobs/<int:job_id>/', user='seller', prepare=lambda f: {
+        'kwargs': {'job_id': f.job.pk},
+    }),
+    Endpoint('seller.report', 'get', 'api/analytics/seller/reports/<int:report_id>/', user='seller', prepare=lambda f: {
+        'kwargs': {'report_id': f.report.pk},
+    }),
+
+    # Platform administration
+    Endpoint('platform.analytics', 'get', 'api/analytics/platform/', user='staff'),
+    Endpoint('platform.users', 'get', 'api/analytics/admin/users/', user='staff'),
+    Endpoint('platform.moderation', 'get', 'api/analytics/admin/moderation/', user='staff'),
+    Endpoint('platform.health', 'get', 'api/analytics/admin/health/', user='staff'),
+    Endpoint('metrics', 'get', 'metrics/', user='staff', session=True),
+]
+
+
+def routes(patterns=None, prefix=''):
+    """Every route of the URLconf, as its pattern string"""
+    found = []
+    for pattern in get_resolver().url_patterns if patterns is None else patterns:
+        route = prefix + str(pattern.pattern)
+        if isinstance(pattern, URLResolver):
+            found.extend(routes(pattern.url_patterns, route))
+        elif isinstance(pattern, URLPattern):
+            found.append(route)
+    return found
+
+
+def uncovered_routes(endpoints=ENDPOINTS):
+    """Routes with no benchmarked request"""
+    covered = {endpoint.route for endpoint in endpoints}
+    return sorted({
+        route for route in routes()
+        if route not in covered and not route.startswith(SKIPPED_ROUTES)
+    })
+
+
+class Result:
+    def __init__(self, endpoint, size, timings, queries, statuses, error=None):
+        self.endpoint = endpoint
+        self.size = size
+        self.ms = statistics.median(timings) * 1000
+        self.queries = max(queries)
+        self.statuses = statuses
+        # Body of the first unexpected response
+        self.error = error
+
+    @property
+    def ok(self):
+        return all(status in self.endpoint.statuses for status in self.statuses)
+
+
+def _discard_buffers():
+    # Buffered counters belong to the benchmark database: drop them rather
+    # than let a later (or the exit) flush write them elsewhere
+    events.buffer.drain()
+    tracking.buffer.drain()
+
+
+def _query_aliases():
+    """The databases requests read from and write to"""
+    return [DEFAULT_DB_ALIAS, *filter(None, [replica_alias()])]
+
+
+def measure(endpoint, fixtures, repeat=DEFAULT_REPEAT, size=None):
+    timings, queries, statuses = [], [], []
+    error = None
+    for _ in range(repeat):
+        parts = endpoint.prepare(fixtures)
+        user = parts.get('user', endpoint.user)
+        # Server errors are reported as a bad status, not raised
+        client = APIClient(raise_request_exception=False)
+        headers = {}
+        if user is not None:
+            user = fixtures.user(user)
+            if endpoint.session:
+                client.force_login(user)
+            else:
+                headers['HTTP_AUTHORIZATION'] = f'Bearer {RefreshToken.for_user(user).access_token}'
+        request = getattr(client, endpoint.method)
+        path = endpoint.path(parts.get('kwargs', {}))
+        if endpoint.method == 'get':
+            arguments = {'data': parts.get('query')}
+        else:
+            arguments = {'data': parts.get('data'), 'format': parts.get('format', 'json')}
+
+        cache.clear()
+        with ExitStack() as stack:
+            contexts = [stack.enter_context(CaptureQueriesContext(connections[alias])) for alias in _query_aliases()]
+            started = time.perf_counter()
+            response = request(path, **arguments, **headers)
+            timings.append(time.perf_counter() - started)
+        queries.append(sum(len(context.captured_queries) for context in contexts))
+        statuses.append(response.status_code)
+        if error is None and response.status_code not in endpoint.statuses:
+            error = response.content[:300].decode(errors='replace')
+    _discard_buffers()
+    return Result(endpoint, size, timings, queries, statuses, error)
+
+
+@contextmanager
+def scratch_database():
+    """A throwaway database built from the migrations, used instead of the configured one"""
+    test_settings = connection.settings_dict.setdefault('TEST', {})
+    test_name = test_settings.get('NAME')
+    if test_name:
+        test_settings['NAME'] = Path(test_name).with_name('benchmark_db.sqlite3')
+    # Mirrors of `default` (the read replica) are pointed at the scratch database too
+    mirrors = {
+        alias: connections[alias].settings_dict['NAME']
+        for alias in connections
+        if connections[alias].settings_dict.get('TEST', {}).get('MIRROR') == DEFAULT_DB_ALIAS
+    }
+    old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    for alias in mirrors:
+        connections[alias].close()
+        connections[alias].creation.set_as_test_mirror(connection.settings_dict)
+    # As under the test runner: the test client's host, no DEBUG
+    setup_test_environment(debug=False)
+    try:
+        yield
+    finally:
+        _discard_buffers()
+        teardown_test_environment()
+        for alias, name in mirrors.items():
+            connections[alias].close()
+            connections[alias].settings_dict['NAME'] = name
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+        test_settings['NAME'] = test_name
+
+
+def run(sizes=DEFAULT_SIZES, repeat=DEFAULT_REPEAT, endpoints=ENDPOINTS, seed=0, progress=None):
+    """
+    Benchmark `endpoints` against a generated dataset of each size, on the
+    current database (which is emptied first). Returns {size: [Result]}.
+    """
+    results = {}
+    for size in sizes:
+        call_command('flush', interactive=False, verbosity=0)
+        if progress:
+            progress(f'Generating {size} books...')
+        dataset.generate(size, seed=seed)
+        fixtures = Fixtures()
+        results[size] = []
+        # Uploaded covers go to a scratch directory, not MEDIA_ROOT
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+            for endpoint in endpoints:
+                results[size].append(measure(endpoint, fixtures, repeat, size))
+        if progress:
+            progress(f'Measured {len(endpoints)} endpoints at {size} books')
+    return results
+
+
+def load_budgets(path=BUDGETS_PATH):
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_budgets(results, path=BUDGETS_PATH, headroom=2.0):
+    """Write budgets from measured results: the largest query count, and `headroom` times the slowest time"""
+    budgets = {}
+    for size_results in results.values():
+        for result in size_results:
+            budget = budgets.setdefault(result.endpoint.name, {'queries': 0, 'ms': 0})
+            budget['queries'] = max(budget['queries'], result.queries)
+            budget['ms'] = max(budget['ms'], MIN_MS_BUDGET, math.ceil(result.ms * headroom))
+    with open(path, 'w') as f:
+        json.dump(dict(sorted(budgets.items())), f, indent=2)
+        f.write('\n')
+    return budgets
+
+
+def check(results, budgets):
+    """Problems with `results`: unexpected statuses, missing budgets and exceeded budgets"""
+    problems = []
+    for size, size_results in results.items():
+        for result in size_results:
+            name = result.endpoint.name
+            if not result.ok:
+                problems.append(
+                    f'{name} at {size} books: responded {result.statuses}, expected {result.endpoint.statuses}: {result.error}'
+                )
+            budget = budgets.get(name)
+            if budget is None:
+                problems.append(f'{name}: no budget')
+                continue
+            if result.queries > budget['queries']:
+                problems.append(f"{name} at {size} books: {result.queries} queries, budget {budget['queries']}")
+            if result.ms > budget['ms']:
+                problems.append(f"{name} at {size} books: {result.ms:.1f} ms, budget {budget['ms']} ms")
+    return list(dict.fromkeys(problems))
+
+
+def growth(results, name):
+    """Exponent k of time ~ size^k between the smallest and largest size (None for a single size)"""
+    sizes = sorted(results)
+    if len(sizes) < 2:
+        return None
+    small, large = (
+        next(result for result in results[size] if result.endpoint.name == name) for size in (sizes[0], sizes[-1])
+    )
+    if small.ms <= 0 or large.ms <= small.ms:
+        return 0.0
+    return math.log(large.ms / small.ms) / math.log(sizes[-1] / sizes[0])
+
+
+def format_table(results, budgets=None):
+    """The results as a text table: queries and median ms per size, growth and budget"""
+    budgets = budgets or {}
+    sizes = sorted(results)
+    names = [result.endpoint.name for result in results[sizes[0]]]
+    by_name = {size: {result.endpoint.name: result for result in results[size]} for size in sizes}
+
+    header = ['endpoint'] + [f'q@{size}' for size in sizes] + [f'ms@{size}' for size in sizes] + ['growth', 'budget']
+    rows = []
+    for name in names:
+        row_results = [by_name[size][name] for size in sizes]
+        k = growth(results, name)
+        budget = budgets.get(name)
+        flags = []
+        if len({result.queries for result in row_results}) > 1:
+            flags.append('queries vary')
+        if k is not None and k >= GROWTH_WARNING and row_results[-1].ms >= GROWTH_MIN_MS:
+            flags.append('time grows')
+        if not all(result.ok for result in row_results):
+            flags.append('bad status')
+        rows.append(
+            [name]
+            + [str(result.queries) for result in row_results]
+            + [f'{result.ms:.1f}' for result in row_results]
+            + ['-' if k is None else f'{k:.2f}', f"{budget['queries']}q/{budget['ms']}ms" if budget else '-']
+            + [', '.join(flags)]
+        )
+
+    widths = [max(len(str(cell)) for cell in column) for column in zip(header + [''], *rows)]
+    lines = []
+    for row in [header + ['']] + rows:
+        lines.append('  '.join(
+            str(cell).ljust(width) if index == 0 else str(cell).rjust(width)
+            for index, (cell, width) in enumerate(zip(row, widths))
+        ).rstrip())
+    return '\n'.join(lines)
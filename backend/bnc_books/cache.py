@@ -0,0 +1,142 @@
+"""
+Versioned response cache for public, read-heavy endpoints.
+
+Every cached response is keyed by its full URL (path plus sorted query
+string) and by the current version of each data scope it was built from,
+e.g. "categories" or "book:42". Model signals bump those versions on save and
+delete, once the transaction commits, so a stale entry is never looked up
+again and there is no need for short TTLs. Responses carry an ETag and honour If-None-Match with a 304.
+
+Views whose scopes depend on the database (a book's seller) look that up
+with versioned_lookup(), which is cached the same way, so a hit costs no
+query at all.
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags, quote_etag
+
+VERSION_PREFIX = 'respcache:version:'
+RESPONSE_PREFIX = 'respcache:response:'
+LOOKUP_PREFIX = 'respcache:lookup:'
+
+
+def _cache():
+    return caches[getattr(settings, 'RESPONSE_CACHE_ALIAS', 'default')]
+
+
+def _timeout():
+    return getattr(settings, 'RESPONSE_CACHE_TIMEOUT', 60 * 60 * 24)
+
+
+def _fresh_version():
+    # Seeding from the clock means a version key that was evicted can never
+    # come back with a value an older cached response was stored under.
+    return time.time_ns()
+
+
+def bump_versions(*scopes):
+    """Invalidate every cached response that depends on any of `scopes`"""
+    # Bumped before the commit, a concurrent request could still read the old
+    # data and cache it under the new version
+    transaction.on_commit(lambda: _bump(scopes))
+
+
+def _bump(scopes):
+    cache = _cache()
+    for scope in scopes:
+        key = VERSION_PREFIX + scope
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _fresh_version(), None)
+
+
+def get_versions(scopes):
+    cache = _cache()
+    keys = [VERSION_PREFIX + scope for scope in scopes]
+    versions = cache.get_many(keys)
+
+    for key in keys:
+        if key not in versions:
+            cache.add(key, _fresh_version(), None)
+            versions[key] = cache.get(key)
+
+    return [str(versions[key]) for key in keys]
+
+
+def versioned_lookup(name, scopes, compute):
+    """compute(), cached until any of `scopes` is bumped"""
+    cache = _cache()
+    raw = '|'.join([name, *scopes, *get_versions(scopes)])
+    key = LOOKUP_PREFIX + hashlib.md5(raw.encode('utf-8')).hexdigest()
+    missing = object()
+    value = cache.get(key, missing)
+    if value is missing:
+        value = compute()
+        cache.set(key, value, _timeout())
+    return value
+
+
+def _response_key(request, scopes):
+    query = sorted(request.GET.lists())
+    versions = get_versions(scopes)
+    raw = '|'.join([request.path, repr(query), *scopes, *versions])
+    return RESPONSE_PREFIX + hashlib.md5(raw.encode('utf-8')).hexdigest()
+
+
+def _etag_matches(request, etag):
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if not if_none_match:
+        return False
+    etags = parse_etags(if_none_match)
+    return '*' in etags or etag in etags
+
+
+class VersionedCacheMixin:
+    """
+    Serve GET/HEAD responses of an APIView from the versioned cache.
+
+    Views list the data they are built from in `cache_scopes`, or override
+    `get_cache_scopes()` when the scopes depend on URL kwargs. Only use this
+    on endpoints whose response is the same for every user.
+    """
+    cache_scopes = ()
+
+    def get_cache_scopes(self, request, *args, **kwargs):
+        return list(self.cache_scopes)
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return super().dispatch(request, *args, **kwargs)
+
+        cache = _cache()
+        key = _response_key(request, self.get_cache_scopes(request, *args, **kwargs))
+        cached = cache.get(key)
+
+        if cached is not None:
+            content, content_type, etag = cached
+            if _etag_matches(request, etag):
+                return HttpResponseNotModified(headers={'ETag': etag})
+            response = HttpResponse(content, content_type=content_type)
+            response['ETag'] = etag
+            response['X-Cache'] = 'HIT'
+            return response
+
+        response = super().dispatch(request, *args, **kwargs)
+        if response.status_code != 200:
+            return response
+
+        response.render()
+        etag = quote_etag(hashlib.md5(response.content).hexdigest())
+        cache.set(key, (response.content, response['Content-Type'], etag), _timeout())
+
+        if _etag_matches(request, etag):
+            return HttpResponseNotModified(headers={'ETag': etag})
+        response['ETag'] = etag
+        response['X-Cache'] = 'MISS'
+        return response
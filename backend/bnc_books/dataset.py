@@ -0,0 +1,665 @@
+"""
+Synthetic marketplace data, for benchmarks and for trying the site at scale.
+
+generate(books) fills a database with a catalog of `books` books and, in
+proportion to it (see scale()), the sellers, buyers, orders, reviews, votes,
+affiliates, referrals and commissions around them. Activity has the shapes a
+marketplace's has:
+
+- book popularity is Zipfian: the book of popularity rank r is picked for an
+  order item in proportion to 1/r, so a few books sell most copies and most
+  books sell a handful. Seller catalogs and buyer activity follow flatter
+  Zipf curves;
+- order volume is seasonal: it grows through the year, peaks before the
+  holidays, picks up again for back to school, dips in January, and is
+  higher at weekends and in the evening.
+
+Ranks are indexes, so seller 0, book 0 and buyer 0 are the heaviest, which
+is what the benchmarks measure against.
+
+Rows are generated in fixed chunks (of users, of books, and of buyers with
+all their orders, reviews, votes, referral and commissions), each from a
+random stream seeded with the seed and the chunk's position, so the same
+seed produces the same data however many workers share the work. With
+workers > 1 the chunks are generated in forked worker processes; this
+process writes them in order, one transaction per chunk, with bulk_create,
+which skips model signals. Primary keys are assigned here rather than by the
+database so that rows can point at each other before they exist. What the
+signals maintain (book sales, rating counters, shelves, the search index,
+seller analytics, platform rollups, inventory alerts and affiliate
+earnings) is rebuilt once at the end instead.
+"""
+import multiprocessing
+import random
+from array import array
+from bisect import bisect
+from collections import deque
+from contextlib import contextmanager
+from datetime import timedelta
+from decimal import Decimal
+from itertools import accumulate
+
+from django.apps import apps
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Count, DecimalField, IntegerField, Max, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from accounts.models import User, UserProfile
+from affiliates.models import Affiliate, Commission, Referral, ReferralClick, ReferralLink
+from books.models import Book, Category, Genre
+from orders.models import Order, OrderItem, SellerOrder, ShippingMethod
+from reviews.models import Review, ReviewVote
+from reviews.votes import wilson_score
+
+# Every generated user signs in with this password
+PASSWORD = 'Bench-pass-123!'
+BATCH_SIZE = 2000
+USER_CHUNK = 5000
+BOOK_CHUNK = 2000
+BUYER_CHUNK = 250
+
+CATEGORIES = (
+    'Fiction', 'Mystery', 'Science Fiction', 'Fantasy', 'Romance', 'Biography',
+    'History', 'Science', 'Business', 'Children', 'Poetry', 'Travel',
+)
+GENRES = (
+    'Adventure', 'Classic', 'Contemporary', 'Crime', 'Drama', 'Humor',
+    'Literary', 'Thriller', 'Young Adult', 'Non-fiction',
+)
+SHIPPING_METHODS = (
+    ('Standard', Decimal('4.99'), '5-7 business days', 70),
+    ('Express', Decimal('12.99'), '2-3 business days', 25),
+    ('Overnight', Decimal('24.99'), '1 business day', 5),
+)
+CAMPAIGNS = ('newsletter', 'social')
+RATING_WEIGHTS = (5, 7, 15, 33, 40)
+WORDS = (
+    'shadow', 'river', 'empire', 'garden', 'winter', 'secret', 'house', 'storm',
+    'letters', 'light', 'journey', 'silent', 'iron', 'summer', 'glass', 'city',
+    'memory', 'island', 'crown', 'night',
+)
+
+# Zipf exponents: how much more the top ranks get than the rest
+BOOK_POPULARITY = 1.0
+SELLER_CATALOG = 0.8
+BUYER_ACTIVITY = 0.5
+AFFILIATE_REACH = 1.0
+
+# Order volume through the year: (first day, last day, extra volume), days as (month, day)
+SEASONS = (
+    ((11, 20), (12, 24), 1.0),
+    ((8, 15), (9, 15), 0.3),
+    ((1, 2), (1, 31), -0.3),
+)
+WEEKEND_VOLUME = 1.25
+YEARLY_GROWTH = 0.4
+HOUR_WEIGHTS = (2, 1, 1, 1, 1, 1, 2, 3, 4, 5, 6, 6, 7, 6, 6, 6, 6, 7, 8, 9, 10, 9, 7, 4)
+ORDER_DAYS = 365
+
+REVIEW_RATE = 0.5
+REFERRED_RATE = 0.1
+COMMISSION_RATE = Decimal('10.00')
+PAID_AFTER_DAYS = 30
+
+BOOK_GENRES = Book.genres.through._meta.label
+# Rows of these models are numbered from 0 within each chunk of buyers; the
+# writer moves them, and the fields that point at them, past the rows
+# already written
+NUMBERED = {
+    Order._meta.label: 'order_id',
+    SellerOrder._meta.label: 'seller_order_id',
+    Review._meta.label: 'review_id',
+    Referral._meta.label: 'referral_id',
+}
+
+
+def scale(books):
+    """Row counts for a catalog of `books` books"""
+    return {
+        'books': books,
+        'sellers': max(3, books // 250),
+        'buyers': max(20, books // 4),
+        'affiliates': max(2, books // 5000),
+        'orders': max(20, books // 2),
+    }
+
+
+class Zipf:
+    """Ranks below `count`, drawn with probability proportional to 1 / (rank + 1) ** exponent"""
+    def __init__(self, count, exponent):
+        self.exponent = exponent
+        self.cumulative = array('d', accumulate((rank + 1) ** -exponent for rank in range(count)))
+        self.total = self.cumulative[-1] if count else 0.0
+
+    def __len__(self):
+        return len(self.cumulative)
+
+    def draw(self, rng):
+        return bisect(self.cumulative, rng.random() * self.total)
+
+    def share(self, rank):
+        return (rank + 1) ** -self.exponent / self.total
+
+
+def seasonal_volume(day, age):
+    """Relative order volume on `day`, `age` days ago"""
+    volume = 1 + sum(extra for first, last, extra in SEASONS if first <= (day.month, day.day) <= last)
+    if day.weekday() >= 5:
+        volume *= WEEKEND_VOLUME
+    return volume / (1 + YEARLY_GROWTH) ** (age / 365)
+
+
+def _title(rng):
+    return ' '.join(rng.choice(WORDS).capitalize() for _ in range(rng.randint(2, 4)))
+
+
+def _order_number(order_id, created):
+    return f'BNC-{created.year}-D{order_id:09d}'
+
+
+def _order_status(rng, age):
+    """A status for an order placed `age` days ago"""
+    if age < 1:
+        return rng.choice(('pending', 'processing'))
+    if age < 3:
+        return rng.choice(('processing', 'shipped'))
+    if age < 7:
+        return rng.choice(('shipped', 'delivered'))
+    return rng.choices(('delivered', 'cancelled', 'refunded'), (92, 5, 3))[0]
+
+
+@contextmanager
+def _explicit_timestamps(*fields):
+    """Let bulk_create keep the (model, field) creation timestamps set on the objects"""
+    fields = [model._meta.get_field(name) for model, name in fields]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Plan:
+    """
+    What chunks are generated from: row counts, the first primary key of each
+    model, the distributions and the books written so far. Workers get a copy.
+    """
+    def __init__(self, counts, seed, now):
+        self.counts = counts
+        self.seed = seed
+        self.now = now
+        self.password = make_password(PASSWORD)
+        self.first = {}
+        self.sellers = Zipf(counts['sellers'], SELLER_CATALOG)
+        self.buyers = Zipf(counts['buyers'], BUYER_ACTIVITY)
+        self.affiliates = Zipf(counts['affiliates'], AFFILIATE_REACH)
+
+        midnight = timezone.localtime(now).replace(hour=0, minute=0, second=0, microsecond=0)
+        self.midnights = [midnight - timedelta(days=age) for age in range(ORDER_DAYS)]
+        self.days = array('d', accumulate(
+            seasonal_volume(day, age) for age, day in enumerate(self.midnights)
+        ))
+
+        # Filled in as books are written: price in cents and seller of each book, and the published ones
+        self.prices = array('q')
+        self.book_sellers = array('q')
+        self.published = array('q')
+        self.books = None
+
+    def user_id(self, role, index):
+        offset = {'seller': 0, 'buyer': self.counts['sellers'], 'affiliate': self.counts['sellers'] + self.counts['buyers']}
+        return self.first[User] + offset[role] + index
+
+    def role(self, index):
+        """(role, number within the role) of the index-th generated user"""
+        if index < self.counts['sellers']:
+            return 'seller', index
+        index -= self.counts['sellers']
+        if index < self.counts['buyers']:
+            return 'buyer', index
+        return 'affiliate', index - self.counts['buyers']
+
+    def order_time(self, rng):
+        """When an order was placed, drawn from the seasonal volume"""
+        age = bisect(self.days, rng.random() * self.days[-1])
+        hour = rng.choices(range(24), HOUR_WEIGHTS)[0]
+        placed = self.midnights[age] + timedelta(hours=hour, seconds=rng.randrange(3600))
+        return min(placed, self.now - timedelta(seconds=rng.randrange(1, 3600)))
+
+
+def _user_rows(plan, rng, start, stop):
+    users, profiles = [], []
+    for index in range(start, stop):
+        role, number = plan.role(index)
+        email = f'{role}{number}@example.com'
+        users.append({
+            'id': plan.first[User] + index,
+            'username': email,
+            'email': email,
+            'first_name': role.capitalize(),
+            'last_name': str(number),
+            'role': role,
+            'password': plan.password,
+            'date_joined': plan.now - timedelta(days=ORDER_DAYS, seconds=rng.randrange(730 * 86400)),
+        })
+        profiles.append({'user_id': plan.first[User] + index, 'store_name': f'Store {number}' if role == 'seller' else None})
+    return {User._meta.label: users, UserProfile._meta.label: profiles}
+
+
+def _book_rows(plan, rng, start, stop):
+    books, genres = [], []
+    for index in range(start, stop):
+        book_id = plan.first[Book] + index
+        price = Decimal(rng.randrange(499, 4999)) / 100
+        created = plan.now - timedelta(seconds=rng.randrange(730 * 86400))
+        books.append({
+            'id': book_id,
+            'title': _title(rng),
+            'author': f'{rng.choice(WORDS).capitalize()} {rng.choice(WORDS).capitalize()}son',
+            'isbn': f'978{book_id:010d}',
+            'description': ' '.join(rng.choice(WORDS) for _ in range(40)),
+            'price': price,
+            'original_price': price + 5 if rng.random() < 0.2 else None,
+            'stock_quantity': rng.choice((0, 2, 5, 20, 50, 100)),
+            'category_id': rng.choice(plan.categories),
+            'language': rng.choice(('english',) * 8 + ('spanish', 'french')),
+            'pages': rng.randint(80, 900),
+            'publisher': f'{rng.choice(WORDS).capitalize()} Press',
+            'publication_date': (created - timedelta(days=rng.randrange(3650))).date(),
+            'cover_image': 'book_covers/placeholder.jpg',
+            'is_published': rng.random() < 0.95,
+            'is_featured': rng.random() < 0.02,
+            'seller_id': plan.user_id('seller', plan.sellers.draw(rng)),
+            'created_at': created,
+        })
+        genres.extend({'book_id': book_id, 'genre_id': genre_id} for genre_id in rng.sample(plan.genres, rng.randint(1, 2)))
+    return {Book._meta.label: books, BOOK_GENRES: genres}
+
+
+def _activity_rows(plan, rng, start, stop):
+    """Orders of buyers start..stop, with their items, reviews and votes, and referrals with commissions"""
+    rows = {label: [] for label in (
+        Order._meta.label, SellerOrder._meta.label, OrderItem._meta.label, Review._meta.label,
+        ReviewVote._meta.label, Referral._meta.label, ReferralClick._meta.label, Commission._meta.label,
+    )}
+    orders, parts, items = rows[Order._meta.label], rows[SellerOrder._meta.label], rows[OrderItem._meta.label]
+    reviews, votes = rows[Review._meta.label], rows[ReviewVote._meta.label]
+    now = plan.now
+
+    for buyer in range(start, stop):
+        user_id = plan.user_id('buyer', buyer)
+        expected = plan.counts['orders'] * plan.buyers.share(buyer) if len(plan.books) else 0
+        placed = sorted(plan.order_time(rng) for _ in range(int(expected) + (rng.random() < expected % 1)))
+        purchases = {}
+        bought = []
+
+        for created in placed:
+            status = _order_status(rng, (now - created).total_seconds() / 86400)
+            picked = {plan.published[plan.books.draw(rng)] for _ in range(rng.choices((1, 2, 3, 4), (50, 30, 15, 5))[0])}
+            lines = [(book, rng.choices((1, 2, 3), (80, 15, 5))[0]) for book in sorted(picked)]
+            method_id, shipping = rng.choices(plan.shipping_methods, [weight for *_, weight in SHIPPING_METHODS])[0]
+            subtotal = sum(Decimal(plan.prices[book]) / 100 * quantity for book, quantity in lines)
+            tax = (subtotal * Decimal('0.08')).quantize(Decimal('0.01'))
+            times = {
+                'created_at': created,
+                'shipped_at': created + timedelta(days=1) if status in ('shipped', 'delivered', 'refunded') else None,
+                'delivered_at': (
+                    min(created + timedelta(days=rng.randint(2, 6), hours=rng.randrange(24)), now)
+                    if status in ('delivered', 'refunded') else None
+                ),
+            }
+            address = {'first_name': 'Buyer', 'last_name': str(buyer), 'street_address': f'{buyer} Main St',
+                       'city': 'Springfield', 'state': 'IL', 'zip_code': '62701', 'country': 'US'}
+            order_id = len(orders)
+            orders.append({
+                'id': order_id,
+                'user_id': user_id,
+                'status': status,
+                'payment_method': rng.choice(('credit_card', 'paypal', 'stripe')),
+                'shipping_address': address,
+                'billing_address': address,
+                'subtotal': subtotal,
+                'shipping_cost': shipping,
+                'tax_amount': tax,
+                'total_amount': subtotal + shipping + tax,
+                'shipping_method_id': method_id,
+                'processing_at': created + timedelta(hours=1) if status not in ('pending', 'cancelled') else None,
+                'cancelled_at': created + timedelta(hours=2) if status == 'cancelled' else None,
+                **times,
+            })
+
+            per_seller = {}
+            for book, quantity in lines:
+                seller_id = plan.book_sellers[book]
+                price = Decimal(plan.prices[book]) / 100
+                if seller_id not in per_seller:
+                    per_seller[seller_id] = len(parts)
+                    parts.append({
+                        'id': len(parts), 'order_id': order_id, 'seller_id': seller_id, 'status': status,
+                        'subtotal': Decimal('0'), 'item_count': 0, **times,
+                    })
+                part = parts[per_seller[seller_id]]
+                part['subtotal'] += price * quantity
+                part['item_count'] += quantity
+                items.append({
+                    'order_id': order_id, 'seller_order_id': per_seller[seller_id], 'book_id': plan.first[Book] + book,
+                    'quantity': quantity, 'unit_price': price, 'total_price': price * quantity,
+                })
+                if status == 'delivered':
+                    purchases.setdefault(book, times['delivered_at'])
+            bought.append(orders[-1])
+
+        for book, delivered_at in purchases.items():
+            if rng.random() >= REVIEW_RATE:
+                continue
+            rating = rng.choices(range(1, 6), RATING_WEIGHTS)[0]
+            created = min(delivered_at + timedelta(days=rng.randrange(1, 30)), now)
+            voters = {
+                plan.user_id('buyer', rng.randrange(plan.counts['buyers'])): 'helpful' if rng.random() < 0.7 else 'not_helpful'
+                for _ in range(min(int(rng.paretovariate(1.5)) - 1, 50))
+            }
+            voters.pop(user_id, None)
+            helpful = sum(1 for vote in voters.values() if vote == 'helpful')
+            review_id = len(reviews)
+            reviews.append({
+                'id': review_id,
+                'user_id': user_id,
+                'book_id': plan.first[Book] + book,
+                'rating': rating,
+                'title': _title(rng),
+                'comment': ' '.join(rng.choice(WORDS) for _ in range(30)),
+                'would_recommend': rating >= 3,
+                'verified_purchase': True,
+                'helpful_count': helpful,
+                'not_helpful_count': len(voters) - helpful,
+                'helpfulness_score': wilson_score(helpful, len(voters) - helpful),
+                'is_approved': rng.random() < 0.97,
+                'created_at': created,
+            })
+            votes.extend(
+                {'review_id': review_id, 'user_id': voter, 'vote_type': vote_type,
+                 'created_at': min(created + timedelta(hours=rng.randrange(1, 720)), now)}
+                for voter, vote_type in voters.items()
+            )
+
+        if rng.random() < REFERRED_RATE:
+            _referral_rows(plan, rng, rows, user_id, bought)
+    return rows
+
+
+def _referral_rows(plan, rng, rows, user_id, orders):
+    affiliate = plan.affiliates.draw(rng)
+    link_id = plan.first[ReferralLink] + affiliate * len(CAMPAIGNS) + rng.randrange(len(CAMPAIGNS))
+    affiliate_id = plan.first[Affiliate] + affiliate
+    converting = [order for order in orders if order['status'] not in ('pending', 'cancelled', 'refunded')]
+    first_seen = orders[0]['created_at'] if orders else plan.now
+    clicked = first_seen - timedelta(seconds=rng.randrange(1, 90 * 86400))
+
+    referral_id = len(rows[Referral._meta.label])
+    rows[Referral._meta.label].append({
+        'id': referral_id,
+        'affiliate_id': affiliate_id,
+        'referral_link_id': link_id,
+        'user_id': user_id,
+        'status': 'converted' if converting else 'registered',
+        'clicked_at': clicked,
+        'registered_at': clicked + timedelta(minutes=rng.randint(1, 30)),
+        'converted_at': converting[0]['created_at'] if converting else None,
+    })
+    rows[ReferralClick._meta.label].extend(
+        {'affiliate_id': affiliate_id, 'referral_link_id': link_id, 'user_id': user_id,
+         'clicked_at': clicked - timedelta(hours=earlier)}
+        for earlier in range(rng.randint(1, 3))
+    )
+    for order in converting:
+        delivered = order['delivered_at']
+        paid = delivered is not None and (plan.now - delivered).days >= PAID_AFTER_DAYS
+        status = 'paid' if paid else 'approved' if delivered else 'pending'
+        rows[Commission._meta.label].append({
+            'affiliate_id': affiliate_id,
+            'referral_id': referral_id,
+            'order_id': order['id'],
+            'amount': max((order['subtotal'] * COMMISSION_RATE / 100).quantize(Decimal('0.01')), Decimal('0.01')),
+            'commission_rate': COMMISSION_RATE,
+            'status': status,
+            'calculated_on': order['subtotal'],
+            'created_at': order['created_at'],
+            'approved_at': delivered if status != 'pending' else None,
+            'paid_at': delivered + timedelta(days=PAID_AFTER_DAYS) if paid else None,
+        })
+
+
+PHASES = {'users': _user_rows, 'books': _book_rows, 'activity': _activity_rows}
+
+# The plan of the generation under way, in this process or a worker
+_plan = None
+
+
+def _set_plan(plan):
+    global _plan
+    _plan = plan
+
+
+def _generate_chunk(task):
+    phase, start, stop = task
+    return PHASES[phase](_plan, random.Random(f'{_plan.seed}:{phase}:{start}'), start, stop)
+
+
+class Generator:
+    def __init__(self, books, seed=0, workers=1, progress=None, **counts):
+        self.counts = {**scale(books), **counts}
+        self.seed = seed
+        self.workers = workers
+        self.progress = progress or (lambda message: None)
+        self.rng = random.Random(seed)
+        self.now = timezone.now()
+        self.written = dict.fromkeys(
+            ('users', 'books', 'orders', 'order_items', 'reviews', 'votes', 'referrals', 'commissions'), 0
+        )
+
+    def run(self):
+        self.plan = Plan(self.counts, self.seed, self.now)
+        with _explicit_timestamps(
+            (Book, 'created_at'), (Order, 'created_at'), (Review, 'created_at'), (ReviewVote, 'created_at'),
+            (Affiliate, 'joined_at'), (ReferralLink, 'created_at'), (Referral, 'clicked_at'), (Commission, 'created_at'),
+        ):
+            self.create_taxonomy()
+            self.create_users()
+            self.create_books()
+            self.create_affiliates()
+            self.create_activity()
+        self.progress('Rebuilding totals, ratings, shelves, search and analytics')
+        self.rebuild_totals()
+        rebuild_derived()
+        _reset_sequences()
+        return {**self.counts, **self.written}
+
+    def _chunks(self, phase, total, size):
+        """Generated rows of each chunk of `phase`, in order"""
+        tasks = [(phase, start, min(start + size, total)) for start in range(0, total, size)]
+        if self.workers <= 1:
+            _set_plan(self.plan)
+            yield from map(_generate_chunk, tasks)
+            return
+
+        # Workers only generate; every write happens here, so they need no database connection
+        with multiprocessing.get_context('fork').Pool(self.workers, _set_plan, (self.plan,)) as pool:
+            pending = deque()
+            for task in tasks:
+                pending.append(pool.apply_async(_generate_chunk, (task,)))
+                # Bounded, so generated chunks don't pile up in memory waiting to be written
+                if len(pending) >= 2 * self.workers:
+                    yield pending.popleft().get()
+            while pending:
+                yield pending.popleft().get()
+
+    def _write(self, rows):
+        with transaction.atomic():
+            for label, objs in rows.items():
+                model = apps.get_model(label)
+                model.objects.bulk_create([model(**row) for row in objs], batch_size=BATCH_SIZE)
+
+    def _first_id(self, model):
+        return (model.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+
+    def create_taxonomy(self):
+        plan = self.plan
+        plan.categories = [Category.objects.get_or_create(name=name)[0].pk for name in CATEGORIES]
+        plan.genres = [Genre.objects.get_or_create(name=name)[0].pk for name in GENRES]
+        plan.shipping_methods = [
+            (ShippingMethod.objects.get_or_create(name=name, defaults={'price': price, 'delivery_days': days})[0].pk, price)
+            for name, price, days, _ in SHIPPING_METHODS
+        ]
+
+    def create_users(self):
+        User.objects.get_or_create(email='staff@example.com', defaults={
+            'username': 'staff@example.com', 'first_name': 'Staff', 'last_name': 'User',
+            'password': self.plan.password, 'is_staff': True, 'is_superuser': True,
+        })
+
+        self.plan.first[User] = self._first_id(User)
+        total = self.counts['sellers'] + self.counts['buyers'] + self.counts['affiliates']
+        for rows in self._chunks('users', total, USER_CHUNK):
+            self._write(rows)
+            self.written['users'] += len(rows[User._meta.label])
+        self.progress(f"Created {self.written['users']} users")
+
+    def create_books(self):
+        plan = self.plan
+        plan.first[Book] = self._first_id(Book)
+        for rows in self._chunks('books', self.counts['books'], BOOK_CHUNK):
+            self._write(rows)
+            for book in rows[Book._meta.label]:
+                if book['is_published']:
+                    plan.published.append(len(plan.prices))
+                plan.prices.append(int(book['price'] * 100))
+                plan.book_sellers.append(book['seller_id'])
+        plan.books = Zipf(len(plan.published), BOOK_POPULARITY)
+        self.written['books'] = len(plan.prices)
+        self.progress(f"Created {self.written['books']} books")
+
+    def create_affiliates(self):
+        plan, rng = self.plan, self.rng
+        plan.first[Affiliate] = self._first_id(Affiliate)
+        plan.first[ReferralLink] = self._first_id(ReferralLink)
+        affiliates, links = [], []
+        for index in range(self.counts['affiliates']):
+            affiliate_id = plan.first[Affiliate] + index
+            joined = self.now - timedelta(seconds=rng.randrange(ORDER_DAYS * 86400, 730 * 86400))
+            affiliates.append(Affiliate(
+                id=affiliate_id, user_id=plan.user_id('affiliate', index), status='approved',
+                commission_rate=COMMISSION_RATE, referral_code=f'AFF{index:07d}',
+                joined_at=joined, approved_at=joined + timedelta(days=1)
+            ))
+            links.extend(
+                ReferralLink(
+                    id=plan.first[ReferralLink] + index * len(CAMPAIGNS) + position, affiliate_id=affiliate_id,
+                    campaign=campaign, url=f'/ref/AFF{index:07d}?campaign={campaign}', created_at=joined
+                )
+                for position, campaign in enumerate(CAMPAIGNS)
+            )
+        with transaction.atomic():
+            Affiliate.objects.bulk_create(affiliates, batch_size=BATCH_SIZE)
+            ReferralLink.objects.bulk_create(links, batch_size=BATCH_SIZE)
+
+    def create_activity(self):
+        plan = self.plan
+        next_id = {label: self._first_id(apps.get_model(label)) for label in NUMBERED}
+        for rows in self._chunks('activity', self.counts['buyers'], BUYER_CHUNK):
+            offsets = dict(next_id)
+            for label, objs in rows.items():
+                for row in objs:
+                    if label in NUMBERED:
+                        row['id'] += offsets[label]
+                    for target, field in NUMBERED.items():
+                        if field in row:
+                            row[field] += offsets[target]
+                if label in NUMBERED:
+                    next_id[label] += len(objs)
+            for order in rows[Order._meta.label]:
+                order['order_number'] = _order_number(order['id'], order['created_at'])
+            for commission in rows[Commission._meta.label]:
+                commission['description'] = f"Commission on order {_order_number(commission['order_id'], commission['created_at'])}"
+            self._write(rows)
+
+            for key, label in (
+                ('orders', Order), ('order_items', OrderItem), ('reviews', Review),
+                ('votes', ReviewVote), ('referrals', Referral), ('commissions', Commission),
+            ):
+                self.written[key] += len(rows[label._meta.label])
+        plan.first.update({apps.get_model(label): first for label, first in next_id.items()})
+        self.progress(f"Created {self.written['orders']} orders with {self.written['order_items']} items, "
+                      f"{self.written['reviews']} reviews and {self.written['commissions']} commissions")
+
+    def rebuild_totals(self):
+        """Sales of the generated books, clicks and conversions of the links, and affiliate earnings"""
+        sold = OrderItem.objects.filter(book=OuterRef('pk')).exclude(order__status='cancelled').order_by().values('book')
+        Book.objects.filter(pk__gte=self.plan.first[Book]).update(
+            total_sales=Coalesce(Subquery(sold.annotate(total=Sum('quantity')).values('total')), 0),
+            total_revenue=Coalesce(
+                Subquery(sold.annotate(total=Sum('total_price')).values('total')),
+                Value(Decimal('0')), output_field=DecimalField(max_digits=12, decimal_places=2)
+            )
+        )
+
+        def count(model, **filters):
+            rows = model.objects.filter(referral_link=OuterRef('pk'), **filters).order_by().values('referral_link')
+            return Coalesce(Subquery(rows.annotate(total=Count('pk')).values('total')), 0, output_field=IntegerField())
+
+        links = ReferralLink.objects.filter(pk__gte=self.plan.first[ReferralLink])
+        links.update(clicks=count(ReferralClick), conversions=count(Referral, status='converted'))
+
+        def earned(*statuses):
+            rows = Commission.objects.filter(affiliate=OuterRef('pk'), status__in=statuses).order_by().values('affiliate')
+            return Coalesce(
+                Subquery(rows.annotate(total=Sum('amount')).values('total')),
+                Value(Decimal('0')), output_field=DecimalField(max_digits=10, decimal_places=2)
+            )
+
+        Affiliate.objects.filter(pk__gte=self.plan.first[Affiliate]).update(
+            total_earnings=earned('pending', 'approved', 'paid'),
+            paid_earnings=earned('paid'),
+            pending_earnings=earned('pending', 'approved'),
+        )
+
+
+def _reset_sequences():
+    """Move the database's key sequences past the explicitly numbered rows (a no-op on SQLite)"""
+    models = [User, UserProfile, Book, Affiliate, ReferralLink, Order, SellerOrder, Review, Referral]
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(no_style(), models):
+            cursor.execute(sql)
+
+
+def rebuild_derived():
+    """Recompute everything the model signals would have maintained"""
+    from analytics.counters import rebuild as rebuild_seller_analytics
+    from analytics.inventory import sync_seller_alerts
+    from analytics.rollups import rollup_days
+    from books.search import rebuild_index
+    from books.shelves import rebuild_all_shelves
+    from reviews.ratings import rebuild as rebuild_ratings
+
+    rebuild_index()
+    rebuild_ratings()
+    rebuild_all_shelves()
+    rebuild_seller_analytics()
+    sync_seller_alerts()
+    today = timezone.localdate()
+    rollup_days(today - timedelta(days=ORDER_DAYS), today)
+    cache.clear()
+
+
+def generate(books, seed=0, workers=1, progress=None, **counts):
+    """
+    Fill the database with a marketplace of `books` books; `counts` overrides
+    scale()'s sellers, buyers, affiliates or (expected) orders. Returns the
+    planned counts with the numbers of rows written.
+    """
+    return Generator(books, seed, workers, progress, **counts).run()
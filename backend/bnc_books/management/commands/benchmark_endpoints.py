@@ -0,0 +1,61 @@
+from django.core.management.base import BaseCommand, CommandError
+from bnc_books import benchmark
+
+class Command(BaseCommand):
+    help = ('Time every API endpoint and count its SQL queries against generated datasets of several sizes, '
+            'on a scratch database, and compare the results with the checked-in budgets')
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default=','.join(map(str, benchmark.DEFAULT_SIZES)),
+                            help='Comma separated catalog sizes, in books (default 1000,10000,100000)')
+        parser.add_argument('--repeat', type=int, default=benchmark.DEFAULT_REPEAT,
+                            help='Requests per endpoint and size; the median time is reported')
+        parser.add_argument('--endpoint', action='append', dest='endpoints',
+                            help='Only benchmark endpoints whose name starts with this (may be repeated)')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--write-budgets', action='store_true',
+                            help='Replace the budgets with the measured results (with headroom for time)')
+    
+    def handle(self, *args, **options):
+        try:
+            sizes = sorted({int(size) for size in options['sizes'].split(',')})
+        except ValueError:
+            raise CommandError('--sizes must be comma separated numbers of books')
+        if options['repeat'] < 1:
+            raise CommandError('--repeat must be at least 1')
+        
+        uncovered = benchmark.uncovered_routes()
+        if uncovered:
+            raise CommandError(f"Routes without a benchmarked request: {', '.join(uncovered)}")
+        
+        endpoints = benchmark.ENDPOINTS
+        if options['endpoints']:
+            endpoints = [
+                endpoint for endpoint in endpoints
+                if endpoint.name.startswith(tuple(options['endpoints']))
+            ]
+            if not endpoints:
+                raise CommandError('No endpoint matches --endpoint')
+        
+        with benchmark.scratch_database():
+            results = benchmark.run(sizes, options['repeat'], endpoints, options['seed'], progress=self.stdout.write)
+        
+        if options['write_budgets']:
+            failed = sorted({
+                result.endpoint.name
+                for size_results in results.values() for result in size_results if not result.ok
+            })
+            if failed:
+                self.stdout.write(benchmark.format_table(results))
+                raise CommandError(f"Not writing budgets, unexpected responses from: {', '.join(failed)}")
+            budgets = benchmark.write_budgets(results)
+            self.stdout.write(benchmark.format_table(results, budgets))
+            self.stdout.write(self.style.SUCCESS(f'Wrote {len(budgets)} budgets to {benchmark.BUDGETS_PATH}'))
+            return
+        
+        budgets = benchmark.load_budgets()
+        self.stdout.write(benchmark.format_table(results, budgets))
+        problems = benchmark.check(results, budgets)
+        if problems:
+            raise CommandError('Budgets exceeded:\n' + '\n'.join(problems))
+        self.stdout.write(self.style.SUCCESS(f'{len(endpoints)} endpoints within budget at {len(sizes)} sizes'))
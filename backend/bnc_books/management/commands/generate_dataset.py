@@ -0,0 +1,45 @@
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from books.models import Book
+from orders.models import Order
+from bnc_books import dataset
+
+class Command(BaseCommand):
+    help = ('Fill the database with a synthetic marketplace: users, books, orders, reviews, votes, affiliates, '
+            'referrals and commissions, with Zipfian popularity and seasonal order volume. '
+            f'Every generated user signs in with the password {dataset.PASSWORD}')
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--books', type=int, default=10000,
+                            help='Catalog size; the other counts default to proportions of it (default 10000)')
+        parser.add_argument('--sellers', type=int)
+        parser.add_argument('--buyers', type=int)
+        parser.add_argument('--affiliates', type=int)
+        parser.add_argument('--orders', type=int, help='Expected number of orders; the number written varies a little')
+        parser.add_argument('--seed', type=int, default=0, help='The same seed always generates the same data')
+        parser.add_argument('--workers', type=int, default=1,
+                            help='Processes generating rows in parallel; rows are still written by one (default 1)')
+        parser.add_argument('--flush', action='store_true',
+                            help='Delete ALL data in the database first, instead of refusing to add to a catalog')
+    
+    def handle(self, *args, **options):
+        counts = {name: options[name] for name in ('sellers', 'buyers', 'affiliates', 'orders') if options[name] is not None}
+        if options['books'] < 1 or any(value < 1 for value in counts.values()):
+            raise CommandError('Counts must be at least 1')
+        if options['workers'] < 1:
+            raise CommandError('--workers must be at least 1')
+        
+        if options['flush']:
+            call_command('flush', interactive=False, verbosity=0)
+        elif Book.objects.exists() or Order.objects.exists():
+            raise CommandError('The database already has books or orders; use --flush to replace everything')
+        
+        started = time.monotonic()
+        written = dataset.generate(
+            options['books'], seed=options['seed'], workers=options['workers'], progress=self.stdout.write, **counts
+        )
+        for name in ('users', 'books', 'orders', 'order_items', 'reviews', 'votes', 'referrals', 'commissions'):
+            self.stdout.write(f"{name.replace('_', ' ').capitalize():<12} {written[name]:>10}")
+        self.stdout.write(self.style.SUCCESS(f'Generated the dataset in {time.monotonic() - started:.0f}s'))
@@ -0,0 +1,30 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from bnc_books import replicas
+
+class Command(BaseCommand):
+    help = ('Copy the default SQLite database over the read replica (settings.READ_REPLICA), once or every '
+            '--interval seconds. Stand-in for real replication when running locally')
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--database', help='Replica alias to copy to (default: settings.READ_REPLICA)')
+        parser.add_argument('--interval', type=float, default=0,
+                            help='Keep copying, this many seconds apart; keep it below READ_REPLICA_STICKY_SECONDS')
+    
+    def handle(self, *args, **options):
+        if options['interval'] < 0:
+            raise CommandError('--interval must not be negative')
+        
+        while True:
+            started = time.monotonic()
+            try:
+                path = replicas.sync_sqlite_replica(options['database'])
+            except ValueError as e:
+                raise CommandError(str(e))
+            self.stdout.write(self.style.SUCCESS(
+                f'Copied the database to {path} in {(time.monotonic() - started) * 1000:.0f}ms'
+            ))
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,325 @@
+"""
+Per-route request metrics: latency, SQL, response size and errors.
+
+MetricsMiddleware times every request. It counts the SQL statements the
+request ran and their time, using an execute wrapper on each database
+connection, and records the response size and status. Requests are
+grouped by URL pattern and method (e.g. GET api/books/<int:pk>/), not by
+raw path, and at most METRICS_MAX_ROUTES groups are kept. Later routes
+fall into a single "<other>" group. Latency is kept as a fixed-bucket
+histogram, so memory stays bounded however many requests are served.
+
+Each worker process keeps its own store. Every METRICS_PUBLISH_INTERVAL
+seconds it publishes a snapshot to the cache (METRICS_CACHE_ALIAS), and
+collect() merges the snapshots of every worker seen within WORKER_TTL.
+Snapshots only add up across processes when that cache is shared (e.g.
+Redis or Memcached). With the default local-memory cache each process
+reports only itself.
+
+SystemHealthView reports p50/p95/p99 from the merged histograms, and
+metrics_view exports them in the Prometheus text format.
+"""
+import os
+import socket
+import threading
+import time
+import uuid
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+
+# Upper bounds of the latency histogram buckets, in milliseconds
+LATENCY_BUCKETS = (5, 10, 25, 50, 75, 100, 150, 250, 500, 750, 1000, 2500, 5000, 10000)
+STATUS_CLASSES = ('2xx', '3xx', '4xx', '5xx')
+OTHER_ROUTE = '<other>'
+UNMATCHED_ROUTE = '<unmatched>'
+WORKERS_KEY = 'metrics:workers'
+WORKER_KEY_PREFIX = 'metrics:worker:'
+# A worker that has not published for this long is left out
+WORKER_TTL = 5 * 60
+
+
+def _max_routes():
+    return getattr(settings, 'METRICS_MAX_ROUTES', 200)
+
+
+def _publish_interval():
+    return getattr(settings, 'METRICS_PUBLISH_INTERVAL', 10)
+
+
+def _cache():
+    return caches[getattr(settings, 'METRICS_CACHE_ALIAS', 'default')]
+
+
+def _empty_route():
+    return {
+        'requests': 0,
+        'statuses': dict.fromkeys(STATUS_CLASSES, 0),
+        'latency_buckets': [0] * (len(LATENCY_BUCKETS) + 1),
+        'latency_ms': 0.0,
+        'sql_queries': 0,
+        'sql_ms': 0.0,
+        'max_sql_queries': 0,
+        'response_bytes': 0,
+    }
+
+
+def _bucket(duration_ms):
+    for index, bound in enumerate(LATENCY_BUCKETS):
+        if duration_ms <= bound:
+            return index
+    return len(LATENCY_BUCKETS)
+
+
+class MetricsStore:
+    """Thread-safe per-route totals of one worker process"""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = {}
+        self.started = time.time()
+        self.worker_id = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+        self._published = time.monotonic()
+
+    def observe(self, route, method, status_code, duration_ms, sql_queries=0, sql_ms=0.0, response_bytes=0):
+        """Record one request; returns True when a snapshot is due to be published"""
+        key = f'{method} {route}'
+        with self._lock:
+            stats = self._routes.get(key)
+            if stats is None:
+                if len(self._routes) >= _max_routes():
+                    key = f'{method} {OTHER_ROUTE}'
+                    stats = self._routes.get(key)
+                if stats is None:
+                    stats = self._routes[key] = _empty_route()
+            stats['requests'] += 1
+            status_class = f'{min(max(status_code // 100, 2), 5)}xx'
+            stats['statuses'][status_class] += 1
+            stats['latency_buckets'][_bucket(duration_ms)] += 1
+            stats['latency_ms'] += duration_ms
+            stats['sql_queries'] += sql_queries
+            stats['sql_ms'] += sql_ms
+            stats['max_sql_queries'] = max(stats['max_sql_queries'], sql_queries)
+            stats['response_bytes'] += response_bytes
+            return time.monotonic() - self._published >= _publish_interval()
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'started': self.started,
+                'routes': {
+                    key: {**stats, 'statuses': dict(stats['statuses']), 'latency_buckets': list(stats['latency_buckets'])}
+                    for key, stats in self._routes.items()
+                },
+            }
+
+    def reset(self):
+        with self._lock:
+            self._routes = {}
+
+    def publish(self):
+        """Share this worker's snapshot with the other workers through the cache"""
+        self._published = time.monotonic()
+        cache = _cache()
+        now = time.time()
+        cache.set(WORKER_KEY_PREFIX + self.worker_id, self.snapshot(), WORKER_TTL)
+        # Concurrent publishes may drop each other's entry; each worker
+        # re-registers on its next publish
+        workers = {
+            worker_id: seen for worker_id, seen in (cache.get(WORKERS_KEY) or {}).items()
+            if now - seen < WORKER_TTL
+        }
+        workers[self.worker_id] = now
+        cache.set(WORKERS_KEY, workers, WORKER_TTL)
+
+
+store = MetricsStore()
+
+
+def merge(snapshots):
+    """Add up worker snapshots route by route"""
+    routes = {}
+    for snapshot in snapshots:
+        for key, stats in snapshot['routes'].items():
+            total = routes.setdefault(key, _empty_route())
+            for field in ('requests', 'latency_ms', 'sql_queries', 'sql_ms', 'response_bytes'):
+                total[field] += stats[field]
+            total['max_sql_queries'] = max(total['max_sql_queries'], stats['max_sql_queries'])
+            for status_class in STATUS_CLASSES:
+                total['statuses'][status_class] += stats['statuses'][status_class]
+            total['latency_buckets'] = [a + b for a, b in zip(total['latency_buckets'], stats['latency_buckets'])]
+    return {
+        'started': min((snapshot['started'] for snapshot in snapshots), default=time.time()),
+        'workers': len(snapshots),
+        'routes': routes,
+    }
+
+
+def collect():
+    """Metrics of every live worker, merged. This worker's are always current."""
+    cache = _cache()
+    workers = [worker_id for worker_id in (cache.get(WORKERS_KEY) or {}) if worker_id != store.worker_id]
+    snapshots = list(cache.get_many([WORKER_KEY_PREFIX + worker_id for worker_id in workers]).values())
+    snapshots.append(store.snapshot())
+    return merge(snapshots)
+
+
+def percentile(buckets, fraction):
+    """Estimate a latency percentile (ms) from histogram bucket counts"""
+    total = sum(buckets)
+    if not total:
+        return 0.0
+    rank = fraction * total
+    seen = 0
+    for index, count in enumerate(buckets):
+        if count and seen + count >= rank:
+            lower = LATENCY_BUCKETS[index - 1] if index else 0
+            upper = LATENCY_BUCKETS[index] if index < len(LATENCY_BUCKETS) else LATENCY_BUCKETS[-1]
+            return round(lower + (upper - lower) * (rank - seen) / count, 2)
+        seen += count
+    return float(LATENCY_BUCKETS[-1])
+
+
+def summarize(stats):
+    """Averages, error rate (% of 5xx) and p50/p95/p99 latency of route totals"""
+    requests = stats['requests']
+    if not requests:
+        return {'requests': 0, 'error_rate': 0, 'avg_ms': 0, 'p50_ms': 0, 'p95_ms': 0, 'p99_ms': 0,
+                'avg_sql_queries': 0, 'max_sql_queries': 0, 'avg_sql_ms': 0, 'avg_response_bytes': 0}
+    return {
+        'requests': requests,
+        'error_rate': round(stats['statuses']['5xx'] / requests * 100, 2),
+        'avg_ms': round(stats['latency_ms'] / requests, 2),
+        'p50_ms': percentile(stats['latency_buckets'], 0.50),
+        'p95_ms': percentile(stats['latency_buckets'], 0.95),
+        'p99_ms': percentile(stats['latency_buckets'], 0.99),
+        'avg_sql_queries': round(stats['sql_queries'] / requests, 2),
+        'max_sql_queries': stats['max_sql_queries'],
+        'avg_sql_ms': round(stats['sql_ms'] / requests, 2),
+        'avg_response_bytes': round(stats['response_bytes'] / requests),
+    }
+
+
+def totals(routes):
+    """All routes added up, in the shape of a single route"""
+    return merge([{'started': 0, 'routes': {'all': stats}} for stats in routes.values()])['routes'].get(
+        'all', _empty_route()
+    )
+
+
+class QueryCounter:
+    """Execute wrapper counting the statements a request runs, and their time"""
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.seconds += time.perf_counter() - start
+
+
+def _route(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.route if match is not None and match.route else UNMATCHED_ROUTE
+
+
+class MetricsMiddleware:
+    """Records each request in the metrics store. Goes first in MIDDLEWARE."""
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not getattr(settings, 'METRICS_ENABLED', True):
+            return self.get_response(request)
+
+        queries = QueryCounter()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(queries))
+            response = self.get_response(request)
+        duration_ms = (time.perf_counter() - start) * 1000
+
+        size = 0 if response.streaming else len(response.content)
+        if store.observe(
+            _route(request), request.method, response.status_code, duration_ms,
+            queries.count, queries.seconds * 1000, size
+        ):
+            store.publish()
+        return response
+
+
+def _label_value(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(key, **extra):
+    method, route = key.split(' ', 1)
+    labels = {'method': method, 'route': route, **extra}
+    return '{' + ','.join(f'{name}="{_label_value(value)}"' for name, value in labels.items()) + '}'
+
+
+def render_prometheus(metrics):
+    """The merged metrics in the Prometheus text exposition format"""
+    routes = sorted(metrics['routes'].items())
+    lines = [
+        '# HELP bnc_http_request_duration_seconds Request latency by route.',
+        '# TYPE bnc_http_request_duration_seconds histogram',
+    ]
+    for key, stats in routes:
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS, stats['latency_buckets']):
+            cumulative += count
+            lines.append(f'bnc_http_request_duration_seconds_bucket{_labels(key, le=bound / 1000)} {cumulative}')
+        lines.append(f'bnc_http_request_duration_seconds_bucket{_labels(key, le="+Inf")} {stats["requests"]}')
+        lines.append(f'bnc_http_request_duration_seconds_sum{_labels(key)} {stats["latency_ms"] / 1000}')
+        lines.append(f'bnc_http_request_duration_seconds_count{_labels(key)} {stats["requests"]}')
+
+    lines += ['# HELP bnc_http_responses_total Responses by route and status class.',
+              '# TYPE bnc_http_responses_total counter']
+    for key, stats in routes:
+        for status_class, count in stats['statuses'].items():
+            lines.append(f'bnc_http_responses_total{_labels(key, status=status_class)} {count}')
+
+    counters = (
+        ('bnc_db_queries_total', 'SQL statements run by requests, by route.', lambda stats: stats['sql_queries']),
+        ('bnc_db_query_duration_seconds_total', 'Time spent in SQL by requests, by route.',
+         lambda stats: stats['sql_ms'] / 1000),
+        ('bnc_http_response_bytes_total', 'Response body bytes, by route.', lambda stats: stats['response_bytes']),
+    )
+    for name, help_text, value in counters:
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+        lines += [f'{name}{_labels(key)} {value(stats)}' for key, stats in routes]
+
+    lines += [
+        '# HELP bnc_process_start_time_seconds Start time of the oldest reporting worker.',
+        '# TYPE bnc_process_start_time_seconds gauge',
+        f'bnc_process_start_time_seconds {metrics["started"]}',
+        '# HELP bnc_workers Worker processes included in these metrics.',
+        '# TYPE bnc_workers gauge',
+        f'bnc_workers {metrics["workers"]}',
+    ]
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view(request):
+    """
+    Prometheus scrape endpoint. Open to staff sessions, and to
+    `Authorization: Bearer <METRICS_SCRAPE_TOKEN>` when that setting is set.
+    """
+    token = getattr(settings, 'METRICS_SCRAPE_TOKEN', None)
+    authorization = request.META.get('HTTP_AUTHORIZATION', '')
+    allowed = (
+        getattr(request, 'user', None) is not None and request.user.is_staff
+        or bool(token) and constant_time_compare(authorization, f'Bearer {token}')
+    )
+    if not allowed:
+        return HttpResponseForbidden('Forbidden\n')
+    return HttpResponse(render_prometheus(collect()), content_type='text/plain; version=0.0.4; charset=utf-8')
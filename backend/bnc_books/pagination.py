@@ -0,0 +1,154 @@
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import PageNumberPagination, CursorPagination, Cursor
+
+class KeysetPagination(CursorPagination):
+    """
+    Keyset pagination over (created_at, id), newest first.
+
+    Each page is a plain range scan starting after the last row of the
+    previous page, so there is no COUNT(*) and no OFFSET: page 500 costs the
+    same as page 1, and rows inserted while a client is scrolling never shift
+    the pages it has not fetched yet.
+    """
+    ordering = ('-created_at', '-id')
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.cursor = self.decode_cursor(request)
+        reverse = bool(self.cursor and self.cursor.reverse)
+        current_position = self.cursor.position if self.cursor else None
+
+        # Walking backwards means reading the index in ascending order
+        if reverse:
+            queryset = queryset.order_by('created_at', 'id')
+        else:
+            queryset = queryset.order_by('-created_at', '-id')
+
+        if current_position is not None:
+            created_at, pk = self._parse_position(current_position)
+            if reverse:
+                queryset = queryset.filter(
+                    Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk)
+                )
+            else:
+                queryset = queryset.filter(
+                    Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+                )
+
+        # Fetch one extra row to find out whether another page follows
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        has_following = len(results) > len(self.page)
+
+        if reverse:
+            self.page = list(reversed(self.page))
+            self.has_next = current_position is not None
+            self.has_previous = has_following
+        else:
+            self.has_next = has_following
+            self.has_previous = current_position is not None
+
+        if self.page:
+            self.next_position = self._get_position_from_instance(self.page[-1], self.ordering)
+            self.previous_position = self._get_position_from_instance(self.page[0], self.ordering)
+
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=self.next_position))
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=self.previous_position))
+
+    def _get_position_from_instance(self, instance, ordering):
+        if isinstance(instance, dict):
+            return f"{instance['created_at'].isoformat()}|{instance['id']}"
+        return f"{instance.created_at.isoformat()}|{instance.pk}"
+
+    def _parse_position(self, position):
+        try:
+            created_at, pk = position.rsplit('|', 1)
+            created_at = parse_datetime(created_at)
+            pk = int(pk)
+        except (AttributeError, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+
+        if created_at is None:
+            raise NotFound(self.invalid_cursor_message)
+        return created_at, pk
+
+class CountedPaginator(Paginator):
+    """A Paginator that uses a count the caller already knows instead of COUNT(*)"""
+    def __init__(self, object_list, per_page, count=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        if count is not None:
+            self.__dict__['count'] = count
+
+class StandardPagination(PageNumberPagination):
+    """
+    Page-number pagination with an opt-in keyset mode.
+
+    Clients get the usual ?page= behaviour by default. Sending
+    ?pagination=cursor (or following a ?cursor= link) switches the request
+    to KeysetPagination, which drops the count and numbered pages in exchange
+    for constant-cost deep pages.
+
+    Views can opt out of keyset mode for an ordering other than newest first
+    (`keyset_pagination = False`), and can skip the COUNT(*) by returning
+    the number of results from `get_result_count()` (None to count).
+    """
+    mode_query_param = 'pagination'
+    keyset_class = KeysetPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if self.wants_keyset(request) and getattr(view, 'keyset_pagination', True):
+            self.keyset = self.keyset_class()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        self.known_count = view.get_result_count() if hasattr(view, 'get_result_count') else None
+        return super().paginate_queryset(queryset, request, view)
+
+    def django_paginator_class(self, object_list, per_page):
+        return CountedPaginator(object_list, per_page, count=self.known_count)
+
+    def wants_keyset(self, request):
+        return (
+            request.query_params.get(self.mode_query_param) == 'cursor'
+            or self.keyset_class.cursor_query_param in request.query_params
+        )
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_html_context(self):
+        if self.keyset is not None:
+            return self.keyset.get_html_context()
+        return super().get_html_context()
+
+    def get_schema_operation_parameters(self, view):
+        parameters = super().get_schema_operation_parameters(view)
+        parameters.extend(self.keyset_class().get_schema_operation_parameters(view))
+        parameters.append({
+            'name': self.mode_query_param,
+            'required': False,
+            'in': 'query',
+            'description': 'Set to "cursor" to use keyset pagination.',
+            'schema': {'type': 'string', 'enum': ['cursor']},
+        })
+        return parameters
@@ -0,0 +1,151 @@
+"""
+Read replica routing.
+
+settings.READ_REPLICA names a database alias holding a copy of `default`
+(None, the default, turns routing off). Writes always go to `default`. Reads
+go to the replica only inside replica_reads(), which is entered by:
+
+- APIViews that opt in with ReplicaReadMixin (catalog and review listings,
+  seller, affiliate and platform analytics), for their GET and HEAD requests;
+- the report worker, while it runs a report's queries (analytics.jobs).
+
+A replica lags behind `default`, so a user's reads stay on `default` for
+READ_REPLICA_STICKY_SECONDS after any request of theirs that wrote
+(ReplicaPinMiddleware): they always see their own changes. Pins are kept in
+the default cache, which must be shared by all processes for them to hold
+across processes. Reads inside a transaction on `default` stay on it too.
+
+Locally, `manage.py sync_replica --interval 5` keeps a SQLite replica in
+sync by copying the database with SQLite's online backup.
+"""
+import contextvars
+import os
+import sqlite3
+from contextlib import contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework.permissions import SAFE_METHODS
+
+PIN_PREFIX = 'replica:pinned:'
+
+_reads = contextvars.ContextVar('replica_reads', default=False)
+
+
+def replica_alias():
+    """The configured replica alias, or None when routing is off"""
+    alias = getattr(settings, 'READ_REPLICA', None)
+    return alias if alias in settings.DATABASES else None
+
+
+def _sticky_seconds():
+    return getattr(settings, 'READ_REPLICA_STICKY_SECONDS', 30)
+
+
+@contextmanager
+def replica_reads(enabled=True):
+    """Route reads in this block to the replica (or, with enabled=False, back to `default`)"""
+    token = _reads.set(enabled)
+    try:
+        yield
+    finally:
+        _reads.reset(token)
+
+
+def pin(user):
+    """Keep `user`'s reads on `default` while the replica catches up with their write"""
+    cache.set(f'{PIN_PREFIX}{user.pk}', True, _sticky_seconds())
+
+
+def is_pinned(user):
+    return bool(user and user.is_authenticated and cache.get(f'{PIN_PREFIX}{user.pk}'))
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        alias = replica_alias()
+        if alias and _reads.get() and not connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return alias
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        # Explicit, or saving an object read from the replica would write to it
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, replica_alias()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+
+class ReplicaReadMixin:
+    """
+    Serve an APIView's GET and HEAD requests from the replica, unless the user
+    has written recently. Not for VersionedCacheMixin views: a response built
+    from a lagging replica would be cached as current.
+    """
+    _replica_token = None
+
+    def initial(self, request, *args, **kwargs):
+        # Authentication and permission checks read from `default`
+        super().initial(request, *args, **kwargs)
+        if request.method in SAFE_METHODS and replica_alias() and not is_pinned(request.user):
+            self._replica_token = _reads.set(True)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if self._replica_token is not None:
+            _reads.reset(self._replica_token)
+            self._replica_token = None
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class ReplicaPinMiddleware:
+    """Pins the user after a successful POST, PUT, PATCH or DELETE. Goes after AuthenticationMiddleware."""
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        # DRF puts token-authenticated users on the request too
+        if request.method not in SAFE_METHODS and response.status_code < 400 and replica_alias():
+            user = getattr(request, 'user', None)
+            if user is not None and user.is_authenticated:
+                pin(user)
+        return response
+
+
+def copy_database(source, path):
+    """
+    Copy the SQLite database behind connection `source` to `path`, replacing
+    it in one rename: connections already reading the old copy keep it, new
+    ones open the new one.
+    """
+    path = Path(path)
+    partial = path.with_name(path.name + '.sync')
+    source.ensure_connection()
+    target = sqlite3.connect(partial)
+    try:
+        source.connection.backup(target)
+    finally:
+        target.close()
+    os.replace(partial, path)
+
+
+def sync_sqlite_replica(alias=None):
+    """Copy `default` over the SQLite replica `alias` (the configured one by default)"""
+    alias = alias or replica_alias()
+    source = connections[DEFAULT_DB_ALIAS]
+    if alias is None:
+        raise ValueError('No read replica is configured (settings.READ_REPLICA)')
+    if alias not in settings.DATABASES:
+        raise ValueError(f'Unknown database {alias!r}')
+    if source.vendor != 'sqlite' or connections[alias].vendor != 'sqlite':
+        raise ValueError("Only SQLite databases can be copied; use the database's own replication")
+    path = Path(connections[alias].settings_dict['NAME'])
+    if path.resolve() == Path(source.settings_dict['NAME']).resolve():
+        raise ValueError(f'The replica {alias!r} is the default database itself')
+    copy_database(source, path)
+    return path
@@ -0,0 +1,47 @@
+from django.db.models import Prefetch
+
+class EagerLoadingMixin:
+    """
+    Lets a serializer declare the relations it reads, so views can load them
+    up front instead of issuing one query per row.
+
+    - `select_related_fields` / `prefetch_related_fields`: relation paths
+      relative to the serializer's model.
+    - `nested_select_related`: {'fk field': Serializer} for nested serializers
+      on forward relations; their own paths are joined in under the prefix.
+    - `nested_prefetch_related`: {'related name': Serializer} for nested
+      many=True serializers; each becomes a Prefetch whose queryset is set
+      up by the nested serializer.
+    """
+    select_related_fields = ()
+    prefetch_related_fields = ()
+    nested_select_related = {}
+    nested_prefetch_related = {}
+
+    @classmethod
+    def get_select_related(cls, prefix=''):
+        paths = [prefix + path for path in cls.select_related_fields]
+        for field, serializer in cls.nested_select_related.items():
+            paths.append(prefix + field)
+            paths.extend(serializer.get_select_related(prefix + field + '__'))
+        return paths
+
+    @classmethod
+    def get_prefetch_related(cls, prefix=''):
+        lookups = [prefix + path for path in cls.prefetch_related_fields]
+        for field, serializer in cls.nested_select_related.items():
+            lookups.extend(serializer.get_prefetch_related(prefix + field + '__'))
+        for field, serializer in cls.nested_prefetch_related.items():
+            queryset = serializer.setup_eager_loading(serializer.Meta.model.objects.all())
+            lookups.append(Prefetch(prefix + field, queryset=queryset))
+        return lookups
+
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        select_related = cls.get_select_related()
+        prefetch_related = cls.get_prefetch_related()
+        if select_related:
+            queryset = queryset.select_related(*select_related)
+        if prefetch_related:
+            queryset = queryset.prefetch_related(*prefetch_related)
+        return queryset
@@ -35,13 +35,16 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so its timings cover the whole request
+    'bnc_books.metrics.MetricsMiddleware',
     'corsheaders.middleware.CorsMiddleware', 
-    'affiliates.middleware.ReferralTrackingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'bnc_books.replicas.ReplicaPinMiddleware',
+    'affiliates.middleware.ReferralTrackingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -70,9 +73,80 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # Take the write lock when a transaction starts and wait for it,
+            # instead of failing with "database is locked" when two
+            # transactions that read first (e.g. checkouts) both try to write
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
+        # A file rather than the default in-memory database, so tests that
+        # run concurrent transactions see real SQLite locking
+        'TEST': {
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        },
+    },
+    # A copy of `default` that catalog, review and analytics reads are
+    # served from when READ_REPLICA is set (bnc_books.replicas). Locally, a
+    # second SQLite file kept in sync by `manage.py sync_replica --interval 5`
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.environ.get('READ_REPLICA_NAME', BASE_DIR / 'db.replica.sqlite3'),
+        'OPTIONS': {
+            'timeout': 20,
+        },
+        'TEST': {
+            'MIRROR': 'default',
+        },
+    },
+}
+
+DATABASE_ROUTERS = ['bnc_books.replicas.ReplicaRouter']
+
+# Reads are routed to the replica only when its file is configured. After a
+# write, a user's reads stay on `default` for READ_REPLICA_STICKY_SECONDS,
+# which must cover the replica's lag (the sync interval, locally).
+READ_REPLICA = 'replica' if os.environ.get('READ_REPLICA_NAME') else None
+READ_REPLICA_STICKY_SECONDS = 30
+
+# Cache used by the versioned response cache (bnc_books.cache). LocMemCache
+# is per-process: run several workers against a shared backend (file-based,
+# Redis or Memcached) so version bumps are seen by every worker.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'bnc-books',
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
     }
 }
 
+# Entries are invalidated by version bumps; the timeout only bounds how long
+# unused entries linger.
+RESPONSE_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Book view and add-to-cart counters are buffered in memory and written once
+# the buffer is this many seconds old or holds this many (book, day) keys.
+COUNTER_FLUSH_INTERVAL = 30
+COUNTER_FLUSH_SIZE = 1000
+
+# Referral clicks are buffered the same way (this many seconds or clicks);
+# active referral codes are cached in memory for REFERRAL_CODE_CACHE_TTL seconds.
+REFERRAL_CLICK_FLUSH_INTERVAL = 30
+REFERRAL_CLICK_FLUSH_SIZE = 500
+REFERRAL_CODE_CACHE_TTL = 60
+
+# Per-route request metrics (bnc_books.metrics). Each worker publishes its
+# totals to METRICS_CACHE_ALIAS every METRICS_PUBLISH_INTERVAL seconds; use a
+# shared cache in production so /metrics/ and system health cover every worker.
+METRICS_ENABLED = True
+METRICS_MAX_ROUTES = 200
+METRICS_PUBLISH_INTERVAL = 10
+METRICS_CACHE_ALIAS = 'default'
+# Lets Prometheus scrape /metrics/ with "Authorization: Bearer <token>"
+METRICS_SCRAPE_TOKEN = os.environ.get('METRICS_SCRAPE_TOKEN')
+
 AUTHENTICATION_BACKENDS = [
     'accounts.auth_backend.EmailBackend',
     'django.contrib.auth.backends.ModelBackend',
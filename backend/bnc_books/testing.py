@@ -0,0 +1,36 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+class QueryScalingAssertionsMixin:
+    """
+    TestCase mixin for catching N+1 queries on listing endpoints.
+
+    assertQueriesDoNotScale() renders the same endpoint at several data sizes
+    and fails if the number of SQL queries changes with the number of rows.
+    """
+    query_scaling_sizes = (1, 5, 10)
+
+    def assertQueriesDoNotScale(self, fetch, grow, sizes=None):
+        """
+        `grow(n)` must bring the listed data up to `n` rows and `fetch()` must
+        request the endpoint and return the response.
+        """
+        counts = {}
+        captured = {}
+        for size in sizes or self.query_scaling_sizes:
+            grow(size)
+            with CaptureQueriesContext(connection) as context:
+                response = fetch()
+            self.assertEqual(response.status_code, 200, getattr(response, 'data', response))
+            counts[size] = len(context.captured_queries)
+            captured[size] = [query['sql'] for query in context.captured_queries]
+
+        if len(set(counts.values())) > 1:
+            largest = max(counts)
+            self.fail(
+                'Query count grows with page size: %s\nQueries at %d rows:\n%s' % (
+                    ', '.join(f'{size} rows -> {count} queries' for size, count in counts.items()),
+                    largest,
+                    '\n'.join(captured[largest])
+                )
+            )
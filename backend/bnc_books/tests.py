@@ -0,0 +1,262 @@
+import sqlite3
+import tempfile
+from datetime import date, timedelta
+from io import StringIO
+from pathlib import Path
+import random
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection, connections, transaction
+from django.db.models import Sum
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from accounts.models import User
+from affiliates.models import Commission
+from analytics.counters import COUNTED_STATUSES
+from analytics.jobs import request_report, run_pending
+from analytics.models import BookPerformance, SellerAnalytics
+from books.models import Book, Category
+from books.tests import make_book, make_seller
+from orders.models import Order, OrderItem, SellerOrder
+from reviews.models import Review, ReviewVote
+from . import benchmark, dataset, replicas
+from .batching import chunked
+
+class DatasetTests(TransactionTestCase):
+    def test_generates_proportional_consistent_data(self):
+        counts = dataset.generate(200, seed=1)
+        
+        self.assertEqual(Book.objects.count(), 200)
+        self.assertEqual(Order.objects.count(), counts['orders'])
+        self.assertEqual(OrderItem.objects.count(), counts['order_items'])
+        self.assertEqual(ReviewVote.objects.count(), counts['votes'])
+        self.assertEqual(Commission.objects.count(), counts['commissions'])
+        # Orders come out close to the expected number
+        self.assertAlmostEqual(counts['orders'], dataset.scale(200)['orders'], delta=dataset.scale(200)['orders'] // 2)
+        # Every order is split per seller, and the bypassed signals' work is rebuilt
+        self.assertFalse(Order.objects.filter(seller_orders__isnull=True).exists())
+        self.assertAlmostEqual(
+            SellerOrder.objects.aggregate(total=Sum('subtotal'))['total'],
+            Order.objects.aggregate(total=Sum('subtotal'))['total'],
+            places=2
+        )
+        self.assertEqual(
+            Book.objects.aggregate(total=Sum('review_count'))['total'],
+            Review.objects.filter(is_approved=True).count()
+        )
+        self.assertEqual(
+            Book.objects.aggregate(total=Sum('total_sales'))['total'],
+            OrderItem.objects.exclude(order__status='cancelled').aggregate(total=Sum('quantity'))['total']
+        )
+    
+    def test_derived_data_is_rebuilt_past_the_query_parameter_limit(self):
+        # Lower SQLite's limit on query parameters (250000 by default), still
+        # above what Django's bulk queries use, so that a couple of thousand
+        # books go past it as millions would past the default
+        connection.ensure_connection()
+        limit = connection.connection.getlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER)
+        connection.connection.setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, 2000)
+        try:
+            dataset.generate(2200, seed=3)
+        finally:
+            connection.connection.setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, limit)
+        
+        self.assertEqual(BookPerformance.objects.count(), OrderItem.objects.filter(
+            order__status__in=COUNTED_STATUSES
+        ).values('book').distinct().count())
+        self.assertEqual(
+            SellerAnalytics.objects.aggregate(total=Sum('total_books'))['total'], Book.objects.count()
+        )
+    
+    def snapshot(self):
+        return (
+            list(Book.objects.order_by('isbn').values_list('title', 'price', 'total_sales')),
+            list(Order.objects.order_by('order_number').values_list('order_number', 'user__email', 'status', 'total_amount')),
+            list(Review.objects.order_by('user__email', 'book__isbn').values_list('user__email', 'book__isbn', 'rating')),
+        )
+    
+    def test_same_seed_same_data_with_any_number_of_workers(self):
+        dataset.generate(300, seed=7)
+        first = self.snapshot()
+        
+        call_command('flush', interactive=False, verbosity=0)
+        dataset.generate(300, seed=7, workers=2)
+        self.assertEqual(self.snapshot(), first)
+    
+    def test_command_refuses_to_add_to_a_catalog(self):
+        out = StringIO()
+        call_command('generate_dataset', books=100, buyers=50, stdout=out)
+        self.assertIn('Generated the dataset', out.getvalue())
+        self.assertEqual(Book.objects.count(), 100)
+        
+        with self.assertRaises(CommandError):
+            call_command('generate_dataset', books=100, stdout=StringIO())
+        call_command('generate_dataset', books=50, flush=True, stdout=StringIO())
+        self.assertEqual(Book.objects.count(), 50)
+
+class DistributionTests(SimpleTestCase):
+    def test_zipf_favours_low_ranks(self):
+        zipf = dataset.Zipf(1000, 1.0)
+        rng = random.Random(0)
+        draws = [zipf.draw(rng) for _ in range(20000)]
+        
+        self.assertTrue(all(0 <= rank < 1000 for rank in draws))
+        self.assertGreater(draws.count(0), 5 * draws.count(9))
+        self.assertAlmostEqual(sum(zipf.share(rank) for rank in range(1000)), 1)
+    
+    def test_order_volume_is_seasonal(self):
+        # Both Thursdays, the same age
+        self.assertGreater(dataset.seasonal_volume(date(2025, 12, 11), 30), dataset.seasonal_volume(date(2025, 6, 12), 30))
+        self.assertLess(dataset.seasonal_volume(date(2026, 1, 15), 30), dataset.seasonal_volume(date(2025, 6, 12), 30))
+        self.assertGreater(dataset.seasonal_volume(date(2025, 6, 14), 30), dataset.seasonal_volume(date(2025, 6, 12), 30))
+
+class BatchingTests(SimpleTestCase):
+    def test_chunked_consumes_the_iterable_as_it_goes(self):
+        consumed = []
+        
+        def values():
+            for value in range(7):
+                consumed.append(value)
+                yield value
+        
+        chunks = chunked(values(), 3)
+        self.assertEqual(next(chunks), [0, 1, 2])
+        self.assertEqual(consumed, [0, 1, 2])
+        self.assertEqual(list(chunks), [[3, 4, 5], [6]])
+        self.assertEqual(list(chunked([], 3)), [])
+
+class EndpointCoverageTests(SimpleTestCase):
+    def test_every_route_is_benchmarked(self):
+        self.assertEqual(benchmark.uncovered_routes(), [])
+    
+    def test_every_endpoint_has_a_budget(self):
+        budgets = benchmark.load_budgets()
+        self.assertEqual(sorted(endpoint.name for endpoint in benchmark.ENDPOINTS if endpoint.name not in budgets), [])
+
+class BenchmarkRunTests(TransactionTestCase):
+    databases = {'default', 'replica'}
+    
+    def test_every_endpoint_responds_as_expected(self):
+        results = benchmark.run(sizes=(100, 200), repeat=1)
+        
+        failed = [
+            f'{result.endpoint.name}: {result.statuses} {result.error}'
+            for size_results in results.values() for result in size_results if not result.ok
+        ]
+        self.assertEqual(failed, [])
+        self.assertEqual(len(results[200]), len(benchmark.ENDPOINTS))
+        
+        table = benchmark.format_table(results, benchmark.load_budgets())
+        self.assertIn('q@100', table)
+        self.assertIn('books.list', table)
+        self.assertIsNotNone(benchmark.growth(results, 'books.list'))
+
+    @override_settings(READ_REPLICA='replica')
+    def test_queries_routed_to_the_replica_are_counted(self):
+        endpoints = [endpoint for endpoint in benchmark.ENDPOINTS if endpoint.name == 'books.list']
+        results = benchmark.run(sizes=(50,), repeat=1, endpoints=endpoints)
+        
+        result, = results[50]
+        self.assertTrue(result.ok, result.error)
+        # The listing reads only from the replica
+        self.assertEqual(result.queries, benchmark.load_budgets()['books.list']['queries'])
+
+@override_settings(READ_REPLICA='replica')
+class ReplicaRoutingTests(TransactionTestCase):
+    # In tests the replica mirrors the test database, on its own connection
+    databases = {'default', 'replica'}
+    
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.seller = make_seller()
+        self.book = make_book(self.seller, Category.objects.create(name='Fiction'), 1)
+        self.buyer = User.objects.create_user(username='buyer@example.com', email='buyer@example.com', role='buyer')
+        self.reader = User.objects.create_user(username='reader@example.com', email='reader@example.com', role='buyer')
+        self.review = Review.objects.create(
+            user=self.reader, book=self.book, rating=5, title='Great', comment='Loved every page.'
+        )
+    
+    def replica_tables(self, fetch):
+        with CaptureQueriesContext(connections['replica']) as context:
+            response = fetch()
+        self.assertEqual(response.status_code, 200, getattr(response, 'data', response))
+        return ' '.join(query['sql'] for query in context.captured_queries)
+    
+    def test_catalog_and_review_reads_go_to_the_replica(self):
+        self.assertIn('books_book', self.replica_tables(lambda: self.client.get('/api/books/')))
+        
+        self.client.force_authenticate(self.buyer)
+        self.assertIn('reviews_review', self.replica_tables(
+            lambda: self.client.get('/api/reviews/', {'book': self.book.pk})
+        ))
+    
+    def test_user_reads_their_own_writes(self):
+        self.client.force_authenticate(self.buyer)
+        response = self.client.post(f'/api/reviews/{self.review.pk}/vote/', {'vote_type': 'helpful'})
+        self.assertEqual(response.status_code, 200)
+        
+        # Pinned to the primary for a while, so the vote shows straight away
+        self.assertEqual(self.replica_tables(lambda: self.client.get('/api/reviews/', {'book': self.book.pk})), '')
+        self.assertEqual(self.client.get('/api/reviews/', {'book': self.book.pk}).data['results'][0]['helpful_count'], 1)
+        
+        # Other users are not pinned
+        self.client.force_authenticate(self.reader)
+        self.assertIn('reviews_review', self.replica_tables(lambda: self.client.get('/api/reviews/my-reviews/')))
+    
+    def test_platform_analytics_read_their_rollups_from_the_replica(self):
+        admin = User.objects.create_user(username='admin@example.com', email='admin@example.com', is_staff=True)
+        self.client.force_authenticate(admin)
+        # The dashboard only reads: the rollups are written by rollup_platform_stats
+        self.assertIn('analytics_platformdailystats', self.replica_tables(
+            lambda: self.client.get('/api/analytics/platform/')
+        ))
+    
+    def test_writes_and_transactions_use_the_primary(self):
+        router = replicas.ReplicaRouter()
+        with replicas.replica_reads():
+            self.assertEqual(router.db_for_read(Book), 'replica')
+            self.assertEqual(router.db_for_write(Book), 'default')
+            with transaction.atomic():
+                self.assertEqual(router.db_for_read(Book), 'default')
+            with replicas.replica_reads(False):
+                self.assertEqual(router.db_for_read(Book), 'default')
+        self.assertEqual(router.db_for_read(Book), 'default')
+        
+        with override_settings(READ_REPLICA=None), replicas.replica_reads():
+            self.assertEqual(router.db_for_read(Book), 'default')
+    
+    def test_report_queries_run_on_the_replica(self):
+        today = timezone.localdate()
+        job, _ = request_report(self.seller, 'monthly', today - timedelta(days=30), today)
+        
+        with CaptureQueriesContext(connections['replica']) as context:
+            run_pending()
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'completed')
+        self.assertIsNotNone(job.report)
+        self.assertIn('orders_sellerorder', ' '.join(query['sql'] for query in context.captured_queries))
+
+class ReplicaSyncTests(TransactionTestCase):
+    def test_copies_the_database(self):
+        Category.objects.create(name='Poetry')
+        
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / 'replica.sqlite3'
+            replicas.copy_database(connection, path)
+            copy = sqlite3.connect(path)
+            try:
+                names = [name for name, in copy.execute('SELECT name FROM books_category')]
+            finally:
+                copy.close()
+        self.assertEqual(names, ['Poetry'])
+    
+    def test_command_refuses_without_a_separate_replica(self):
+        with override_settings(READ_REPLICA=None), self.assertRaisesMessage(CommandError, 'No read replica'):
+            call_command('sync_replica', stdout=StringIO())
+        # In tests the replica alias mirrors the test database
+        with override_settings(READ_REPLICA='replica'), self.assertRaisesMessage(CommandError, 'default database itself'):
+            call_command('sync_replica', stdout=StringIO())
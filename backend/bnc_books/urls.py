@@ -2,6 +2,7 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
+from bnc_books.metrics import metrics_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),  # Use default admin for now
@@ -11,6 +12,7 @@ urlpatterns = [
     path('api/reviews/', include('reviews.urls')),
     path('api/affiliate/', include('affiliates.urls')),
     path('api/analytics/', include('analytics.urls')),
+    path('metrics/', metrics_view, name='metrics'),
 ]
 
 if settings.DEBUG:
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Category, Genre, Book
+from .models import Category, Genre, Book, BookShelf
 
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
@@ -54,4 +54,10 @@ class BookAdmin(admin.ModelAdmin):
             'fields': ('created_at', 'updated_at'),
             'classes': ('collapse',)
         }),
-    )
\ No newline at end of file
+    )
+
+@admin.register(BookShelf)
+class BookShelfAdmin(admin.ModelAdmin):
+    list_display = ('shelf', 'category', 'updated_at')
+    list_filter = ('shelf',)
+    readonly_fields = ('entries', 'updated_at')
\ No newline at end of file
@@ -1,5 +1,8 @@
 import django_filters
+from rest_framework import filters
+from rest_framework.settings import api_settings
 from .models import Book
+from .search import search_books
 
 class BookFilter(django_filters.FilterSet):
     min_price = django_filters.NumberFilter(field_name="price", lookup_expr='gte')
@@ -9,4 +12,19 @@ class BookFilter(django_filters.FilterSet):
     
     class Meta:
         model = Book
-        fields = ['category', 'genres', 'language', 'condition']
\ No newline at end of file
+        fields = ['category', 'genres', 'language', 'condition']
+
+class FullTextSearchFilter(filters.SearchFilter):
+    """?search= backed by the catalog full-text index instead of LIKE scans"""
+    
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '')
+        return search_books(queryset, query)
+
+class CatalogOrderingFilter(filters.OrderingFilter):
+    """Orders search results by relevance unless the client asks otherwise"""
+    
+    def get_default_ordering(self, view):
+        if view.request.query_params.get(api_settings.SEARCH_PARAM, '').strip():
+            return ['-search_rank', '-created_at']
+        return super().get_default_ordering(view)
\ No newline at end of file
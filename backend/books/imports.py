@@ -0,0 +1,224 @@
+"""
+Bulk seller catalog import from CSV or JSON Lines.
+
+Rows are read lazily and handled in batches: each batch is validated with
+BookImportRowSerializer, checked against existing ISBNs with one query, and
+written with two bulk_create calls (books, then genre links). Categories and
+genres are resolved by name from an in-memory lookup loaded once per import.
+
+bulk_create skips model signals, so the work those signals do per book
+(search index, cached responses, shelves, inventory alerts) is done once
+per batch or once per import instead.
+"""
+import csv
+import io
+import json
+
+from django.db import IntegrityError, transaction
+from rest_framework.exceptions import ValidationError
+from rest_framework.serializers import as_serializer_error
+
+from analytics.counters import books_listed
+from analytics.inventory import sync_inventory_alerts
+from bnc_books.cache import bump_versions
+from .models import Book, Category, Genre
+from .search import index_books
+from .serializers import BookImportRowSerializer
+from . import shelves
+
+DEFAULT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+# Writes of a batch that keep colliding with other writers' ISBNs
+WRITE_ATTEMPTS = 3
+FORMATS = ('csv', 'jsonl')
+
+
+class ImportFormatError(ValueError):
+    pass
+
+
+def detect_format(filename, requested=None):
+    if requested:
+        if requested not in FORMATS:
+            raise ImportFormatError(f"Unsupported format '{requested}'. Use one of: {', '.join(FORMATS)}")
+        return requested
+
+    name = (filename or '').lower()
+    if name.endswith('.csv'):
+        return 'csv'
+    if name.endswith(('.jsonl', '.ndjson')):
+        return 'jsonl'
+    raise ImportFormatError('Could not tell the file format from its name; pass format=csv or format=jsonl')
+
+
+def read_rows(stream, file_format):
+    """
+    Yield (row_number, data) from a binary or text stream without loading it
+    whole. `data` is None for lines that could not be parsed.
+    """
+    if isinstance(stream, io.TextIOBase):
+        text = stream
+    else:
+        text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+
+    if file_format == 'csv':
+        for number, row in enumerate(csv.DictReader(text), start=1):
+            yield number, row
+        return
+
+    number = 0
+    for line in text:
+        if not line.strip():
+            continue
+        number += 1
+        try:
+            data = json.loads(line)
+        except ValueError:
+            data = None
+        yield number, data if isinstance(data, dict) else None
+
+
+class CatalogImporter:
+    """
+    Import rows for one seller. `run(rows)` takes (row_number, data) pairs and
+    returns a summary with per-row errors (capped at MAX_REPORTED_ERRORS).
+    """
+    def __init__(self, seller, batch_size=DEFAULT_BATCH_SIZE):
+        self.seller = seller
+        self.batch_size = batch_size
+        self.categories = {name.lower(): pk for pk, name in Category.objects.values_list('id', 'name')}
+        self.genres = {name.lower(): pk for pk, name in Genre.objects.values_list('id', 'name')}
+        # One instance for every row: building a serializer deep-copies its
+        # fields, which costs more than validating the row itself
+        self.row_serializer = BookImportRowSerializer()
+        self.created = 0
+        self.failed = 0
+        self.errors = []
+        self.book_ids = []
+        self.category_ids = set()
+
+    def run(self, rows):
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                self._import_batch(batch)
+                batch = []
+        if batch:
+            self._import_batch(batch)
+
+        self._finish()
+        return self.summary()
+
+    def summary(self):
+        return {
+            'created': self.created,
+            'failed': self.failed,
+            'errors': self.errors,
+            'errors_truncated': self.failed > len(self.errors),
+        }
+
+    def _error(self, number, errors):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'row': number, 'errors': errors})
+
+    def _validate(self, number, data):
+        if data is None:
+            self._error(number, {'non_field_errors': ['Row could not be parsed.']})
+            return None
+
+        try:
+            row = self.row_serializer.run_validation(data)
+        except ValidationError as e:
+            self._error(number, as_serializer_error(e))
+            return None
+
+        errors = {}
+        category_id = self.categories.get(row['category'].strip().lower())
+        if category_id is None:
+            errors['category'] = [f"Unknown category '{row['category']}'."]
+
+        genre_ids = []
+        unknown = []
+        for name in row['genres']:
+            genre_id = self.genres.get(name.strip().lower())
+            if genre_id is None:
+                unknown.append(name)
+            elif genre_id not in genre_ids:
+                genre_ids.append(genre_id)
+        if unknown:
+            errors['genres'] = [f"Unknown genre '{name}'." for name in unknown]
+
+        if errors:
+            self._error(number, errors)
+            return None
+        return row, category_id, genre_ids
+
+    def _import_batch(self, batch):
+        valid = []
+        seen = set()
+        for number, data in batch:
+            result = self._validate(number, data)
+            if result is None:
+                continue
+            isbn = result[0]['isbn']
+            if isbn in seen:
+                self._error(number, {'isbn': ['Duplicate ISBN in this file.']})
+                continue
+            seen.add(isbn)
+            valid.append((number, *result))
+
+        for attempt in range(WRITE_ATTEMPTS):
+            try:
+                self._write(valid)
+                return
+            except IntegrityError:
+                # Another writer took some of these ISBNs after our check; the
+                # next attempt picks them up as ordinary duplicates
+                continue
+
+        for number, *_ in valid:
+            self._error(number, {'non_field_errors': ['Row could not be saved while other imports were writing; try again.']})
+
+    def _write(self, valid):
+        existing = set(Book.objects.filter(
+            isbn__in=[row['isbn'] for _, row, _, _ in valid]
+        ).values_list('isbn', flat=True))
+        duplicates = [number for number, row, _, _ in valid if row['isbn'] in existing]
+        rows = [(row, category_id, genre_ids) for _, row, category_id, genre_ids in valid if row['isbn'] not in existing]
+
+        books = []
+        for row, category_id, genre_ids in rows:
+            fields = {key: value for key, value in row.items() if key not in ('category', 'genres')}
+            books.append(Book(seller=self.seller, category_id=category_id, **fields))
+
+        if books:
+            with transaction.atomic():
+                Book.objects.bulk_create(books)
+                Book.genres.through.objects.bulk_create([
+                    Book.genres.through(book_id=book.pk, genre_id=genre_id)
+                    for book, (row, category_id, genre_ids) in zip(books, rows)
+                    for genre_id in genre_ids
+                ])
+
+        # Only reported once the batch is written, so a retry doesn't count them twice
+        for number in duplicates:
+            self._error(number, {'isbn': ['A book with this ISBN already exists.']})
+        if not books:
+            return
+
+        ids = [book.pk for book in books]
+        index_books(ids)
+        self.book_ids.extend(ids)
+        self.category_ids.update(category_id for _, category_id, _ in rows)
+        self.created += len(books)
+
+    def _finish(self):
+        if not self.book_ids:
+            return
+
+        sync_inventory_alerts(self.book_ids)
+        books_listed(self.seller.pk, len(self.book_ids))
+        shelves.rebuild_category_shelves(sorted(self.category_ids))
+        bump_versions('books')
@@ -0,0 +1,131 @@
+"""
+Race-free stock updates for one book or thousands.
+
+Each book's operations are folded into a single SQL expression on
+stock_quantity (e.g. GREATEST(stock_quantity - 3, 0) + 10), so the new value
+is computed by the database from the row as it is at UPDATE time. Orders
+reserving stock concurrently are never overwritten by a stale value read in
+Python. Books are updated in chunks, one UPDATE ... CASE statement per chunk,
+all inside one transaction.
+
+The UPDATEs skip model signals, so inventory alerts, shelves and cached
+responses are refreshed once for the whole affected set afterwards.
+"""
+from django.db import transaction
+from django.db.models import Case, F, PositiveIntegerField, Value, When
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from analytics.inventory import sync_inventory_alerts
+from bnc_books.batching import chunked
+from bnc_books.cache import bump_versions
+from .models import Book
+from . import shelves
+
+CHUNK_SIZE = 200
+# Above this many books, rebuilding the category shelves is cheaper than
+# adjusting them book by book
+SHELF_REFRESH_LIMIT = 20
+
+
+class StockOperationError(Exception):
+    """Raised with per-operation errors when some operations can't be applied"""
+    def __init__(self, errors):
+        super().__init__(errors)
+        self.errors = errors
+
+
+def stock_expression(actions):
+    """Fold (action, amount) pairs, in order, into one expression on stock_quantity"""
+    expression = F('stock_quantity')
+    for action, amount in actions:
+        if action == 'set':
+            expression = Value(amount)
+        elif action == 'add':
+            expression = expression + Value(amount)
+        elif action == 'subtract':
+            expression = Greatest(expression - Value(amount), Value(0))
+    return expression
+
+
+def _resolve_books(seller, operations):
+    """Map each operation index to the seller's book id, with one query per chunk"""
+    ids = {operation['id'] for operation in operations if 'id' in operation}
+    isbns = {operation['isbn'] for operation in operations if 'isbn' in operation}
+    books = Book.objects.filter(seller=seller)
+
+    known_ids = set()
+    for chunk in chunked(ids, CHUNK_SIZE):
+        known_ids.update(books.filter(pk__in=chunk).values_list('id', flat=True))
+    by_isbn = {}
+    for chunk in chunked(isbns, CHUNK_SIZE):
+        by_isbn.update(books.filter(isbn__in=chunk).values_list('isbn', 'id'))
+
+    resolved = {}
+    errors = {}
+    for index, operation in enumerate(operations):
+        if 'id' in operation:
+            book_id = operation['id'] if operation['id'] in known_ids else None
+        else:
+            book_id = by_isbn.get(operation['isbn'])
+
+        if book_id is None:
+            errors[index] = {'book': ['Book not found.']}
+        else:
+            resolved[index] = book_id
+    return resolved, errors
+
+
+def apply_stock_operations(seller, operations):
+    """
+    Apply `operations` ({'id' or 'isbn', 'action', 'amount'}) to the seller's
+    books, all or nothing. Returns the updated books as dicts, in id order.
+    Raises StockOperationError if any operation names an unknown book.
+    """
+    resolved, errors = _resolve_books(seller, operations)
+    if errors:
+        raise StockOperationError(errors)
+
+    actions = {}
+    for index, operation in enumerate(operations):
+        actions.setdefault(resolved[index], []).append((operation['action'], operation['amount']))
+
+    now = timezone.now()
+    updated = []
+    with transaction.atomic():
+        for chunk in chunked(sorted(actions), CHUNK_SIZE):
+            Book.objects.filter(pk__in=chunk).update(
+                stock_quantity=Case(
+                    *[When(pk=book_id, then=stock_expression(actions[book_id])) for book_id in chunk],
+                    output_field=PositiveIntegerField()
+                ),
+                updated_at=now
+            )
+            updated.extend(
+                Book.objects.filter(pk__in=chunk).order_by('id').values(
+                    'id', 'isbn', 'stock_quantity', 'category_id', 'updated_at'
+                )
+            )
+
+    refresh_stock_dependents(
+        [book['id'] for book in updated],
+        {book['category_id'] for book in updated}
+    )
+    return updated
+
+
+def refresh_stock_dependents(book_ids, category_ids):
+    """
+    Bring inventory alerts, shelves and cached responses up to date after
+    stock or sales counters of `book_ids` were changed with queryset updates.
+    """
+    book_ids = list(book_ids)
+    sync_inventory_alerts(book_ids)
+
+    if len(book_ids) <= SHELF_REFRESH_LIMIT:
+        for book in Book.objects.filter(pk__in=book_ids):
+            shelves.refresh_book(book)
+    else:
+        shelves.rebuild_category_shelves(sorted(category_ids))
+
+    bump_versions('books', *[f'book:{book_id}' for book_id in book_ids])
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+from accounts.models import User
+from books.imports import CatalogImporter, ImportFormatError, DEFAULT_BATCH_SIZE, detect_format, read_rows
+
+class Command(BaseCommand):
+    help = 'Bulk import a seller catalog from a CSV or JSON Lines file'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV (.csv) or JSON Lines (.jsonl/.ndjson) file')
+        parser.add_argument('--seller', required=True, help='Email of the seller who owns the books')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='Override format detection')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    
+    def handle(self, *args, **options):
+        try:
+            seller = User.objects.get(email=options['seller'], role='seller')
+        except User.DoesNotExist:
+            raise CommandError(f"No seller with email {options['seller']}")
+        
+        try:
+            file_format = detect_format(options['path'], options['format'])
+        except ImportFormatError as e:
+            raise CommandError(str(e))
+        
+        with open(options['path'], 'rb') as stream:
+            importer = CatalogImporter(seller, batch_size=options['batch_size'])
+            summary = importer.run(read_rows(stream, file_format))
+        
+        for error in summary['errors']:
+            self.stderr.write(f"Row {error['row']}: {error['errors']}")
+        if summary['errors_truncated']:
+            self.stderr.write(f"... {summary['failed'] - len(summary['errors'])} more rows failed")
+        
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {summary['created']} books, {summary['failed']} rows failed"
+        ))
\ No newline at end of file
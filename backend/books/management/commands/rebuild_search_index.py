@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from books.models import Book
+from books.search import rebuild_index, uses_fts5
+
+class Command(BaseCommand):
+    help = 'Rebuild the catalog full-text search index from the books table'
+    
+    def handle(self, *args, **options):
+        if not uses_fts5():
+            self.stdout.write('This database maintains its search index itself; nothing to do.')
+            return
+        
+        rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f'Indexed {Book.objects.count()} books'))
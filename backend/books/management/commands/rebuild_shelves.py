@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+from books.models import BookShelf
+from books.shelves import rebuild_all_shelves
+
+class Command(BaseCommand):
+    help = 'Recompute every homepage shelf (global and per category) from the books table'
+    
+    def handle(self, *args, **options):
+        rebuild_all_shelves()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {BookShelf.objects.count()} shelves'))
\ No newline at end of file
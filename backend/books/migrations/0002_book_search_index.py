@@ -0,0 +1,80 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+SQLITE_CREATE = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS books_book_fts USING fts5("
+    "title, author, isbn, description, tokenize='unicode61 remove_diacritics 2')",
+    # Weight title, author, isbn and description for bm25() ranking
+    "INSERT INTO books_book_fts (books_book_fts, rank) VALUES ('rank', 'bm25(10.0, 6.0, 8.0, 1.0)')",
+    "INSERT INTO books_book_fts (rowid, title, author, isbn, description) "
+    "SELECT id, title, author, isbn, description FROM books_book",
+]
+
+SQLITE_DROP = [
+    "DROP TABLE IF EXISTS books_book_fts",
+]
+
+POSTGRES_CREATE = [
+    "ALTER TABLE books_book ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(author, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(isbn, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'C')"
+    ") STORED",
+    "CREATE INDEX books_book_search_vector_idx ON books_book USING GIN (search_vector)",
+]
+
+POSTGRES_DROP = [
+    "DROP INDEX IF EXISTS books_book_search_vector_idx",
+    "ALTER TABLE books_book DROP COLUMN IF EXISTS search_vector",
+]
+
+
+def _run(schema_editor, statements):
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        _run(schema_editor, SQLITE_CREATE)
+    elif vendor == 'postgresql':
+        _run(schema_editor, POSTGRES_CREATE)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        _run(schema_editor, SQLITE_DROP)
+    elif vendor == 'postgresql':
+        _run(schema_editor, POSTGRES_DROP)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookSearchIndex',
+            fields=[
+                ('book', models.OneToOneField(db_column='rowid', on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_index', serialize=False, to='books.book')),
+                ('title', models.TextField()),
+                ('author', models.TextField()),
+                ('isbn', models.TextField()),
+                ('description', models.TextField()),
+                ('rank', models.FloatField()),
+            ],
+            options={
+                'db_table': 'books_book_fts',
+                'managed': False,
+            },
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
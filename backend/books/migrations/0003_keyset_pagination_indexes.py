@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:12
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0002_book_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['is_published', 'created_at', 'id'], name='books_book_is_publ_b677f7_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='book',
+            index=models.Index(fields=['seller', 'created_at', 'id'], name='books_book_seller__9f4883_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0003_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookShelf',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('shelf', models.CharField(choices=[('featured', 'Featured'), ('bestsellers', 'Bestsellers'), ('new_arrivals', 'New Arrivals'), ('top_rated', 'Top Rated')], max_length=20)),
+                ('entries', models.JSONField(default=list)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='shelves', to='books.category')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('shelf', 'category'), name='unique_shelf_per_category'), models.UniqueConstraint(condition=models.Q(('category__isnull', True)), fields=('shelf',), name='unique_global_shelf')],
+            },
+        ),
+    ]
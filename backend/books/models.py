@@ -120,6 +120,15 @@ class Book(models.Model):
         validators=[MinValueValidator(Decimal('0')), MaxValueValidator(Decimal('5'))]  # FIXED
     )
     review_count = models.PositiveIntegerField(default=0)
+    # Aggregates over approved reviews, kept up to date by reviews.ratings
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_1_count = models.PositiveIntegerField(default=0)
+    rating_2_count = models.PositiveIntegerField(default=0)
+    rating_3_count = models.PositiveIntegerField(default=0)
+    rating_4_count = models.PositiveIntegerField(default=0)
+    rating_5_count = models.PositiveIntegerField(default=0)
+    verified_review_count = models.PositiveIntegerField(default=0)
+    recommend_count = models.PositiveIntegerField(default=0)
     
     # Relationships
     seller = models.ForeignKey('accounts.User', on_delete=models.CASCADE, limit_choices_to={'role': 'seller'})
@@ -136,6 +145,9 @@ class Book(models.Model):
             models.Index(fields=['is_published', 'is_featured']),
             models.Index(fields=['price']),
             models.Index(fields=['average_rating']),
+            # Keyset pagination over (created_at, id)
+            models.Index(fields=['is_published', 'created_at', 'id']),
+            models.Index(fields=['seller', 'created_at', 'id']),
         ]
     
     def __str__(self):
@@ -149,4 +161,68 @@ class Book(models.Model):
     def discount_percentage(self):
         if self.original_price and self.original_price > self.price:
             return round(((self.original_price - self.price) / self.original_price) * 100, 1)
-        return 0
\ No newline at end of file
+        return 0
+
+class BookShelf(models.Model):
+    """
+    A materialized, ranked list of book ids for one homepage shelf,
+    optionally scoped to a category. Maintained by books.shelves.
+    """
+    SHELF_CHOICES = [
+        ('featured', 'Featured'),
+        ('bestsellers', 'Bestsellers'),
+        ('new_arrivals', 'New Arrivals'),
+        ('top_rated', 'Top Rated'),
+    ]
+    
+    shelf = models.CharField(max_length=20, choices=SHELF_CHOICES)
+    category = models.ForeignKey(
+        Category,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='shelves'
+    )
+    # Ranked [book_id, sort_key] pairs, best first
+    entries = models.JSONField(default=list)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['shelf', 'category'], name='unique_shelf_per_category'),
+            models.UniqueConstraint(
+                fields=['shelf'],
+                condition=models.Q(category__isnull=True),
+                name='unique_global_shelf'
+            ),
+        ]
+    
+    def __str__(self):
+        scope = self.category.name if self.category_id else 'All categories'
+        return f"{self.get_shelf_display()} ({scope})"
+    
+    @property
+    def book_ids(self):
+        return [entry[0] for entry in self.entries]
+
+class BookSearchIndex(models.Model):
+    """
+    Read-only mapping of the SQLite FTS5 table behind catalog search.
+    The table is created by migration and maintained by books.search.
+    """
+    book = models.OneToOneField(
+        Book,
+        on_delete=models.DO_NOTHING,
+        primary_key=True,
+        db_column='rowid',
+        related_name='search_index'
+    )
+    title = models.TextField()
+    author = models.TextField()
+    isbn = models.TextField()
+    description = models.TextField()
+    rank = models.FloatField()
+    
+    class Meta:
+        managed = False
+        db_table = 'books_book_fts'
@@ -0,0 +1,127 @@
+"""
+Full-text search for the book catalog.
+
+SQLite databases keep an FTS5 table (books_book_fts) that mirrors the
+searchable Book columns; it is refreshed from the Book signals in
+books/signals.py. PostgreSQL databases use a generated tsvector column with a
+GIN index, which the database keeps up to date by itself. Any other backend
+falls back to plain icontains matching.
+"""
+import re
+
+from django.db import connection
+from django.db.models import BooleanField, F, FloatField, Q
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = 'books_book_fts'
+SEARCH_FIELDS = ('title', 'author', 'isbn', 'description')
+
+# Column weights used for ranking: title, author, isbn, description
+FTS_RANK_WEIGHTS = (10.0, 6.0, 8.0, 1.0)
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def uses_fts5():
+    return connection.vendor == 'sqlite'
+
+
+def uses_tsvector():
+    return connection.vendor == 'postgresql'
+
+
+def _fts5_query(query):
+    """Turn free text into a safe FTS5 expression: every word, prefix-matched"""
+    tokens = _TOKEN_RE.findall(query)
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def search_books(queryset, query):
+    """
+    Filter a Book queryset down to matches for `query`.
+
+    The result is annotated with `search_rank`, where a higher value means a
+    better match, so callers can order by '-search_rank'.
+    """
+    query = (query or '').strip()
+    if not query:
+        return queryset
+
+    if uses_fts5():
+        match = _fts5_query(query)
+        if not match:
+            # Nothing to search for, but callers still order by search_rank
+            return queryset.none().annotate(search_rank=RawSQL('0', [], output_field=FloatField()))
+
+        # Joining through the one-to-one lets SQLite drive the query from the
+        # FTS index and look books up by primary key. bm25() is negative, with
+        # the best match lowest, so flip the sign.
+        return queryset.filter(
+            search_index__isnull=False
+        ).filter(
+            RawSQL(f'"{FTS_TABLE}" MATCH %s', [match], output_field=BooleanField())
+        ).annotate(
+            search_rank=-F('search_index__rank')
+        )
+
+    if uses_tsvector():
+        return queryset.filter(
+            RawSQL(
+                "\"books_book\".\"search_vector\" @@ websearch_to_tsquery('english', %s)",
+                [query],
+                output_field=BooleanField()
+            )
+        ).annotate(
+            search_rank=RawSQL(
+                "ts_rank_cd(\"books_book\".\"search_vector\", websearch_to_tsquery('english', %s))",
+                [query],
+                output_field=FloatField()
+            )
+        )
+
+    condition = Q()
+    for field in SEARCH_FIELDS:
+        condition |= Q(**{f'{field}__icontains': query})
+    return queryset.filter(condition).annotate(search_rank=RawSQL('0', [], output_field=FloatField()))
+
+
+def index_books(book_ids):
+    """(Re)index the given books. A no-op outside SQLite."""
+    book_ids = list(book_ids)
+    if not book_ids or not uses_fts5():
+        return
+
+    placeholders = ', '.join(['%s'] * len(book_ids))
+    columns = ', '.join(SEARCH_FIELDS)
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})', book_ids)
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, {columns}) '
+            f'SELECT id, {columns} FROM books_book WHERE id IN ({placeholders})',
+            book_ids
+        )
+
+
+def unindex_books(book_ids):
+    """Drop the given books from the index. A no-op outside SQLite."""
+    book_ids = list(book_ids)
+    if not book_ids or not uses_fts5():
+        return
+
+    placeholders = ', '.join(['%s'] * len(book_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})', book_ids)
+
+
+def rebuild_index():
+    """Rebuild the whole index from the books table. A no-op outside SQLite."""
+    if not uses_fts5():
+        return
+
+    columns = ', '.join(SEARCH_FIELDS)
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, {columns}) SELECT id, {columns} FROM books_book'
+        )
+        cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
@@ -1,7 +1,8 @@
 from rest_framework import serializers
 from django.core.validators import MinValueValidator, MaxValueValidator
-from .models import Book, Category, Genre
+from .models import Book, Category, Genre, validate_isbn
 from accounts.serializers import UserSerializer
+from bnc_books.serializers import EagerLoadingMixin
 
 class CategorySerializer(serializers.ModelSerializer):
     class Meta:
@@ -13,9 +14,12 @@ class GenreSerializer(serializers.ModelSerializer):
         model = Genre
         fields = ('id', 'name', 'description')
 
-class BookListSerializer(serializers.ModelSerializer):
+class BookListSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     seller_store = serializers.CharField(source='seller.profile.store_name', read_only=True)
     
+    select_related_fields = ('seller__profile',)
+    prefetch_related_fields = ('genres',)
+    
     class Meta:
         model = Book
         fields = (
@@ -24,12 +28,15 @@ class BookListSerializer(serializers.ModelSerializer):
             'average_rating', 'review_count', 'is_featured', 'seller_store'
         )
 
-class BookDetailSerializer(serializers.ModelSerializer):
+class BookDetailSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     seller = serializers.SerializerMethodField()
     genres = GenreSerializer(many=True, read_only=True)
     category_name = serializers.CharField(source='category.name', read_only=True)
     discount_percentage = serializers.ReadOnlyField()
     
+    select_related_fields = ('category', 'seller__profile')
+    prefetch_related_fields = ('genres',)
+    
     class Meta:
         model = Book
         fields = (
@@ -94,6 +101,47 @@ class BookCreateSerializer(serializers.ModelSerializer):
         validated_data['seller'] = self.context['request'].user
         return super().create(validated_data)
 
+class BookImportRowSerializer(serializers.Serializer):
+    """
+    One row of a bulk catalog import. Mirrors BookCreateSerializer's rules,
+    but takes category and genres by name and leaves database lookups
+    (categories, genres, existing ISBNs) to the importer, which does them
+    once per batch.
+    """
+    title = serializers.CharField()
+    author = serializers.CharField()
+    isbn = serializers.CharField(max_length=17, validators=[validate_isbn])
+    description = serializers.CharField()
+    price = serializers.DecimalField(max_digits=8, decimal_places=2)
+    original_price = serializers.DecimalField(max_digits=8, decimal_places=2, required=False, allow_null=True)
+    stock_quantity = serializers.IntegerField(required=False, default=0)
+    category = serializers.CharField()
+    genres = serializers.ListField(child=serializers.CharField(), required=False, default=list)
+    language = serializers.ChoiceField(choices=Book.LANGUAGE_CHOICES, required=False, default='english')
+    pages = serializers.IntegerField(required=False, allow_null=True, min_value=1)
+    publisher = serializers.CharField(max_length=100)
+    publication_date = serializers.DateField()
+    condition = serializers.ChoiceField(choices=Book.CONDITION_CHOICES, required=False, default='new')
+    cover_image = serializers.CharField(max_length=100, required=False, allow_blank=True, default='')
+    dimensions = serializers.CharField(max_length=50, required=False, allow_blank=True, default='')
+    weight = serializers.IntegerField(required=False, allow_null=True, min_value=0)
+    is_published = serializers.BooleanField(required=False, default=False)
+    
+    validate_title = BookCreateSerializer.validate_title
+    validate_author = BookCreateSerializer.validate_author
+    validate_price = BookCreateSerializer.validate_price
+    validate_stock_quantity = BookCreateSerializer.validate_stock_quantity
+    validate = BookCreateSerializer.validate
+    
+    def to_internal_value(self, data):
+        # CSV cells arrive as strings: "" means "not given" and genres are
+        # a "|"-separated list
+        if hasattr(data, 'items'):
+            data = {key: value for key, value in data.items() if value not in ('', None)}
+            if isinstance(data.get('genres'), str):
+                data['genres'] = [name.strip() for name in data['genres'].split('|') if name.strip()]
+        return super().to_internal_value(data)
+
 class InventoryUpdateSerializer(serializers.Serializer):
     stock_quantity = serializers.IntegerField(
         required=True,
@@ -114,4 +162,22 @@ class InventoryUpdateSerializer(serializers.Serializer):
             raise serializers.ValidationError({
                 'adjustment_amount': 'Adjustment amount is required for add/subtract operations.'
             })
-        return data
\ No newline at end of file
+        return data
+
+class StockOperationSerializer(serializers.Serializer):
+    id = serializers.IntegerField(required=False)
+    isbn = serializers.CharField(required=False, max_length=17)
+    action = serializers.ChoiceField(choices=[('set', 'Set'), ('add', 'Add'), ('subtract', 'Subtract')])
+    amount = serializers.IntegerField(min_value=0, max_value=999999)
+    
+    def validate(self, data):
+        if ('id' in data) == ('isbn' in data):
+            raise serializers.ValidationError('Identify the book by exactly one of id or isbn.')
+        return data
+
+class BulkInventoryUpdateSerializer(serializers.Serializer):
+    operations = serializers.ListField(
+        child=StockOperationSerializer(),
+        allow_empty=False,
+        max_length=10000
+    )
\ No newline at end of file
@@ -0,0 +1,196 @@
+"""
+Precomputed homepage shelves (featured, bestsellers, new arrivals, top rated).
+
+Each shelf is stored as a BookShelf row holding the ranked ids of its top
+books, globally and per category. Reads never touch the full Book table:
+they load the shelf rows and hydrate the ids with one query.
+
+Rows are kept current incrementally. When a book's counters change, only
+the shelves it belongs to (or could enter) are adjusted in memory. A shelf
+is re-queried from the books table only when a listed book drops out of a
+full shelf, since the replacement is unknown.
+"""
+from django.db import transaction
+from django.db.models import Q
+
+from .models import Book, BookShelf, Category
+
+SHELF_SIZE = 24
+
+# Book fields that can move a book on or off a shelf
+SHELF_FIELDS = (
+    'is_published', 'is_featured', 'stock_quantity', 'total_sales',
+    'average_rating', 'review_count', 'category', 'category_id', 'created_at',
+)
+
+
+class ShelfDefinition:
+    """
+    A shelf is an ordering over listed, in-stock books plus an optional
+    extra filter. `key(book)` must sort the same way as `ordering` so rows
+    can be re-ranked in memory, and `accepts(book)` must mirror `filters`.
+    """
+    def __init__(self, name, ordering, key, filters=None, accepts=None):
+        self.name = name
+        self.ordering = ordering
+        self.key = key
+        self.filters = filters or {}
+        self.accepts = accepts or (lambda book: True)
+
+    def qualifies(self, book):
+        return book.is_published and book.stock_quantity > 0 and self.accepts(book)
+
+    def queryset(self, category_id=None):
+        queryset = Book.objects.filter(is_published=True, stock_quantity__gt=0, **self.filters)
+        if category_id is not None:
+            queryset = queryset.filter(category_id=category_id)
+        return queryset.order_by(*self.ordering)
+
+
+SHELVES = {
+    shelf.name: shelf for shelf in [
+        ShelfDefinition(
+            'featured',
+            ('-created_at', '-id'),
+            lambda book: [book.created_at.timestamp(), book.pk],
+            filters={'is_featured': True},
+            accepts=lambda book: book.is_featured
+        ),
+        ShelfDefinition(
+            'bestsellers',
+            ('-total_sales', '-created_at', '-id'),
+            lambda book: [book.total_sales, book.created_at.timestamp(), book.pk]
+        ),
+        ShelfDefinition(
+            'new_arrivals',
+            ('-created_at', '-id'),
+            lambda book: [book.created_at.timestamp(), book.pk]
+        ),
+        ShelfDefinition(
+            'top_rated',
+            ('-average_rating', '-review_count', '-id'),
+            lambda book: [float(book.average_rating), book.review_count, book.pk],
+            filters={'review_count__gt': 0},
+            accepts=lambda book: book.review_count > 0
+        ),
+    ]
+}
+
+
+def _compute_entries(definition, category_id=None):
+    books = definition.queryset(category_id).only(
+        'id', 'created_at', 'total_sales', 'average_rating', 'review_count'
+    )[:SHELF_SIZE]
+    return [[book.pk, definition.key(book)] for book in books]
+
+
+def rebuild_shelf(name, category_id=None):
+    """Recompute one shelf from the books table and store it"""
+    entries = _compute_entries(SHELVES[name], category_id)
+    shelf, created = BookShelf.objects.update_or_create(
+        shelf=name,
+        category_id=category_id,
+        defaults={'entries': entries}
+    )
+    return shelf
+
+
+def rebuild_all_shelves():
+    rebuild_category_shelves(Category.objects.values_list('id', flat=True))
+
+
+def rebuild_category_shelves(category_ids):
+    """Rebuild the global shelves and those of `category_ids`, e.g. after a bulk write"""
+    for name in SHELVES:
+        for category_id in [None, *category_ids]:
+            rebuild_shelf(name, category_id)
+
+
+def get_shelves(names, category_id=None):
+    """Return {name: BookShelf}, building any shelf that is not stored yet"""
+    shelves = {
+        shelf.shelf: shelf
+        for shelf in BookShelf.objects.filter(shelf__in=names, category_id=category_id)
+    }
+    for name in names:
+        if name not in shelves:
+            shelves[name] = rebuild_shelf(name, category_id)
+    return shelves
+
+
+def hydrate(book_ids, queryset=None):
+    """Fetch the given books in one query, keeping the order of `book_ids`"""
+    queryset = Book.objects.all() if queryset is None else queryset
+    books = {book.pk: book for book in queryset.filter(pk__in=book_ids)}
+    return [books[book_id] for book_id in book_ids if book_id in books]
+
+
+def _apply_book(definition, shelf, book):
+    """
+    Move `book` within one shelf. Returns True when the shelf changed, or
+    None when it has to be rebuilt from the database.
+    """
+    entries = [entry for entry in shelf.entries if entry[0] != book.pk]
+    was_listed = len(entries) != len(shelf.entries)
+    was_full = len(shelf.entries) >= SHELF_SIZE
+    qualifies = definition.qualifies(book) and (
+        shelf.category_id is None or shelf.category_id == book.category_id
+    )
+
+    if not qualifies:
+        if not was_listed:
+            return False
+        if was_full:
+            return None
+        shelf.entries = entries
+        return True
+
+    key = definition.key(book)
+    if was_listed and was_full and entries and key < entries[-1][1]:
+        # The book fell to the bottom of a full shelf; another book may now
+        # outrank it, so the real tail has to come from the database.
+        return None
+    if not was_listed and len(entries) >= SHELF_SIZE and key <= entries[-1][1]:
+        return False
+
+    entries.append([book.pk, key])
+    entries.sort(key=lambda entry: entry[1], reverse=True)
+    shelf.entries = entries[:SHELF_SIZE]
+    return True
+
+
+def refresh_book(book, previous_category_id=None):
+    """Update every stored shelf that `book` is on or could now enter"""
+    category_ids = {book.category_id}
+    if previous_category_id is not None:
+        category_ids.add(previous_category_id)
+
+    with transaction.atomic():
+        shelves = BookShelf.objects.select_for_update().filter(
+            Q(category__isnull=True) | Q(category_id__in=category_ids)
+        )
+        for shelf in shelves:
+            definition = SHELVES.get(shelf.shelf)
+            if definition is None:
+                continue
+            changed = _apply_book(definition, shelf, book)
+            if changed is None:
+                shelf.entries = _compute_entries(definition, shelf.category_id)
+                changed = True
+            if changed:
+                shelf.save(update_fields=['entries', 'updated_at'])
+
+
+def remove_book(book_id, category_id=None):
+    """Drop a deleted book from the shelves it was listed on"""
+    with transaction.atomic():
+        shelves = BookShelf.objects.select_for_update().filter(
+            Q(category__isnull=True) | Q(category_id=category_id)
+        )
+        for shelf in shelves:
+            if book_id not in shelf.book_ids:
+                continue
+            shelf.entries = [entry for entry in shelf.entries if entry[0] != book_id]
+            if len(shelf.entries) == SHELF_SIZE - 1:
+                shelf.entries = _compute_entries(SHELVES[shelf.shelf], shelf.category_id)
+            shelf.save(update_fields=['entries', 'updated_at'])
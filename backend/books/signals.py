@@ -0,0 +1,67 @@
+from django.db.models.signals import post_init, post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+from bnc_books.cache import bump_versions
+from .models import Book, Category, Genre
+from .search import SEARCH_FIELDS, index_books, unindex_books
+from . import shelves
+
+@receiver(post_save, sender=Book)
+def index_book_on_save(sender, instance, update_fields=None, **kwargs):
+    """Keep the catalog search index in sync with the book's text"""
+    # Counter-only saves (ratings, sales, stock) leave the text untouched
+    if update_fields is not None and not set(update_fields) & set(SEARCH_FIELDS):
+        return
+    
+    index_books([instance.pk])
+
+@receiver(post_delete, sender=Book)
+def unindex_book_on_delete(sender, instance, **kwargs):
+    """Remove deleted books from the catalog search index"""
+    unindex_books([instance.pk])
+
+@receiver(post_init, sender=Book)
+def remember_shelf_category(sender, instance, **kwargs):
+    # Read from __dict__ so deferred loads (.only()) don't trigger a query
+    instance._shelf_category_id = instance.__dict__.get('category_id')
+
+@receiver(post_save, sender=Book)
+def refresh_shelves_on_save(sender, instance, update_fields=None, **kwargs):
+    """Move the book on the precomputed shelves it belongs to"""
+    if update_fields is not None and not set(update_fields) & set(shelves.SHELF_FIELDS):
+        return
+    
+    previous_category_id = getattr(instance, '_shelf_category_id', None)
+    if previous_category_id == instance.category_id:
+        previous_category_id = None
+    shelves.refresh_book(instance, previous_category_id)
+    instance._shelf_category_id = instance.category_id
+
+@receiver(post_delete, sender=Book)
+def remove_from_shelves_on_delete(sender, instance, **kwargs):
+    shelves.remove_book(instance.pk, instance.category_id)
+
+@receiver(post_save, sender=Book)
+@receiver(post_delete, sender=Book)
+def invalidate_book_responses(sender, instance, **kwargs):
+    bump_versions('books', f'book:{instance.pk}')
+
+@receiver(m2m_changed, sender=Book.genres.through)
+def invalidate_book_genre_responses(sender, instance, action, pk_set=None, **kwargs):
+    if not action.startswith('post_'):
+        return
+    
+    if isinstance(instance, Book):
+        bump_versions('books', f'book:{instance.pk}')
+    else:
+        # Changed from the genre side: pk_set holds book ids
+        bump_versions('books', *[f'book:{pk}' for pk in pk_set or ()])
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_responses(sender, instance, **kwargs):
+    bump_versions('categories')
+
+@receiver(post_save, sender=Genre)
+@receiver(post_delete, sender=Genre)
+def invalidate_genre_responses(sender, instance, **kwargs):
+    bump_versions('genres')
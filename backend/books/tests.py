@@ -1,3 +1,388 @@
+import json
+from datetime import date
+from unittest import mock
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import IntegrityError, connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from accounts.models import User
+from analytics.models import InventoryAlert
+from bnc_books.testing import QueryScalingAssertionsMixin
+from .models import Book, BookShelf, Category, Genre
+from . import imports, shelves
 
-# Create your tests here.
+def make_seller(email='seller@example.com', store_name='Test Store'):
+    seller = User.objects.create_user(
+        username=email, email=email, role='seller'
+    )
+    seller.profile.store_name = store_name
+    seller.profile.save()
+    return seller
+
+def make_book(seller, category, index, **overrides):
+    data = {
+        'title': f'Book {index}',
+        'author': 'Test Author',
+        'isbn': f'978{index:010d}',
+        'description': 'A book used in tests.',
+        'price': 10,
+        'stock_quantity': 20,
+        'category': category,
+        'publisher': 'Test Publisher',
+        'publication_date': date(2020, 1, 1),
+        'cover_image': 'book_covers/test.jpg',
+        'is_published': True,
+        'seller': seller,
+    }
+    data.update(overrides)
+    return Book.objects.create(**data)
+
+class CatalogQueryCountTests(QueryScalingAssertionsMixin, TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.category = Category.objects.create(name='Fiction')
+        self.genres = [Genre.objects.create(name='Fantasy'), Genre.objects.create(name='Mystery')]
+        self.books = []
+    
+    def grow_books(self, size, **overrides):
+        # Spread books over several sellers so per-seller lookups would show up
+        while len(self.books) < size:
+            index = len(self.books)
+            seller = make_seller(f'seller{index}@example.com', f'Store {index}')
+            book = make_book(seller, self.category, index, **overrides)
+            book.genres.set(self.genres)
+            self.books.append(book)
+    
+    def test_book_list_queries_do_not_scale(self):
+        self.assertQueriesDoNotScale(
+            lambda: self.client.get('/api/books/'),
+            self.grow_books
+        )
+    
+    def test_book_list_keyset_queries_do_not_scale(self):
+        self.assertQueriesDoNotScale(
+            lambda: self.client.get('/api/books/?pagination=cursor&page_size=20'),
+            self.grow_books
+        )
+    
+    def test_cursor_pagination_keeps_an_explicit_ordering(self):
+        self.grow_books(3)
+        for book, price in zip(self.books, (30, 10, 20)):
+            Book.objects.filter(pk=book.pk).update(price=price)
+        
+        response = self.client.get('/api/books/?pagination=cursor&ordering=price')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([float(book['price']) for book in response.data['results']], [10, 20, 30])
+        # Numbered pages: keyset pages only follow newest first
+        self.assertEqual(response.data['count'], 3)
+    
+    def test_book_search_queries_do_not_scale(self):
+        self.assertQueriesDoNotScale(
+            lambda: self.client.get('/api/books/?search=book'),
+            self.grow_books
+        )
+    
+    def test_search_without_words_returns_no_results(self):
+        self.grow_books(2)
+        response = self.client.get('/api/books/?search=%22%22')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'], [])
+    
+    def test_featured_books_queries_do_not_scale(self):
+        shelves.rebuild_all_shelves()
+        
+        def grow(size):
+            # Cached responses are invalidated on commit
+            with self.captureOnCommitCallbacks(execute=True):
+                self.grow_books(size, is_featured=True)
+        
+        self.assertQueriesDoNotScale(
+            lambda: self.client.get('/api/books/featured/'),
+            grow,
+            sizes=(1, 4, 8)
+        )
+    
+    def test_seller_book_list_queries_do_not_scale(self):
+        seller = make_seller()
+        self.client.force_authenticate(seller)
+        
+        def grow(size):
+            while Book.objects.filter(seller=seller).count() < size:
+                book = make_book(seller, self.category, 1000 + Book.objects.count())
+                book.genres.set(self.genres)
+        
+        self.assertQueriesDoNotScale(lambda: self.client.get('/api/books/seller/books/'), grow)
+
+class ResponseCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.seller = make_seller()
+        self.book = make_book(self.seller, Category.objects.create(name='Fiction'), 1)
+        self.url = f'/api/books/{self.book.pk}/'
+    
+    def test_versions_are_bumped_on_commit(self):
+        self.assertEqual(self.client.get(self.url)['X-Cache'], 'MISS')
+        
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.book.title = 'Renamed'
+            self.book.save()
+            self.assertEqual(self.client.get(self.url)['X-Cache'], 'HIT')
+        self.assertTrue(callbacks)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.client.get(self.url).data['title'], 'Renamed')
+    
+    def test_warm_detail_hit_runs_no_query(self):
+        self.assertEqual(self.client.get(self.url)['X-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(self.url)['X-Cache'], 'HIT')
+    
+    def test_moving_a_book_to_another_seller_follows_the_new_seller(self):
+        self.client.get(self.url)
+        other = make_seller('other@example.com', 'Other Store')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.book.seller = other
+            self.book.save()
+        self.assertEqual(self.client.get(self.url).data['seller']['store_name'], 'Other Store')
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            other.profile.store_name = 'Renamed Store'
+            other.profile.save()
+        self.assertEqual(self.client.get(self.url).data['seller']['store_name'], 'Renamed Store')
+    
+    def test_seller_changes_invalidate_book_details(self):
+        self.client.get(self.url)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            self.seller.profile.store_name = 'New Store'
+            self.seller.profile.save()
+        self.assertEqual(self.client.get(self.url).data['seller']['store_name'], 'New Store')
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            self.seller.first_name = 'Ada'
+            self.seller.save()
+        self.assertEqual(self.client.get(self.url).data['seller']['user']['first_name'], 'Ada')
+        
+        # Saves that change nothing shown keep the cached response
+        with self.captureOnCommitCallbacks(execute=True):
+            self.seller.save(update_fields=['last_login'])
+        self.assertEqual(self.client.get(self.url)['X-Cache'], 'HIT')
+
+class ShelfTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.seller = make_seller()
+        self.fiction = Category.objects.create(name='Fiction')
+        self.history = Category.objects.create(name='History')
+        self.books = [
+            make_book(self.seller, self.fiction if index % 2 else self.history, index, total_sales=index)
+            for index in range(shelves.SHELF_SIZE + 6)
+        ]
+        shelves.rebuild_all_shelves()
+    
+    def assertShelvesMatchRebuild(self):
+        stored = {
+            (shelf.shelf, shelf.category_id): shelf.book_ids
+            for shelf in BookShelf.objects.all()
+        }
+        for (name, category_id), book_ids in stored.items():
+            expected = [entry[0] for entry in shelves._compute_entries(shelves.SHELVES[name], category_id)]
+            self.assertEqual(book_ids, expected, (name, category_id))
+    
+    def test_counter_updates_keep_shelves_in_order(self):
+        self.books[0].total_sales = 500
+        self.books[0].save(update_fields=['total_sales'])
+        self.books[-1].total_sales = 0
+        self.books[-1].save(update_fields=['total_sales'])
+        self.books[3].stock_quantity = 0
+        self.books[3].save()
+        self.assertShelvesMatchRebuild()
+        
+        bestsellers = BookShelf.objects.get(shelf='bestsellers', category__isnull=True)
+        self.assertEqual(bestsellers.book_ids[0], self.books[0].pk)
+    
+    def test_category_change_and_delete_update_both_categories(self):
+        book = self.books[-1]
+        book.category = self.history if book.category == self.fiction else self.fiction
+        book.save()
+        self.books[-2].delete()
+        self.assertShelvesMatchRebuild()
+    
+    def test_shelves_endpoint_hydrates_in_fixed_queries(self):
+        # Shelf rows, books with sellers, genre prefetch
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/books/shelves/?shelves=bestsellers,new_arrivals')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['bestsellers']), shelves.SHELF_SIZE)
+        self.assertEqual(response.data['bestsellers'][0]['id'], self.books[-1].pk)
+        
+        response = self.client.get(f'/api/books/shelves/?shelves=top_rated&category={self.fiction.pk}')
+        self.assertEqual(response.data, {'top_rated': []})
+        
+        response = self.client.get('/api/books/shelves/?shelves=nope')
+        self.assertEqual(response.status_code, 400)
+    
+    def test_shelves_endpoint_rejects_unknown_categories_and_clamps_limit(self):
+        response = self.client.get('/api/books/shelves/?shelves=bestsellers&category=999999')
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(BookShelf.objects.filter(category_id=999999).exists())
+        
+        response = self.client.get('/api/books/shelves/?shelves=bestsellers&limit=-5')
+        self.assertEqual(len(response.data['bestsellers']), 1)
+
+class CatalogImportTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.seller = make_seller()
+        self.client.force_authenticate(self.seller)
+        self.fiction = Category.objects.create(name='Fiction')
+        Genre.objects.create(name='Fantasy')
+        Genre.objects.create(name='Mystery')
+        make_book(self.seller, self.fiction, 1)
+    
+    def upload(self, name, content, **data):
+        data['file'] = SimpleUploadedFile(name, content.encode('utf-8'))
+        return self.client.post('/api/books/seller/books/import/', data, format='multipart')
+    
+    def test_csv_import_creates_books_and_reports_row_errors(self):
+        content = (
+            'title,author,isbn,description,price,stock_quantity,category,genres,publisher,publication_date,is_published\n'
+            'Dune,Frank Herbert,9780441013593,Desert planet,9.99,5,fiction,Fantasy|mystery,Ace,1965-08-01,true\n'
+            'Emma,Jane Austen,9780141439587,Matchmaking,7.50,40,Fiction,,Penguin,1815-12-23,true\n'
+            'Bad,Someone,123,Broken isbn,5,1,Fiction,,Penguin,2000-01-01,true\n'
+            'Dupe,Someone,978-0000000001,Existing isbn,5,1,Fiction,,Penguin,2000-01-01,true\n'
+            'Lost,Someone,9780141439594,Unknown names,5,1,Poetry,Horror,Penguin,2000-01-01,true\n'
+            'Again,Someone,9780441013593,Repeated in file,5,1,Fiction,,Penguin,2000-01-01,true\n'
+        ).replace('978-0000000001', f'978{1:010d}')
+        
+        response = self.upload('catalog.csv', content)
+        
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data['created'], 2)
+        self.assertEqual(response.data['failed'], 4)
+        errors = {error['row']: error['errors'] for error in response.data['errors']}
+        self.assertEqual(sorted(errors), [3, 4, 5, 6])
+        self.assertIn('isbn', errors[3])
+        self.assertIn('isbn', errors[4])
+        self.assertEqual(sorted(errors[5]), ['category', 'genres'])
+        
+        dune = Book.objects.get(isbn='9780441013593')
+        self.assertEqual(dune.seller, self.seller)
+        self.assertEqual(sorted(dune.genres.values_list('name', flat=True)), ['Fantasy', 'Mystery'])
+        self.assertEqual(dune.alerts.get().alert_type, 'low_stock')
+        self.assertEqual(
+            self.client.get('/api/books/?search=desert').data['results'][0]['id'],
+            dune.pk
+        )
+        self.assertIn(dune.pk, BookShelf.objects.get(shelf='new_arrivals', category__isnull=True).book_ids)
+    
+    def jsonl(self, start, count):
+        return '\n'.join(
+            json.dumps({
+                'title': f'Imported {index}', 'author': 'Bulk Author', 'isbn': f'979{index:010d}',
+                'description': 'Imported', 'price': '12.00', 'stock_quantity': 50,
+                'category': 'Fiction', 'genres': ['Fantasy'], 'publisher': 'Bulk',
+                'publication_date': '2021-01-01', 'is_published': True,
+            })
+            for index in range(start, start + count)
+        )
+    
+    def test_jsonl_import_queries_do_not_scale_with_rows(self):
+        # The first import also creates the shelf rows
+        self.upload('catalog.jsonl', self.jsonl(1000, 1))
+        counts = []
+        for start, count in ((0, 20), (20, 300)):
+            with CaptureQueriesContext(connection) as context:
+                response = self.upload('catalog.jsonl', self.jsonl(start, count))
+            self.assertEqual(response.status_code, 201, response.data)
+            self.assertEqual(response.data['created'], count)
+            # bulk_create may split INSERTs to fit the backend's parameter
+            # limit, but nothing should be looked up row by row
+            counts.append(len([q for q in context.captured_queries if q['sql'].startswith('SELECT')]))
+        
+        self.assertEqual(counts[0], counts[1])
+        self.assertEqual(Book.genres.through.objects.filter(book__isbn__startswith='979').count(), 321)
+    
+    def test_jsonl_import_reports_unparseable_lines(self):
+        content = self.jsonl(0, 3).replace('\n', '\nnot json\n', 1)
+        response = self.upload('catalog.ndjson', content)
+        self.assertEqual(response.data['created'], 3)
+        self.assertEqual(response.data['errors'], [{'row': 2, 'errors': {'non_field_errors': ['Row could not be parsed.']}}])
+    
+    def test_rows_that_keep_colliding_are_reported(self):
+        with mock.patch.object(Book.objects, 'bulk_create', side_effect=IntegrityError) as bulk_create:
+            response = self.upload('catalog.jsonl', self.jsonl(0, 2))
+        
+        self.assertEqual(bulk_create.call_count, imports.WRITE_ATTEMPTS)
+        # Nothing was imported, which the endpoint reports as a 400
+        self.assertEqual(response.status_code, 400, response.data)
+        self.assertEqual(response.data['failed'], 2)
+        self.assertEqual([error['row'] for error in response.data['errors']], [1, 2])
+    
+    def test_rejects_unknown_format_and_non_sellers(self):
+        self.assertEqual(self.upload('catalog.xlsx', 'x').status_code, 400)
+        
+        self.client.force_authenticate(User.objects.create_user(username='b@example.com', email='b@example.com'))
+        self.assertEqual(self.upload('catalog.csv', 'title\n').status_code, 403)
+
+class BulkInventoryTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.seller = make_seller()
+        self.client.force_authenticate(self.seller)
+        self.category = Category.objects.create(name='Fiction')
+        self.books = [make_book(self.seller, self.category, index, stock_quantity=20) for index in range(30)]
+    
+    def post(self, operations):
+        return self.client.post('/api/books/seller/books/inventory/', {'operations': operations}, format='json')
+    
+    def test_operations_are_applied_in_order_with_one_update_per_chunk(self):
+        operations = [{'id': book.pk, 'action': 'add', 'amount': 5} for book in self.books]
+        operations += [
+            {'isbn': self.books[0].isbn, 'action': 'subtract', 'amount': 100},
+            {'isbn': self.books[0].isbn, 'action': 'add', 'amount': 2},
+            {'id': self.books[1].pk, 'action': 'set', 'amount': 0},
+        ]
+        
+        with CaptureQueriesContext(connection) as context:
+            response = self.post(operations)
+        
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data['updated'], 30)
+        stock = dict(Book.objects.values_list('id', 'stock_quantity'))
+        self.assertEqual(stock[self.books[0].pk], 2)
+        self.assertEqual(stock[self.books[1].pk], 0)
+        self.assertEqual(stock[self.books[2].pk], 25)
+        updates = [q for q in context.captured_queries if q['sql'].startswith('UPDATE "books_book"')]
+        self.assertEqual(len(updates), 1)
+        
+        alerts = {alert.book_id: alert.alert_type for alert in InventoryAlert.objects.all()}
+        self.assertEqual(alerts, {self.books[0].pk: 'low_stock', self.books[1].pk: 'out_of_stock'})
+    
+    def test_unknown_books_reject_the_whole_batch(self):
+        other = make_book(make_seller('other@example.com', 'Other'), self.category, 99)
+        response = self.post([
+            {'id': self.books[0].pk, 'action': 'set', 'amount': 1},
+            {'id': other.pk, 'action': 'set', 'amount': 1},
+            {'isbn': '9999999999999', 'action': 'add', 'amount': 1},
+        ])
+        
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(sorted(response.data['operations']), [1, 2])
+        self.assertEqual(Book.objects.get(pk=self.books[0].pk).stock_quantity, 20)
+    
+    def test_single_book_endpoint_uses_the_same_path(self):
+        book = self.books[-1]
+        shelves.rebuild_all_shelves()
+        response = self.client.patch(
+            f'/api/books/seller/books/{book.pk}/inventory/',
+            {'stock_quantity': 0, 'adjustment_type': 'subtract', 'adjustment_amount': 25},
+            format='json'
+        )
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data['stock_quantity'], 0)
+        self.assertNotIn(book.pk, BookShelf.objects.get(shelf='new_arrivals', category__isnull=True).book_ids)
+        self.assertEqual(self.client.patch('/api/books/seller/books/9999/inventory/', {'stock_quantity': 1}).status_code, 404)
\ No newline at end of file
@@ -6,11 +6,14 @@ urlpatterns = [
     path('', views.BookListView.as_view(), name='book-list'),
     path('categories/', views.CategoryListView.as_view(), name='categories'),
     path('featured/', views.FeaturedBooksView.as_view(), name='featured-books'),
+    path('shelves/', views.ShelvesView.as_view(), name='book-shelves'),
     path('<int:pk>/', views.BookDetailView.as_view(), name='book-detail'),
     
     # Seller endpoints
+    # GET lists, POST creates
     path('seller/books/', views.SellerBookListView.as_view(), name='seller-book-list'),
-    path('seller/books/', views.SellerBookCreateView.as_view(), name='seller-book-create'),
+    path('seller/books/inventory/', views.BulkInventoryUpdateView.as_view(), name='bulk-inventory-update'),
+    path('seller/books/import/', views.SellerBookImportView.as_view(), name='seller-book-import'),
     path('seller/books/<int:pk>/', views.SellerBookDetailView.as_view(), name='seller-book-detail'),
     path('seller/books/<int:pk>/inventory/', views.InventoryUpdateView.as_view(), name='inventory-update'),
 ]
\ No newline at end of file
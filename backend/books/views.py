@@ -1,18 +1,29 @@
+import csv
 from rest_framework import status, permissions, filters
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.generics import ListAPIView, RetrieveAPIView, CreateAPIView, UpdateAPIView
+from rest_framework.settings import api_settings
 from django_filters.rest_framework import DjangoFilterBackend
 from django.db.models import Q, Avg, Count
 from django.utils import timezone
 from .models import Book, Category, Genre
+from .inventory import StockOperationError, apply_stock_operations
+from .imports import CatalogImporter, ImportFormatError, detect_format, read_rows
+from .filters import FullTextSearchFilter, CatalogOrderingFilter
+from . import shelves
 from .serializers import (
     BookListSerializer, BookDetailSerializer, BookCreateSerializer,
-    CategorySerializer, GenreSerializer, InventoryUpdateSerializer
+    CategorySerializer, GenreSerializer, InventoryUpdateSerializer,
+    BulkInventoryUpdateSerializer
 )
+from bnc_books.cache import VersionedCacheMixin, versioned_lookup
+from bnc_books.pagination import StandardPagination
+from bnc_books.replicas import ReplicaReadMixin
 from analytics.models import BookPerformance
 from analytics.serializers import BookPerformanceSerializer
-class SellerBookPerformanceView(ListAPIView):
+from analytics import events
+class SellerBookPerformanceView(ReplicaReadMixin, ListAPIView):
     serializer_class = BookPerformanceSerializer
     permission_classes = [permissions.IsAuthenticated]
     
@@ -20,14 +31,24 @@ class SellerBookPerformanceView(ListAPIView):
         return BookPerformance.objects.filter(
             book__seller=self.request.user
         ).select_related('book')
-class BookListView(ListAPIView):
+class BookListView(ReplicaReadMixin, ListAPIView):
     serializer_class = BookListSerializer
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    search_fields = ['title', 'author', 'isbn', 'description']
+    pagination_class = StandardPagination
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter, CatalogOrderingFilter]
     filterset_fields = ['category', 'genres', 'language', 'condition']
     ordering_fields = ['title', 'price', 'average_rating', 'created_at', 'total_sales']
     ordering = ['-created_at']
     
+    @property
+    def keyset_pagination(self):
+        # Cursor pages follow (created_at, id): an explicit ordering or the
+        # relevance order of a search falls back to numbered pages
+        params = self.request.query_params
+        return not (
+            params.get(api_settings.ORDERING_PARAM, '').strip()
+            or params.get(api_settings.SEARCH_PARAM, '').strip()
+        )
+    
     def get_queryset(self):
         queryset = Book.objects.filter(is_published=True)
         
@@ -37,7 +58,6 @@ class BookListView(ListAPIView):
         min_rating = self.request.query_params.get('min_rating')
         in_stock = self.request.query_params.get('in_stock')
         featured = self.request.query_params.get('featured')
-        search = self.request.query_params.get('search')
         
         if min_price:
             queryset = queryset.filter(price__gte=float(min_price))
@@ -50,25 +70,35 @@ class BookListView(ListAPIView):
         if featured and featured.lower() == 'true':
             queryset = queryset.filter(is_featured=True)
         
-        return queryset.select_related('category', 'seller').prefetch_related('genres')
-    
-    def list(self, request, *args, **kwargs):
-        response = super().list(request, *args, **kwargs)
-        
-        # Add pagination metadata as per documentation
-        page = self.paginate_queryset(self.get_queryset())
-        if page is not None:
-            return self.get_paginated_response(response.data)
-        
-        return response
+        return BookListSerializer.setup_eager_loading(queryset)
 
-class BookDetailView(RetrieveAPIView):
-    queryset = Book.objects.filter(is_published=True)
+class BookDetailView(VersionedCacheMixin, RetrieveAPIView):
+    queryset = BookDetailSerializer.setup_eager_loading(Book.objects.filter(is_published=True))
     serializer_class = BookDetailSerializer
     permission_classes = [permissions.AllowAny]
+    
+    def get_cache_scopes(self, request, *args, **kwargs):
+        book_scope = f"book:{kwargs['pk']}"
+        scopes = ['categories', 'genres', book_scope]
+        # The seller's name and store are shown too. Which seller is looked up
+        # once per version of the book, so a cache hit runs no query
+        seller_id = versioned_lookup('seller_id', [book_scope], lambda: (
+            Book.objects.filter(pk=kwargs['pk']).values_list('seller_id', flat=True).first()
+        ))
+        if seller_id is not None:
+            scopes.append(f'seller:{seller_id}')
+        return scopes
+    
+    def dispatch(self, request, *args, **kwargs):
+        response = super().dispatch(request, *args, **kwargs)
+        # Cache hits are views too; counted in memory and written in batches
+        if request.method == 'GET' and response.status_code in (200, 304):
+            events.record('views', kwargs['pk'])
+        return response
 
-class CategoryListView(APIView):
+class CategoryListView(VersionedCacheMixin, APIView):
     permission_classes = [permissions.AllowAny]
+    cache_scopes = ['categories']
     
     def get(self, request):
         categories = Category.objects.all().values_list('name', flat=True)
@@ -76,15 +106,16 @@ class CategoryListView(APIView):
             'categories': list(categories)
         })
 
-class FeaturedBooksView(APIView):
+class FeaturedBooksView(VersionedCacheMixin, APIView):
     permission_classes = [permissions.AllowAny]
+    cache_scopes = ['books']
     
     def get(self, request):
-        featured_books = Book.objects.filter(
-            is_published=True, 
-            is_featured=True,
-            stock_quantity__gt=0
-        )[:8]
+        shelf = shelves.get_shelves(['featured'])['featured']
+        featured_books = shelves.hydrate(
+            shelf.book_ids[:8],
+            BookListSerializer.setup_eager_loading(Book.objects.all())
+        )
         
         serializer = BookListSerializer(featured_books, many=True)
         
@@ -93,14 +124,56 @@ class FeaturedBooksView(APIView):
             'results': serializer.data
         })
 
-# Seller Management Views
-class SellerBookListView(ListAPIView):
-    serializer_class = BookListSerializer
-    permission_classes = [permissions.IsAuthenticated]
+class ShelvesView(VersionedCacheMixin, APIView):
+    """
+    Homepage shelves served from the precomputed BookShelf rows.
+    ?shelves=bestsellers,new_arrivals picks shelves, ?category=<id> scopes them.
+    """
+    permission_classes = [permissions.AllowAny]
+    cache_scopes = ['books', 'categories']
     
-    def get_queryset(self):
-        return Book.objects.filter(seller=self.request.user)
+    def get(self, request):
+        names = request.query_params.get('shelves')
+        names = [name for name in names.split(',') if name] if names else list(shelves.SHELVES)
+        unknown = [name for name in names if name not in shelves.SHELVES]
+        if unknown:
+            return Response(
+                {'error': f"Unknown shelves: {', '.join(unknown)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        category_id = request.query_params.get('category')
+        if category_id is not None:
+            if not category_id.isdigit():
+                return Response({'error': 'Invalid category'}, status=status.HTTP_400_BAD_REQUEST)
+            category_id = int(category_id)
+            # Missing shelves are built and stored on first use; only for real categories
+            if not Category.objects.filter(pk=category_id).exists():
+                return Response({'error': 'Category not found'}, status=status.HTTP_404_NOT_FOUND)
+        
+        try:
+            limit = int(request.query_params.get('limit', shelves.SHELF_SIZE))
+        except ValueError:
+            limit = shelves.SHELF_SIZE
+        limit = max(1, min(limit, shelves.SHELF_SIZE))
+        
+        rows = shelves.get_shelves(names, category_id)
+        book_ids = {book_id for name in names for book_id in rows[name].book_ids[:limit]}
+        books = {
+            book.pk: book for book in shelves.hydrate(
+                list(book_ids),
+                BookListSerializer.setup_eager_loading(Book.objects.all())
+            )
+        }
+        
+        data = {}
+        for name in names:
+            listed = [books[book_id] for book_id in rows[name].book_ids[:limit] if book_id in books]
+            data[name] = BookListSerializer(listed, many=True).data
+        
+        return Response(data)
 
+# Seller Management Views
 class SellerBookCreateView(CreateAPIView):
     serializer_class = BookCreateSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -108,6 +181,49 @@ class SellerBookCreateView(CreateAPIView):
     def perform_create(self, serializer):
         serializer.save(seller=self.request.user)
 
+class SellerBookListView(SellerBookCreateView, ListAPIView):
+    """GET lists the seller's books, POST creates one"""
+    pagination_class = StandardPagination
+    
+    def get_serializer_class(self):
+        if self.request.method == 'POST':
+            return BookCreateSerializer
+        return BookListSerializer
+    
+    def get_queryset(self):
+        return BookListSerializer.setup_eager_loading(Book.objects.filter(seller=self.request.user))
+
+class SellerBookImportView(APIView):
+    """
+    Bulk-create books from an uploaded CSV or JSON Lines file (`file`).
+    The format comes from the file name or an explicit `format` field.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def post(self, request):
+        if request.user.role != 'seller':
+            return Response(
+                {'error': 'Only sellers can import books'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'error': 'Upload the catalog as `file`'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            file_format = detect_format(upload.name, request.data.get('format'))
+        except ImportFormatError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            summary = CatalogImporter(request.user).run(read_rows(upload, file_format))
+        except (UnicodeDecodeError, csv.Error) as e:
+            return Response({'error': f'Could not read file: {e}'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        response_status = status.HTTP_201_CREATED if summary['created'] else status.HTTP_400_BAD_REQUEST
+        return Response(summary, status=response_status)
+
 class SellerBookDetailView(RetrieveAPIView, UpdateAPIView):
     serializer_class = BookCreateSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -119,36 +235,57 @@ class InventoryUpdateView(APIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def patch(self, request, pk):
-        try:
-            book = Book.objects.get(pk=pk, seller=request.user)
-        except Book.DoesNotExist:
-            return Response(
-                {'error': 'Book not found'}, 
-                status=status.HTTP_404_NOT_FOUND
-            )
-        
         serializer = InventoryUpdateSerializer(data=request.data)
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         
         data = serializer.validated_data
         adjustment_type = data.get('adjustment_type', 'set')
+        amount = data['stock_quantity'] if adjustment_type == 'set' else data['adjustment_amount']
         
-        if adjustment_type == 'set':
-            book.stock_quantity = data['stock_quantity']
-        elif adjustment_type == 'add':
-            book.stock_quantity += data['adjustment_amount']
-        elif adjustment_type == 'subtract':
-            book.stock_quantity = max(0, book.stock_quantity - data['adjustment_amount'])
-        
-        book.save()
+        try:
+            book, = apply_stock_operations(
+                request.user,
+                [{'id': pk, 'action': adjustment_type, 'amount': amount}]
+            )
+        except StockOperationError:
+            return Response(
+                {'error': 'Book not found'}, 
+                status=status.HTTP_404_NOT_FOUND
+            )
         
         return Response({
-            'id': book.id,
-            'stock_quantity': book.stock_quantity,
+            'id': book['id'],
+            'stock_quantity': book['stock_quantity'],
             'adjustment_type': adjustment_type,
             'adjustment_amount': data.get('adjustment_amount'),
             'reason': data.get('reason'),
             'notes': data.get('notes'),
-            'updated_at': book.updated_at.isoformat()
+            'updated_at': book['updated_at'].isoformat()
+        })
+
+class BulkInventoryUpdateView(APIView):
+    """
+    Apply many stock operations at once:
+    {"operations": [{"isbn": "...", "action": "subtract", "amount": 2}, {"id": 5, "action": "set", "amount": 40}]}
+    All operations are applied or none are.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    
+    def post(self, request):
+        serializer = BulkInventoryUpdateSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            books = apply_stock_operations(request.user, serializer.validated_data['operations'])
+        except StockOperationError as e:
+            return Response({'operations': e.errors}, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({
+            'updated': len(books),
+            'results': [
+                {'id': book['id'], 'isbn': book['isbn'], 'stock_quantity': book['stock_quantity']}
+                for book in books
+            ]
         })
\ No newline at end of file
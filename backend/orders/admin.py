@@ -1,14 +1,19 @@
 from django.contrib import admin
-from .models import Cart, CartItem, Order, OrderItem, ShippingMethod, ReturnRequest
+from .models import Cart, CartItem, Order, OrderItem, OrderNumberSequence, SellerOrder, ShippingMethod, ReturnRequest
 
 @admin.register(Cart)
 class CartAdmin(admin.ModelAdmin):
     list_display = ('user', 'total_items', 'subtotal', 'created_at')
+    list_select_related = ('user',)
     readonly_fields = ('created_at', 'updated_at')
+    
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_totals()
 
 @admin.register(CartItem)
 class CartItemAdmin(admin.ModelAdmin):
     list_display = ('cart', 'book', 'quantity', 'total_price')
+    list_select_related = ('cart__user', 'book')
     list_filter = ('cart__user',)
 
 @admin.register(ShippingMethod)
@@ -16,18 +21,29 @@ class ShippingMethodAdmin(admin.ModelAdmin):
     list_display = ('name', 'price', 'delivery_days', 'is_active')
     list_editable = ('price', 'is_active')
 
+@admin.register(OrderNumberSequence)
+class OrderNumberSequenceAdmin(admin.ModelAdmin):
+    list_display = ('year', 'last_number')
+
 class OrderItemInline(admin.TabularInline):
     model = OrderItem
-    readonly_fields = ('unit_price', 'total_price')
+    readonly_fields = ('seller_order', 'unit_price', 'total_price')
     extra = 0
 
+class SellerOrderInline(admin.TabularInline):
+    model = SellerOrder
+    fields = ('seller', 'status', 'subtotal', 'item_count', 'tracking_number', 'shipped_at', 'delivered_at')
+    readonly_fields = ('seller', 'subtotal', 'item_count', 'shipped_at', 'delivered_at')
+    extra = 0
+    can_delete = False
+
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
     list_display = ('order_number', 'user', 'status', 'total_amount', 'created_at')
     list_filter = ('status', 'payment_method', 'created_at')
     search_fields = ('order_number', 'user__email')
     readonly_fields = ('order_number', 'created_at', 'updated_at')
-    inlines = [OrderItemInline]
+    inlines = [SellerOrderInline, OrderItemInline]
     
     fieldsets = (
         ('Order Information', {
@@ -49,6 +65,14 @@ class OrderAdmin(admin.ModelAdmin):
         }),
     )
 
+@admin.register(SellerOrder)
+class SellerOrderAdmin(admin.ModelAdmin):
+    list_display = ('order', 'seller', 'status', 'subtotal', 'item_count', 'created_at')
+    list_filter = ('status', 'created_at')
+    search_fields = ('order__order_number', 'seller__email', 'tracking_number')
+    list_select_related = ('order', 'seller')
+    readonly_fields = ('order', 'seller', 'subtotal', 'item_count', 'created_at', 'updated_at')
+
 @admin.register(OrderItem)
 class OrderItemAdmin(admin.ModelAdmin):
     list_display = ('order', 'book', 'quantity', 'unit_price', 'total_price')
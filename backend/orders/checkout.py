@@ -0,0 +1,132 @@
+"""
+Checkout: turn a user's cart into an order without overselling.
+
+The cart row is locked (select_for_update) so the same user can't check out
+twice at once, and its items and books are loaded with one query. Stock is
+reserved with a single conditional UPDATE:
+
+    UPDATE books_book SET stock_quantity = stock_quantity - CASE ... END, ...
+    WHERE id IN (...) AND stock_quantity >= CASE ... END
+
+If it matches fewer rows than there are books in the cart, some book ran out
+between loading the cart and reserving it, and the whole transaction is
+rolled back. Book rows are only write-locked for the duration of that one
+statement, so parallel checkouts of the same books don't queue behind each
+other's validation work.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, DecimalField, F, PositiveIntegerField, Value, When
+
+from books.inventory import refresh_stock_dependents
+from books.models import Book
+from .fulfillment import split_order
+from .models import Cart, Order, OrderItem
+
+TAX_RATE = Decimal('0.10')
+CENT = Decimal('0.01')
+
+
+class CheckoutError(Exception):
+    pass
+
+
+class OutOfStock(CheckoutError):
+    pass
+
+
+def _per_book(items, value, output_field):
+    return Case(
+        *[When(pk=item.book_id, then=Value(value(item))) for item in items],
+        default=Value(0),
+        output_field=output_field
+    )
+
+
+def _reserve_stock(items):
+    """Decrement stock and bump sales counters for every item, or raise OutOfStock"""
+    book_ids = [item.book_id for item in items]
+    quantity = _per_book(items, lambda item: item.quantity, PositiveIntegerField())
+    revenue = _per_book(items, lambda item: item.total_price, DecimalField(max_digits=10, decimal_places=2))
+
+    reserved = Book.objects.filter(
+        pk__in=book_ids,
+        stock_quantity__gte=quantity
+    ).update(
+        stock_quantity=F('stock_quantity') - quantity,
+        total_sales=F('total_sales') + quantity,
+        total_revenue=F('total_revenue') + revenue
+    )
+
+    if reserved != len(book_ids):
+        stock = dict(Book.objects.filter(pk__in=book_ids).values_list('id', 'stock_quantity'))
+        for item in items:
+            if stock.get(item.book_id, 0) < item.quantity:
+                raise OutOfStock(
+                    f"Not enough stock for {item.book.title}. "
+                    f"Available: {stock.get(item.book_id, 0)}, Requested: {item.quantity}"
+                )
+        raise OutOfStock('Some items are no longer available')
+
+
+def place_order(user, data):
+    """
+    Create an order from `user`'s cart using the validated CreateOrderSerializer
+    `data`. Raises CheckoutError (or OutOfStock) if the cart can't be ordered.
+    """
+    with transaction.atomic():
+        cart = Cart.objects.select_for_update().filter(user=user).first()
+        items = list(cart.items.select_related('book').order_by('book_id')) if cart else []
+        if not items:
+            raise CheckoutError('Cart is empty')
+
+        # Fail fast without taking write locks when the cart is plainly short
+        for item in items:
+            if item.quantity > item.book.stock_quantity:
+                raise OutOfStock(
+                    f"Not enough stock for {item.book.title}. "
+                    f"Available: {item.book.stock_quantity}, Requested: {item.quantity}"
+                )
+
+        _reserve_stock(items)
+
+        shipping_method = data['shipping_method_id']
+        subtotal = sum((item.total_price for item in items), Decimal('0'))
+        shipping_cost = shipping_method.price
+        tax_amount = (subtotal * TAX_RATE).quantize(CENT)
+        billing_address = data['shipping_address'] if data['billing_same_as_shipping'] else data['billing_address']
+
+        order = Order.objects.create(
+            user=user,
+            shipping_address=data['shipping_address'],
+            billing_address=billing_address,
+            shipping_method=shipping_method,
+            payment_method=data['payment_method'],
+            subtotal=subtotal,
+            shipping_cost=shipping_cost,
+            tax_amount=tax_amount,
+            total_amount=subtotal + shipping_cost + tax_amount
+        )
+
+        order_items = [
+            OrderItem(
+                order=order,
+                book=item.book,
+                quantity=item.quantity,
+                unit_price=item.book.price,
+                total_price=item.total_price
+            )
+            for item in items
+        ]
+        # One SellerOrder per seller in the cart, so each ships their own part
+        split_order(order, order_items)
+        OrderItem.objects.bulk_create(order_items)
+
+        cart.items.all().delete()
+
+    refresh_stock_dependents(
+        [item.book_id for item in items],
+        {item.book.category_id for item in items}
+    )
+    return order
@@ -0,0 +1,151 @@
+"""
+Per-seller fulfillment of orders.
+
+An Order holds one SellerOrder for each seller whose books it contains
+(orders.models.SellerOrder). Statuses move between the two levels:
+
+- down, when the order itself changes (payment moves it to processing, the
+  buyer cancels, an admin refunds): order_status_changed() moves every part
+  that is behind the order's status to it, and cancels or refunds them all;
+- up, when a seller ships or delivers their part: update_seller_order()
+  saves the part, then moves the order to shipped once every part has
+  shipped, and to delivered once every part has been delivered.
+"""
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Order, SellerOrder
+
+# Forward progress of an order or a part of it
+STATUS_RANK = {'pending': 0, 'processing': 1, 'shipped': 2, 'delivered': 3}
+CLOSED_STATUSES = ('cancelled', 'refunded')
+SELLER_STATUSES = ('shipped', 'delivered')
+
+
+class FulfillmentError(Exception):
+    pass
+
+
+def split_order(order, items):
+    """
+    Create the order's SellerOrders for `items` (unsaved OrderItems with their
+    books loaded) with one bulk insert, and point each item at its part.
+    """
+    parts = {}
+    for item in items:
+        part = parts.setdefault(item.book.seller_id, SellerOrder(
+            order=order,
+            seller_id=item.book.seller_id,
+            status=order.status,
+            subtotal=Decimal('0'),
+            created_at=order.created_at
+        ))
+        part.subtotal += item.total_price
+        part.item_count += item.quantity
+
+    SellerOrder.objects.bulk_create(parts.values())
+    for item in items:
+        item.seller_order = parts[item.book.seller_id]
+    return list(parts.values())
+
+
+def attach_item(item):
+    """Add a single unsaved OrderItem to its seller's part of the order, opening it if needed"""
+    seller_id = item.book.seller_id
+    parts = SellerOrder.objects.filter(order_id=item.order_id, seller_id=seller_id)
+    totals = {'subtotal': F('subtotal') + item.total_price, 'item_count': F('item_count') + item.quantity}
+
+    if not parts.update(**totals):
+        order = item.order
+        try:
+            # Savepoint: a concurrent item of the same seller may open the part first
+            with transaction.atomic():
+                SellerOrder.objects.create(
+                    order=order,
+                    seller_id=seller_id,
+                    status=order.status,
+                    subtotal=item.total_price,
+                    item_count=item.quantity,
+                    created_at=order.created_at
+                )
+        except IntegrityError:
+            parts.update(**totals)
+    item.seller_order_id = parts.values_list('id', flat=True).get()
+
+
+def _timestamps(status, now):
+    if status == 'shipped':
+        return {'shipped_at': now}
+    if status == 'delivered':
+        return {'delivered_at': now}
+    return {}
+
+
+def order_status_changed(order):
+    """Bring the order's parts in line with a new order status (one UPDATE)"""
+    now = timezone.now()
+    parts = SellerOrder.objects.filter(order=order)
+
+    if order.status in CLOSED_STATUSES:
+        parts.exclude(status=order.status).update(status=order.status, updated_at=now)
+    elif order.status in STATUS_RANK:
+        behind = [status for status, rank in STATUS_RANK.items() if rank < STATUS_RANK[order.status]]
+        parts.filter(status__in=behind).update(
+            status=order.status, updated_at=now, **_timestamps(order.status, now)
+        )
+
+
+def _rolled_up_status(statuses):
+    if statuses == {'delivered'}:
+        return 'delivered'
+    if statuses and statuses <= set(SELLER_STATUSES):
+        return 'shipped'
+    return None
+
+
+def update_seller_order(seller_order, status=None, tracking_number=None):
+    """
+    Ship or deliver a seller's part of an order, and move the order along
+    once all its parts have caught up. Raises FulfillmentError for moves a
+    seller can't make.
+    """
+    if status is not None:
+        if status not in SELLER_STATUSES:
+            raise FulfillmentError(f'Status must be one of: {", ".join(SELLER_STATUSES)}')
+        if seller_order.status in CLOSED_STATUSES:
+            raise FulfillmentError(f'This order has been {seller_order.status}')
+        if STATUS_RANK[status] < STATUS_RANK[seller_order.status]:
+            raise FulfillmentError(f'This order has already been {seller_order.status}')
+
+    now = timezone.now()
+    with transaction.atomic():
+        if status is not None and status != seller_order.status:
+            seller_order.status = status
+            for field, value in _timestamps(status, now).items():
+                if getattr(seller_order, field) is None:
+                    setattr(seller_order, field, value)
+            if status == 'delivered' and seller_order.shipped_at is None:
+                seller_order.shipped_at = now
+        if tracking_number is not None:
+            seller_order.tracking_number = tracking_number
+        seller_order.save()
+
+        target = _rolled_up_status(set(
+            SellerOrder.objects.filter(order_id=seller_order.order_id).values_list('status', flat=True)
+        ))
+        if target is None:
+            return seller_order
+
+        order = Order.objects.get(pk=seller_order.order_id)
+        if order.status in STATUS_RANK and STATUS_RANK[order.status] < STATUS_RANK[target]:
+            # A save, so that order signals (analytics counters) see the change
+            order.status = target
+            if target == 'shipped' and not order.shipped_at:
+                order.shipped_at = now
+            elif target == 'delivered' and not order.delivered_at:
+                order.delivered_at = now
+            order.save()
+    return seller_order
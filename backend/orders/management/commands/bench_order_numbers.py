@@ -0,0 +1,56 @@
+import threading
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from orders.models import OrderNumberSequence
+
+# A year no real order uses; its counter row is removed afterwards
+BENCH_YEAR = 9999
+
+class Command(BaseCommand):
+    help = 'Measure order number allocation throughput with parallel workers and check the numbers are unique and gap-free'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=2000, help='Numbers to allocate per worker')
+        parser.add_argument('--workers', type=int, default=8)
+    
+    def handle(self, *args, **options):
+        count, workers = options['count'], options['workers']
+        if OrderNumberSequence.objects.filter(year=BENCH_YEAR).exists():
+            raise CommandError(f'A counter for {BENCH_YEAR} already exists; remove it first')
+        
+        allocated = [[] for _ in range(workers)]
+        errors = []
+        
+        def work(numbers):
+            try:
+                for _ in range(count):
+                    # One transaction per number, like one checkout per order
+                    with transaction.atomic():
+                        numbers.append(OrderNumberSequence.allocate(BENCH_YEAR))
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+        
+        threads = [threading.Thread(target=work, args=(numbers,)) for numbers in allocated]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        
+        OrderNumberSequence.objects.filter(year=BENCH_YEAR).delete()
+        if errors:
+            raise CommandError(f'{len(errors)} workers failed, first error: {errors[0]!r}')
+        
+        numbers = sorted(number for worker in allocated for number in worker)
+        total = count * workers
+        if numbers != list(range(1, total + 1)):
+            raise CommandError('Allocated numbers are not unique and consecutive')
+        
+        self.stdout.write(self.style.SUCCESS(
+            f'{total} numbers from {workers} workers in {elapsed:.2f}s '
+            f'({total / elapsed:,.0f}/s, {elapsed / total * 1000:.3f} ms each); unique and gap-free'
+        ))
\ No newline at end of file
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:26
+
+from django.db import migrations, models
+
+
+def seed_sequences(apps, schema_editor):
+    """Continue each year's numbering from the highest existing order number"""
+    Order = apps.get_model('orders', 'Order')
+    OrderNumberSequence = apps.get_model('orders', 'OrderNumberSequence')
+    
+    last_numbers = {}
+    for order_number in Order.objects.values_list('order_number', flat=True).iterator():
+        try:
+            prefix, year, number = order_number.split('-')
+            year, number = int(year), int(number)
+        except ValueError:
+            continue
+        last_numbers[year] = max(number, last_numbers.get(year, 0))
+    
+    OrderNumberSequence.objects.bulk_create([
+        OrderNumberSequence(year=year, last_number=number)
+        for year, number in last_numbers.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0002_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderNumberSequence',
+            fields=[
+                ('year', models.PositiveIntegerField(primary_key=True, serialize=False)),
+                ('last_number', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(seed_sequences, migrations.RunPython.noop),
+    ]
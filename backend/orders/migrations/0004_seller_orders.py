@@ -0,0 +1,87 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:50
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def split_existing_orders(apps, schema_editor):
+    """One SellerOrder per (order, seller) of the existing order items"""
+    Order = apps.get_model('orders', 'Order')
+    OrderItem = apps.get_model('orders', 'OrderItem')
+    SellerOrder = apps.get_model('orders', 'SellerOrder')
+    
+    rows = list(OrderItem.objects.values('order_id', 'book__seller_id').annotate(
+        subtotal=Sum('total_price'),
+        item_count=Sum('quantity')
+    ).order_by('order_id'))
+    for start in range(0, len(rows), 500):
+        chunk = rows[start:start + 500]
+        orders = Order.objects.in_bulk({row['order_id'] for row in chunk})
+        parts = SellerOrder.objects.bulk_create([
+            SellerOrder(
+                order_id=row['order_id'],
+                seller_id=row['book__seller_id'],
+                status=orders[row['order_id']].status,
+                subtotal=row['subtotal'],
+                item_count=row['item_count'],
+                created_at=orders[row['order_id']].created_at,
+                shipped_at=orders[row['order_id']].shipped_at,
+                delivered_at=orders[row['order_id']].delivered_at
+            )
+            for row in chunk
+        ])
+        for part in parts:
+            OrderItem.objects.filter(order_id=part.order_id, book__seller_id=part.seller_id).update(
+                seller_order_id=part.pk
+            )
+
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0003_order_number_sequence'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SellerOrder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('shipped', 'Shipped'), ('delivered', 'Delivered'), ('cancelled', 'Cancelled'), ('refunded', 'Refunded')], default='pending', max_length=20)),
+                ('subtotal', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('item_count', models.PositiveIntegerField(default=0)),
+                ('tracking_number', models.CharField(blank=True, max_length=100)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('shipped_at', models.DateTimeField(blank=True, null=True)),
+                ('delivered_at', models.DateTimeField(blank=True, null=True)),
+                ('order', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='seller_orders', to='orders.order')),
+                ('seller', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='seller_orders', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='seller_order',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='items', to='orders.sellerorder'),
+        ),
+        migrations.AddIndex(
+            model_name='sellerorder',
+            index=models.Index(fields=['seller', 'created_at', 'id'], name='orders_sell_seller__741e32_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sellerorder',
+            index=models.Index(fields=['seller', 'status', 'created_at'], name='orders_sell_seller__d151f3_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='sellerorder',
+            unique_together={('order', 'seller')},
+        ),
+        migrations.RunPython(split_existing_orders, migrations.RunPython.noop),
+    ]
@@ -1,10 +1,24 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import F, Sum
+from django.db.models.functions import Coalesce
 from django.core.validators import MinValueValidator
 from django.forms import ValidationError
 from decimal import Decimal
 from accounts.models import User
 from books.models import Book
 
+class CartQuerySet(models.QuerySet):
+    def with_totals(self):
+        """Annotate item count and subtotal, computed in the same query as the carts"""
+        return self.annotate(
+            item_count=Coalesce(Sum('items__quantity'), 0),
+            items_subtotal=Coalesce(
+                Sum(F('items__quantity') * F('items__book__price')),
+                Decimal('0'),
+                output_field=models.DecimalField(max_digits=10, decimal_places=2)
+            )
+        )
+
 class Cart(models.Model):
     user = models.OneToOneField(
         User, 
@@ -14,19 +28,30 @@ class Cart(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = CartQuerySet.as_manager()
+    
     class Meta:
         ordering = ['-created_at']
     
     def __str__(self):
         return f"Cart for {self.user.email}"
     
+    def _load_totals(self):
+        # Carts loaded with Cart.objects.with_totals() already have these
+        if not hasattr(self, 'item_count'):
+            totals = Cart.objects.with_totals().filter(pk=self.pk).values('item_count', 'items_subtotal').get()
+            self.item_count = totals['item_count']
+            self.items_subtotal = totals['items_subtotal']
+    
     @property
     def total_items(self):
-        return sum(item.quantity for item in self.items.all())
+        self._load_totals()
+        return self.item_count
     
     @property
     def subtotal(self):
-        return sum(item.total_price for item in self.items.all())
+        self._load_totals()
+        return self.items_subtotal
 
 class CartItem(models.Model):
     cart = models.ForeignKey(
@@ -96,6 +121,38 @@ class Address(models.Model):
     def __str__(self):
         return f"{self.street_address}, {self.city}, {self.state} {self.zip_code}"
 
+class OrderNumberSequence(models.Model):
+    """
+    Per-year counter behind BNC-YYYY-XXXX order numbers.
+    
+    allocate() increments the year's row in place, so numbering costs one
+    indexed UPDATE and one primary key read no matter how many orders exist.
+    The row stays locked until the surrounding transaction ends: concurrent
+    checkouts get distinct numbers, and a rolled back checkout hands its
+    number back, so the sequence has no gaps.
+    """
+    year = models.PositiveIntegerField(primary_key=True)
+    last_number = models.PositiveIntegerField(default=0)
+    
+    def __str__(self):
+        return f"{self.year}: {self.last_number}"
+    
+    @classmethod
+    def allocate(cls, year):
+        with transaction.atomic():
+            updated = cls.objects.filter(year=year).update(last_number=F('last_number') + 1)
+            if not updated:
+                try:
+                    # First order of the year; a savepoint so losing the
+                    # race to create the row doesn't abort the transaction
+                    with transaction.atomic():
+                        cls.objects.create(year=year, last_number=1)
+                    return 1
+                except IntegrityError:
+                    cls.objects.filter(year=year).update(last_number=F('last_number') + 1)
+            
+            return cls.objects.filter(year=year).values_list('last_number', flat=True).get()
+
 class Order(models.Model):
     STATUS_CHOICES = [
         ('pending', 'Pending'),
@@ -157,6 +214,10 @@ class Order(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination over (created_at, id)
+            models.Index(fields=['user', 'created_at', 'id']),
+        ]
     
     def __str__(self):
         return self.order_number
@@ -166,17 +227,11 @@ class Order(models.Model):
             # Generate order number: BNC-YYYY-XXXX
             from django.utils import timezone
             year = timezone.now().year
-            last_order = Order.objects.filter(
-                created_at__year=year
-            ).order_by('-id').first()
-            
-            if last_order:
-                last_number = int(last_order.order_number.split('-')[-1])
-                new_number = last_number + 1
-            else:
-                new_number = 1
-                
-            self.order_number = f"BNC-{year}-{new_number:04d}"
+            with transaction.atomic():
+                new_number = OrderNumberSequence.allocate(year)
+                self.order_number = f"BNC-{year}-{new_number:04d}"
+                super().save(*args, **kwargs)
+            return
         
         super().save(*args, **kwargs)
     def can_user_review_book(self, user, book):
@@ -186,12 +241,65 @@ class Order(models.Model):
         
         return self.items.filter(book=book).exists()
 
+class SellerOrder(models.Model):
+    """
+    One seller's part of an Order: their items, totals and fulfillment status.
+    
+    Checkout splits every order into one SellerOrder per seller, so seller
+    order lists, counts and status updates read this table by its indexed
+    seller_id, without joining order items to books. Each seller ships their
+    part independently; the order follows once every part has shipped or
+    been delivered (see orders.fulfillment).
+    """
+    order = models.ForeignKey(
+        Order, 
+        on_delete=models.CASCADE, 
+        related_name='seller_orders'
+    )
+    seller = models.ForeignKey(
+        User, 
+        on_delete=models.PROTECT, 
+        related_name='seller_orders'
+    )
+    status = models.CharField(
+        max_length=20, 
+        choices=Order.STATUS_CHOICES, 
+        default='pending'
+    )
+    subtotal = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    item_count = models.PositiveIntegerField(default=0)
+    tracking_number = models.CharField(max_length=100, blank=True)
+    
+    # Copied from the order, so seller lists sort on this table's index
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField(auto_now=True)
+    shipped_at = models.DateTimeField(null=True, blank=True)
+    delivered_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        unique_together = ['order', 'seller']
+        indexes = [
+            models.Index(fields=['seller', 'created_at', 'id']),
+            models.Index(fields=['seller', 'status', 'created_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.order.order_number} - {self.seller.email}"
+
 class OrderItem(models.Model):
     order = models.ForeignKey(
         Order, 
         on_delete=models.CASCADE, 
         related_name='items'
     )
+    seller_order = models.ForeignKey(
+        SellerOrder, 
+        on_delete=models.SET_NULL, 
+        null=True, 
+        blank=True,
+        related_name='items'
+    )
     book = models.ForeignKey(Book, on_delete=models.PROTECT)
     quantity = models.PositiveIntegerField()
     unit_price = models.DecimalField(max_digits=8, decimal_places=2)
@@ -202,6 +310,18 @@ class OrderItem(models.Model):
     
     def __str__(self):
         return f"{self.quantity} x {self.book.title}"
+    
+    def save(self, *args, **kwargs):
+        # Items added one at a time join (or open) their seller's part;
+        # checkout splits its items in bulk instead
+        if self.pk is None and self.seller_order_id is None:
+            from .fulfillment import attach_item
+            with transaction.atomic():
+                attach_item(self)
+                super().save(*args, **kwargs)
+            return
+        
+        super().save(*args, **kwargs)
 
 class ReturnRequest(models.Model):
     REASON_CHOICES = [
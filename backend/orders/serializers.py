@@ -1,21 +1,26 @@
 from rest_framework import serializers
 from django.core.exceptions import ValidationError
-from .models import Cart, CartItem, Order, OrderItem, ShippingMethod, ReturnRequest, ReturnItem
+from .models import Cart, CartItem, Order, OrderItem, SellerOrder, ShippingMethod, ReturnRequest, ReturnItem
 from books.serializers import BookListSerializer
+from bnc_books.serializers import EagerLoadingMixin
 
-class CartItemSerializer(serializers.ModelSerializer):
+class CartItemSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     book = BookListSerializer(read_only=True)
     total_price = serializers.ReadOnlyField()
     
+    nested_select_related = {'book': BookListSerializer}
+    
     class Meta:
         model = CartItem
         fields = ('id', 'book', 'quantity', 'total_price', 'added_at')
 
-class CartSerializer(serializers.ModelSerializer):
+class CartSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     items = CartItemSerializer(many=True, read_only=True)
     total_items = serializers.ReadOnlyField()
     subtotal = serializers.ReadOnlyField()
     
+    nested_prefetch_related = {'items': CartItemSerializer}
+    
     class Meta:
         model = Cart
         fields = ('id', 'user', 'items', 'total_items', 'subtotal', 'created_at', 'updated_at')
@@ -76,14 +81,16 @@ class AddressSerializer(serializers.Serializer):
     country = serializers.CharField(max_length=100, default='US')
     phone = serializers.CharField(max_length=20, required=False, allow_blank=True)
 
-class OrderItemSerializer(serializers.ModelSerializer):
+class OrderItemSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     book = BookListSerializer(read_only=True)
     
+    nested_select_related = {'book': BookListSerializer}
+    
     class Meta:
         model = OrderItem
         fields = ('id', 'book', 'quantity', 'unit_price', 'total_price')
 
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     items = OrderItemSerializer(many=True, read_only=True)
     shipping_address = serializers.JSONField()
     billing_address = serializers.JSONField()
@@ -91,6 +98,10 @@ class OrderSerializer(serializers.ModelSerializer):
     has_reviewed = serializers.SerializerMethodField()
     return_requested = serializers.SerializerMethodField()
     
+    select_related_fields = ('shipping_method',)
+    prefetch_related_fields = ('return_requests',)
+    nested_prefetch_related = {'items': OrderItemSerializer}
+    
     class Meta:
         model = Order
         fields = (
@@ -116,6 +127,36 @@ class OrderDetailSerializer(OrderSerializer):
             'cancelled_at', 'updated_at'
         )
 
+class SellerOrderSerializer(EagerLoadingMixin, serializers.ModelSerializer):
+    """
+    A seller's part of an order. `id` is the order's id (what the seller
+    order endpoints take); `total_amount` and `items` cover this seller's
+    books only.
+    """
+    id = serializers.IntegerField(source='order_id', read_only=True)
+    seller_order_id = serializers.IntegerField(source='pk', read_only=True)
+    order_number = serializers.CharField(source='order.order_number', read_only=True)
+    user = serializers.IntegerField(source='order.user_id', read_only=True)
+    items = OrderItemSerializer(many=True, read_only=True)
+    shipping_address = serializers.JSONField(source='order.shipping_address', read_only=True)
+    shipping_method = ShippingMethodSerializer(source='order.shipping_method', read_only=True)
+    payment_method = serializers.CharField(source='order.payment_method', read_only=True)
+    total_amount = serializers.DecimalField(source='subtotal', max_digits=10, decimal_places=2, read_only=True)
+    order_status = serializers.CharField(source='order.status', read_only=True)
+    
+    select_related_fields = ('order__shipping_method',)
+    nested_prefetch_related = {'items': OrderItemSerializer}
+    
+    class Meta:
+        model = SellerOrder
+        fields = (
+            'id', 'seller_order_id', 'order_number', 'user', 'items',
+            'shipping_address', 'shipping_method', 'payment_method',
+            'subtotal', 'total_amount', 'item_count', 'status', 'order_status',
+            'tracking_number', 'created_at', 'shipped_at', 'delivered_at'
+        )
+        read_only_fields = fields
+
 class CreateOrderSerializer(serializers.Serializer):
     shipping_address = AddressSerializer(required=True)
     billing_address = AddressSerializer(required=False)
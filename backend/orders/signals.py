@@ -0,0 +1,15 @@
+from django.db.models.signals import post_init, post_save
+from django.dispatch import receiver
+from .models import Order
+from . import fulfillment
+
+@receiver(post_init, sender=Order)
+def remember_fulfillment_status(sender, instance, **kwargs):
+    instance._fulfillment_status = instance.__dict__.get('status')
+
+@receiver(post_save, sender=Order)
+def update_seller_orders(sender, instance, created, **kwargs):
+    """Move the sellers' parts of the order along with its status"""
+    if not created and instance.status != instance._fulfillment_status:
+        fulfillment.order_status_changed(instance)
+    instance._fulfillment_status = instance.status
\ No newline at end of file
@@ -1,3 +1,353 @@
-from django.test import TestCase
+import io
+import threading
+from decimal import Decimal
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from accounts.models import User
+from bnc_books.testing import QueryScalingAssertionsMixin
+from books.models import Book, Category, Genre
+from books.tests import make_book, make_seller
+from .checkout import OutOfStock, _reserve_stock, place_order
+from .models import Cart, CartItem, Order, OrderItem, OrderNumberSequence, SellerOrder, ShippingMethod
 
-# Create your tests here.
+ADDRESS = {
+    'first_name': 'Test',
+    'last_name': 'Buyer',
+    'street_address': '1 Main Street',
+    'city': 'Springfield',
+    'state': 'IL',
+    'zip_code': '62701',
+    'country': 'US',
+}
+
+class OrderQueryCountTests(QueryScalingAssertionsMixin, TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.buyer = User.objects.create_user(
+            username='buyer@example.com', email='buyer@example.com', role='buyer'
+        )
+        self.client.force_authenticate(self.buyer)
+        self.category = Category.objects.create(name='Fiction')
+        self.genre = Genre.objects.create(name='Fantasy')
+        self.shipping_method = ShippingMethod.objects.create(
+            name='Standard', price=Decimal('5.00'), delivery_days='3-5'
+        )
+        self.books = []
+    
+    def new_book(self):
+        index = len(self.books)
+        seller = make_seller(f'seller{index}@example.com', f'Store {index}')
+        book = make_book(seller, self.category, index)
+        book.genres.add(self.genre)
+        self.books.append(book)
+        return book
+    
+    def test_cart_queries_do_not_scale(self):
+        cart = Cart.objects.create(user=self.buyer)
+        
+        def grow(size):
+            while cart.items.count() < size:
+                CartItem.objects.create(cart=cart, book=self.new_book(), quantity=2)
+        
+        self.assertQueriesDoNotScale(lambda: self.client.get('/api/orders/cart/'), grow)
+    
+    def test_cart_totals_come_from_one_annotated_query(self):
+        cart = Cart.objects.create(user=self.buyer)
+        for quantity in (1, 2, 3):
+            CartItem.objects.create(cart=cart, book=self.new_book(), quantity=quantity)
+        
+        # Cart with totals, items with books, genres
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/orders/cart/')
+        
+        self.assertEqual(response.data['total_items'], 6)
+        self.assertEqual(response.data['subtotal'], Decimal('60.00'))
+        self.assertEqual(len(response.data['items']), 3)
+        
+        # Carts loaded without the annotation fall back to one aggregate query
+        cart = Cart.objects.get(pk=cart.pk)
+        with self.assertNumQueries(1):
+            self.assertEqual((cart.total_items, cart.subtotal), (6, Decimal('60.00')))
+    
+    def test_add_to_cart_returns_the_cart(self):
+        book = self.new_book()
+        response = self.client.post('/api/orders/cart/items/', {'book': book.pk, 'quantity': 2}, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data['total_items'], 2)
+        self.assertEqual([item['book']['id'] for item in response.data['items']], [book.pk])
+    
+    def test_user_orders_queries_do_not_scale(self):
+        def grow(size):
+            while Order.objects.filter(user=self.buyer).count() < size:
+                order = Order.objects.create(
+                    user=self.buyer,
+                    payment_method='credit_card',
+                    shipping_address=ADDRESS,
+                    billing_address=ADDRESS,
+                    shipping_method=self.shipping_method,
+                    subtotal=Decimal('20.00'),
+                    shipping_cost=Decimal('5.00'),
+                    total_amount=Decimal('25.00')
+                )
+                for _ in range(2):
+                    OrderItem.objects.create(
+                        order=order, book=self.new_book(), quantity=1,
+                        unit_price=Decimal('10.00'), total_price=Decimal('10.00')
+                    )
+        
+        self.assertQueriesDoNotScale(lambda: self.client.get('/api/orders/'), grow)
+
+class CheckoutTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.buyer = User.objects.create_user(
+            username='buyer@example.com', email='buyer@example.com', role='buyer'
+        )
+        self.client.force_authenticate(self.buyer)
+        self.category = Category.objects.create(name='Fiction')
+        self.seller = make_seller()
+        self.shipping_method = ShippingMethod.objects.create(
+            name='Standard', price=Decimal('5.00'), delivery_days='3-5'
+        )
+        self.books = [make_book(self.seller, self.category, index, price=Decimal('12.50')) for index in range(5)]
+        self.cart = Cart.objects.create(user=self.buyer)
+    
+    def checkout(self):
+        return self.client.post('/api/orders/create/', {
+            'shipping_address': ADDRESS,
+            'shipping_method_id': self.shipping_method.pk,
+            'payment_method': 'credit_card',
+            'billing_same_as_shipping': True,
+        }, format='json')
+    
+    def test_checkout_reserves_stock_and_creates_items_in_bulk(self):
+        for book in self.books:
+            CartItem.objects.create(cart=self.cart, book=book, quantity=2)
+        
+        with CaptureQueriesContext(connection) as context:
+            response = self.checkout()
+        
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(Decimal(response.data['subtotal']), Decimal('125.00'))
+        self.assertEqual(Decimal(response.data['tax_amount']), Decimal('12.50'))
+        self.assertEqual(Decimal(response.data['total_amount']), Decimal('142.50'))
+        self.assertEqual(len(response.data['items']), 5)
+        self.assertFalse(self.cart.items.exists())
+        
+        book = Book.objects.get(pk=self.books[0].pk)
+        self.assertEqual((book.stock_quantity, book.total_sales, book.total_revenue), (18, 2, Decimal('25.00')))
+        
+        writes = [q['sql'] for q in context.captured_queries if q['sql'].startswith(('UPDATE "books_book"', 'INSERT INTO "orders_orderitem"'))]
+        self.assertEqual(len(writes), 2)
+    
+    def test_checkout_rolls_back_when_any_book_is_short(self):
+        CartItem.objects.create(cart=self.cart, book=self.books[0], quantity=2)
+        CartItem.objects.create(cart=self.cart, book=self.books[1], quantity=21)
+        
+        response = self.checkout()
+        
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Not enough stock for Book 1', response.data['error'])
+        self.assertEqual(Book.objects.get(pk=self.books[0].pk).stock_quantity, 20)
+        self.assertFalse(Order.objects.exists())
+        self.assertEqual(self.cart.items.count(), 2)
+    
+    def test_reservation_rechecks_stock_that_changed_after_loading(self):
+        CartItem.objects.create(cart=self.cart, book=self.books[0], quantity=3)
+        CartItem.objects.create(cart=self.cart, book=self.books[1], quantity=3)
+        items = list(self.cart.items.select_related('book'))
+        # Another checkout takes most of one book after the cart was loaded
+        Book.objects.filter(pk=self.books[1].pk).update(stock_quantity=2)
+        
+        with self.assertRaises(OutOfStock):
+            with transaction.atomic():
+                _reserve_stock(items)
+        
+        self.assertEqual(Book.objects.get(pk=self.books[0].pk).stock_quantity, 20)
+        self.assertEqual(Book.objects.get(pk=self.books[1].pk).stock_quantity, 2)
+    
+    def test_empty_cart_is_rejected(self):
+        self.assertEqual(self.checkout().data, {'error': 'Cart is empty'})
+
+class CheckoutConcurrencyTests(TransactionTestCase):
+    """
+    Parallel checkouts competing for the last copies of a book. Needs a
+    database with real locking (the SQLite test database is a file).
+    """
+    buyers = 12
+    stock = 5
+    
+    def test_parallel_checkouts_never_oversell(self):
+        seller = make_seller()
+        book = make_book(seller, Category.objects.create(name='Fiction'), 1, stock_quantity=self.stock)
+        shipping_method = ShippingMethod.objects.create(name='Standard', price=Decimal('5.00'), delivery_days='3-5')
+        buyers = []
+        for index in range(self.buyers):
+            buyer = User.objects.create_user(username=f'b{index}@example.com', email=f'b{index}@example.com')
+            CartItem.objects.create(cart=Cart.objects.create(user=buyer), book=book, quantity=1)
+            buyers.append(buyer)
+        
+        data = {
+            'shipping_address': ADDRESS,
+            'shipping_method_id': shipping_method,
+            'payment_method': 'credit_card',
+            'billing_same_as_shipping': True,
+        }
+        barrier = threading.Barrier(self.buyers)
+        outcomes = []
+        
+        def checkout(buyer):
+            barrier.wait()
+            try:
+                place_order(buyer, data)
+                outcomes.append('ordered')
+            except OutOfStock:
+                outcomes.append('out_of_stock')
+            finally:
+                connection.close()
+        
+        threads = [threading.Thread(target=checkout, args=(buyer,)) for buyer in buyers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        book.refresh_from_db()
+        self.assertEqual(outcomes.count('ordered'), self.stock)
+        self.assertEqual(outcomes.count('out_of_stock'), self.buyers - self.stock)
+        self.assertEqual(book.stock_quantity, 0)
+        self.assertEqual(book.total_sales, self.stock)
+        self.assertEqual(OrderItem.objects.filter(book=book).count(), self.stock)
+
+class OrderNumberTests(TestCase):
+    def make_order(self, user):
+        return Order.objects.create(
+            user=user,
+            payment_method='credit_card',
+            shipping_address=ADDRESS,
+            billing_address=ADDRESS,
+            subtotal=Decimal('10.00'),
+            shipping_cost=Decimal('0.00'),
+            total_amount=Decimal('10.00')
+        )
+    
+    def test_numbers_continue_from_the_year_counter_in_constant_queries(self):
+        user = User.objects.create_user(username='b@example.com', email='b@example.com')
+        year = timezone.now().year
+        OrderNumberSequence.objects.create(year=year, last_number=41)
+        
+        with CaptureQueriesContext(connection) as context:
+            order = self.make_order(user)
+        
+        statements = [q['sql'].split()[0] for q in context.captured_queries if 'SAVEPOINT' not in q['sql']]
+        self.assertEqual(statements, ['UPDATE', 'SELECT', 'INSERT'])
+
+        self.assertEqual(order.order_number, f'BNC-{year}-0042')
+        self.assertEqual(self.make_order(user).order_number, f'BNC-{year}-0043')
+    
+    def test_failed_insert_returns_its_number(self):
+        user = User.objects.create_user(username='b@example.com', email='b@example.com')
+        year = timezone.now().year
+        first = self.make_order(user)
+        
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Order.objects.create(user=user, payment_method='credit_card', shipping_address=ADDRESS, billing_address=ADDRESS)
+        
+        self.assertEqual(first.order_number, f'BNC-{year}-0001')
+        self.assertEqual(self.make_order(user).order_number, f'BNC-{year}-0002')
+
+class OrderNumberConcurrencyTests(TransactionTestCase):
+    def test_parallel_allocation_is_unique_and_gap_free(self):
+        # The benchmark command fails unless every number is handed out once
+        call_command('bench_order_numbers', count=25, workers=6, stdout=io.StringIO())
+
+class SellerOrderTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        category = Category.objects.create(name='Fiction')
+        self.sellers = [make_seller(), make_seller('other@example.com', 'Other Store')]
+        self.books = [
+            make_book(self.sellers[0], category, 1),
+            make_book(self.sellers[0], category, 2),
+            make_book(self.sellers[1], category, 3),
+        ]
+        self.buyer = User.objects.create_user(username='buyer@example.com', email='buyer@example.com')
+        cart = Cart.objects.create(user=self.buyer)
+        for book, quantity in zip(self.books, (1, 2, 3)):
+            CartItem.objects.create(cart=cart, book=book, quantity=quantity)
+        shipping_method = ShippingMethod.objects.create(name='Standard', price=Decimal('5.00'), delivery_days='3-5')
+        
+        with CaptureQueriesContext(connection) as context:
+            self.order = place_order(self.buyer, {
+                'shipping_address': ADDRESS,
+                'shipping_method_id': shipping_method,
+                'payment_method': 'credit_card',
+                'billing_same_as_shipping': True,
+            })
+        self.checkout_queries = context.captured_queries
+    
+    def part(self, seller):
+        return SellerOrder.objects.get(order=self.order, seller=seller)
+    
+    def patch(self, seller, data):
+        self.client.force_authenticate(seller)
+        return self.client.patch(f'/api/analytics/seller/orders/{self.order.pk}/', data, format='json')
+    
+    def test_checkout_splits_the_order_per_seller(self):
+        parts = {part.seller_id: part for part in SellerOrder.objects.filter(order=self.order)}
+        self.assertEqual(set(parts), {seller.pk for seller in self.sellers})
+        first, second = parts[self.sellers[0].pk], parts[self.sellers[1].pk]
+        self.assertEqual((first.subtotal, first.item_count), (self.books[0].price + 2 * self.books[1].price, 3))
+        self.assertEqual((second.subtotal, second.item_count), (3 * self.books[2].price, 3))
+        self.assertEqual(first.created_at, self.order.created_at)
+        self.assertEqual(set(first.items.values_list('book_id', flat=True)), {self.books[0].pk, self.books[1].pk})
+        
+        inserts = [q for q in self.checkout_queries if q['sql'].startswith('INSERT INTO "orders_sellerorder"')]
+        self.assertEqual(len(inserts), 1)
+    
+    def test_sellers_ship_their_parts_independently(self):
+        self.order.status = 'processing'
+        self.order.save()
+        self.assertEqual(self.part(self.sellers[1]).status, 'processing')
+        
+        response = self.patch(self.sellers[0], {'status': 'shipped', 'tracking_number': 'TRACK-1'})
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual((response.data['status'], response.data['order_status']), ('shipped', 'processing'))
+        self.assertEqual(self.part(self.sellers[0]).tracking_number, 'TRACK-1')
+        
+        self.patch(self.sellers[1], {'status': 'shipped'})
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, 'shipped')
+        self.assertIsNotNone(self.order.shipped_at)
+        
+        for seller in self.sellers:
+            self.patch(seller, {'status': 'delivered'})
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, 'delivered')
+        
+        self.assertEqual(self.patch(self.sellers[0], {'status': 'shipped'}).status_code, 400)
+    
+    def test_cancelling_the_order_cancels_every_part(self):
+        self.client.force_authenticate(self.buyer)
+        self.client.post(f'/api/orders/{self.order.pk}/cancel/')
+        self.assertEqual(set(SellerOrder.objects.filter(order=self.order).values_list('status', flat=True)), {'cancelled'})
+        self.assertEqual(self.patch(self.sellers[0], {'status': 'shipped'}).status_code, 400)
+    
+    def test_seller_order_list_reads_its_own_table(self):
+        self.client.force_authenticate(self.sellers[1])
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get('/api/analytics/seller/orders/')
+        
+        self.assertEqual(response.data['count'], 1)
+        order = response.data['results'][0]
+        self.assertEqual((order['id'], Decimal(order['total_amount'])), (self.order.pk, 3 * self.books[2].price))
+        self.assertEqual([item['book']['id'] for item in order['items']], [self.books[2].pk])
+        
+        self.assertFalse(any('DISTINCT' in q['sql'] for q in context.captured_queries))
+        count = next(q['sql'] for q in context.captured_queries if 'COUNT(' in q['sql'])
+        self.assertIn('"orders_sellerorder"', count)
+        self.assertNotIn('JOIN', count)
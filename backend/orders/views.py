@@ -3,21 +3,34 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.generics import ListAPIView, RetrieveAPIView, DestroyAPIView
 from django.shortcuts import get_object_or_404
-from django.db import transaction
+from django.db.models import prefetch_related_objects
 from django.utils import timezone
+from analytics import events
+from bnc_books.pagination import StandardPagination
 from .models import Cart, CartItem, Order, OrderItem, ShippingMethod
+from .checkout import CheckoutError, place_order
 from .serializers import (
     CartSerializer, AddToCartSerializer, UpdateCartItemSerializer,
     OrderSerializer, OrderDetailSerializer, CreateOrderSerializer,
     ShippingMethodSerializer, ReturnRequestSerializer
 )
 
+def load_cart(user):
+    """
+    The user's cart with totals annotated and items prefetched: a fixed
+    number of queries however many items the cart holds.
+    """
+    cart = CartSerializer.setup_eager_loading(Cart.objects.with_totals()).filter(user=user).first()
+    if cart is None:
+        cart, created = Cart.objects.get_or_create(user=user)
+        prefetch_related_objects([cart], *CartSerializer.get_prefetch_related())
+    return cart
+
 class CartView(APIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def get(self, request):
-        cart, created = Cart.objects.get_or_create(user=request.user)
-        serializer = CartSerializer(cart)
+        serializer = CartSerializer(load_cart(request.user))
         return Response(serializer.data)
 
 class AddToCartView(APIView):
@@ -46,8 +59,10 @@ class AddToCartView(APIView):
             cart_item.quantity += quantity
             cart_item.save()
         
+        events.record('add_to_cart_count', book.pk)
+        
         # Serialize the response
-        response_serializer = CartSerializer(cart_item)
+        response_serializer = CartSerializer(load_cart(request.user))
         return Response(response_serializer.data, status=status.HTTP_201_CREATED)
 
 class UpdateCartItemView(APIView):
@@ -55,7 +70,7 @@ class UpdateCartItemView(APIView):
     
     def patch(self, request, item_id):
         try:
-            cart_item = CartItem.objects.get(
+            cart_item = CartItem.objects.select_related('book').get(
                 pk=item_id,
                 cart__user=request.user
             )
@@ -85,8 +100,8 @@ class UpdateCartItemView(APIView):
         
         serializer.save()
         
-        # Return updated cart item
-        cart_serializer = CartSerializer(cart_item)
+        # Return updated cart
+        cart_serializer = CartSerializer(load_cart(request.user))
         return Response(cart_serializer.data)
 
 class RemoveFromCartView(APIView):
@@ -132,92 +147,29 @@ class ShippingMethodsView(APIView):
 class CreateOrderView(APIView):
     permission_classes = [permissions.IsAuthenticated]
     
-    @transaction.atomic
     def post(self, request):
         serializer = CreateOrderSerializer(data=request.data)
         
         if not serializer.is_valid():
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         
-        # Get user's cart
         try:
-            cart = Cart.objects.get(user=request.user)
-        except Cart.DoesNotExist:
-            return Response(
-                {'error': 'Cart is empty'}, 
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        if cart.items.count() == 0:
-            return Response(
-                {'error': 'Cart is empty'}, 
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        # Validate cart items stock
-        for cart_item in cart.items.all():
-            if cart_item.quantity > cart_item.book.stock_quantity:
-                return Response({
-                    'error': f"Not enough stock for {cart_item.book.title}. Available: {cart_item.book.stock_quantity}, Requested: {cart_item.quantity}"
-                }, status=status.HTTP_400_BAD_REQUEST)
-        
-        data = serializer.validated_data
-        shipping_method = data['shipping_method_id']
-        
-        # Calculate totals
-        subtotal = cart.subtotal
-        shipping_cost = shipping_method.price
-        tax_amount = subtotal * 0.1  # 10% tax for example
-        total_amount = subtotal + shipping_cost + tax_amount
-        
-        # Handle billing address
-        if data['billing_same_as_shipping']:
-            billing_address = data['shipping_address']
-        else:
-            billing_address = data['billing_address']
-        
-        # Create order
-        order = Order.objects.create(
-            user=request.user,
-            shipping_address=data['shipping_address'],
-            billing_address=billing_address,
-            shipping_method=shipping_method,
-            payment_method=data['payment_method'],
-            subtotal=subtotal,
-            shipping_cost=shipping_cost,
-            tax_amount=tax_amount,
-            total_amount=total_amount
-        )
-        
-        # Create order items and update book stock
-        for cart_item in cart.items.all():
-            OrderItem.objects.create(
-                order=order,
-                book=cart_item.book,
-                quantity=cart_item.quantity,
-                unit_price=cart_item.book.price,
-                total_price=cart_item.total_price
-            )
-            
-            # Update book stock
-            cart_item.book.stock_quantity -= cart_item.quantity
-            cart_item.book.total_sales += cart_item.quantity
-            cart_item.book.total_revenue += cart_item.total_price
-            cart_item.book.save()
-        
-        # Clear the cart
-        cart.items.all().delete()
+            order = place_order(request.user, serializer.validated_data)
+        except CheckoutError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         
         # Serialize response
+        prefetch_related_objects([order], *OrderSerializer.get_prefetch_related())
         order_serializer = OrderSerializer(order)
         return Response(order_serializer.data, status=status.HTTP_201_CREATED)
 
 class UserOrdersView(ListAPIView):
     serializer_class = OrderSerializer
     permission_classes = [permissions.IsAuthenticated]
+    pagination_class = StandardPagination
     
     def get_queryset(self):
-        queryset = Order.objects.filter(user=self.request.user)
+        queryset = OrderSerializer.setup_eager_loading(Order.objects.filter(user=self.request.user))
         
         # Filter by status if provided
         status_filter = self.request.query_params.get('status')
@@ -231,7 +183,7 @@ class OrderDetailView(RetrieveAPIView):
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
-        return Order.objects.filter(user=self.request.user)
+        return OrderDetailSerializer.setup_eager_loading(Order.objects.filter(user=self.request.user))
 
 class CancelOrderView(APIView):
     permission_classes = [permissions.IsAuthenticated]
@@ -0,0 +1,9 @@
+from django.core.management.base import BaseCommand
+from reviews.ratings import rebuild
+
+class Command(BaseCommand):
+    help = "Recompute every book's rating counters, histogram and average from its approved reviews"
+    
+    def handle(self, *args, **options):
+        changed = rebuild()
+        self.stdout.write(self.style.SUCCESS(f'Corrected ratings of {changed} books'))
@@ -0,0 +1,39 @@
+from django.db import migrations
+from django.db.models import Count, Q, Sum
+
+
+def backfill(apps, schema_editor):
+    """Fill the new book rating counters from existing approved reviews"""
+    Book = apps.get_model('books', 'Book')
+    Review = apps.get_model('reviews', 'Review')
+    
+    totals = Review.objects.filter(is_approved=True).values('book_id').annotate(
+        review_count=Count('id'),
+        rating_sum=Sum('rating'),
+        rating_1_count=Count('id', filter=Q(rating=1)),
+        rating_2_count=Count('id', filter=Q(rating=2)),
+        rating_3_count=Count('id', filter=Q(rating=3)),
+        rating_4_count=Count('id', filter=Q(rating=4)),
+        rating_5_count=Count('id', filter=Q(rating=5)),
+        verified_review_count=Count('id', filter=Q(verified_purchase=True)),
+        recommend_count=Count('id', filter=Q(would_recommend=True)),
+    ).order_by()
+    
+    for row in totals.iterator():
+        book_id = row.pop('book_id')
+        Book.objects.filter(pk=book_id).update(
+            average_rating=round(row['rating_sum'] / row['review_count'], 2),
+            **row
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0005_rating_aggregates'),
+        ('reviews', '0002_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
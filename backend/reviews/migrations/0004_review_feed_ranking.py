@@ -0,0 +1,71 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:45
+
+import math
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Q
+
+# A frozen copy of reviews.votes.wilson_score as of this migration
+Z = 1.96
+
+
+def wilson_score(helpful, not_helpful):
+    total = helpful + not_helpful
+    if not total:
+        return 0.0
+    share = helpful / total
+    z2 = Z * Z
+    centre = share + z2 / (2 * total)
+    margin = Z * math.sqrt((share * (1 - share) + z2 / (4 * total)) / total)
+    return (centre - margin) / (1 + z2 / total)
+
+
+def score_voted_reviews(apps, schema_editor):
+    Review = apps.get_model('reviews', 'Review')
+    voted = Review.objects.filter(Q(helpful_count__gt=0) | Q(not_helpful_count__gt=0)).only(
+        'id', 'helpful_count', 'not_helpful_count'
+    )
+    reviews = []
+    for review in voted.iterator():
+        review.helpfulness_score = wilson_score(review.helpful_count, review.not_helpful_count)
+        reviews.append(review)
+    Review.objects.bulk_update(reviews, ['helpfulness_score'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('books', '0005_rating_aggregates'),
+        ('reviews', '0003_backfill_rating_aggregates'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='review',
+            name='helpfulness_score',
+            field=models.FloatField(default=0),
+        ),
+        migrations.RunPython(score_voted_reviews, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='review',
+            name='reviews_rev_book_id_f55b24_idx',
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(condition=models.Q(('is_approved', True)), fields=['book', 'created_at', 'id'], name='review_feed_newest_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(condition=models.Q(('is_approved', True)), fields=['book', 'helpfulness_score', 'id'], name='review_feed_helpful_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(condition=models.Q(('is_approved', True)), fields=['book', 'verified_purchase', 'created_at', 'id'], name='review_feed_verified_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(condition=models.Q(('is_approved', True)), fields=['book', 'rating', 'created_at', 'id'], name='review_feed_rating_idx'),
+        ),
+    ]
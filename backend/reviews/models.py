@@ -26,6 +26,8 @@ class Review(models.Model):
     verified_purchase = models.BooleanField(default=False)
     helpful_count = models.PositiveIntegerField(default=0)
     not_helpful_count = models.PositiveIntegerField(default=0)
+    # Wilson lower bound of the helpful share, kept current by reviews.votes
+    helpfulness_score = models.FloatField(default=0)
     is_approved = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -37,6 +39,29 @@ class Review(models.Model):
             models.Index(fields=['book', 'rating']),
             models.Index(fields=['user', 'created_at']),
             models.Index(fields=['verified_purchase']),
+            # Review feed sort modes, over approved reviews only (the feed's
+            # filter): the top of a book's feed, and each keyset page of the
+            # newest first feed, is an index range scan
+            models.Index(
+                fields=['book', 'created_at', 'id'],
+                condition=models.Q(is_approved=True),
+                name='review_feed_newest_idx'
+            ),
+            models.Index(
+                fields=['book', 'helpfulness_score', 'id'],
+                condition=models.Q(is_approved=True),
+                name='review_feed_helpful_idx'
+            ),
+            models.Index(
+                fields=['book', 'verified_purchase', 'created_at', 'id'],
+                condition=models.Q(is_approved=True),
+                name='review_feed_verified_idx'
+            ),
+            models.Index(
+                fields=['book', 'rating', 'created_at', 'id'],
+                condition=models.Q(is_approved=True),
+                name='review_feed_rating_idx'
+            ),
         ]
     
     def __str__(self):
@@ -48,9 +73,6 @@ class Review(models.Model):
             self.verified_purchase = self._check_verified_purchase()
         
         super().save(*args, **kwargs)
-        
-        # Update book's average rating and review count
-        self._update_book_ratings()
     
     def _check_verified_purchase(self):
         """Check if the user has purchased this book"""
@@ -59,17 +81,6 @@ class Review(models.Model):
             order__status='delivered',
             book=self.book
         ).exists()
-    
-    def _update_book_ratings(self):
-        """Update the book's average rating and review count"""
-        reviews = Review.objects.filter(book=self.book, is_approved=True)
-        total_reviews = reviews.count()
-        
-        if total_reviews > 0:
-            avg_rating = reviews.aggregate(models.Avg('rating'))['rating__avg']
-            self.book.average_rating = round(avg_rating, 2)
-            self.book.review_count = total_reviews
-            self.book.save()
 
 class ReviewVote(models.Model):
     VOTE_CHOICES = [
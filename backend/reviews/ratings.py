@@ -0,0 +1,132 @@
+"""
+Incremental rating aggregates.
+
+Each book stores, over its approved reviews: the number of reviews, the sum
+of their ratings, a per-star histogram (rating_1_count .. rating_5_count),
+and how many are verified purchases or would recommend the book.
+
+A review contributes to those counters only while it is approved. On every
+create, update, approval change and delete, the difference between its
+old and new contributions is applied with one UPDATE of F() expressions.
+The same statement recomputes average_rating from the updated sum and count.
+The cost does not grow with the number of reviews, and concurrent reviews
+of the same book don't overwrite each other's counts.
+"""
+from decimal import Decimal
+
+from django.db.models import Case, Count, DecimalField, F, FloatField, Q, Sum, Value, When
+from django.db.models.functions import Cast, Round
+
+from bnc_books.cache import bump_versions
+from books.models import Book
+from books import shelves
+
+STARS = (1, 2, 3, 4, 5)
+AGGREGATE_FIELDS = (
+    'review_count', 'rating_sum', *[f'rating_{star}_count' for star in STARS],
+    'verified_review_count', 'recommend_count',
+)
+# The Review fields its contribution depends on
+RATED_FIELDS = ('book_id', 'is_approved', 'rating', 'verified_purchase', 'would_recommend')
+
+
+def contribution(state):
+    """
+    The counters a review adds to its book, from a state dict with
+    book_id, is_approved, rating, verified_purchase and would_recommend.
+    """
+    if not state or not state['is_approved'] or state['rating'] not in STARS:
+        return {}
+    return {
+        'review_count': 1,
+        'rating_sum': state['rating'],
+        f"rating_{state['rating']}_count": 1,
+        'verified_review_count': 1 if state['verified_purchase'] else 0,
+        'recommend_count': 1 if state['would_recommend'] else 0,
+    }
+
+
+def review_state(review):
+    return {field: getattr(review, field) for field in RATED_FIELDS}
+
+
+def apply_deltas(book_id, deltas):
+    """Add `deltas` to the book's counters and recompute its average, in one UPDATE"""
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not deltas:
+        return False
+
+    count = F('review_count') + Value(deltas.get('review_count', 0))
+    total = F('rating_sum') + Value(deltas.get('rating_sum', 0))
+    updated = Book.objects.filter(pk=book_id).update(
+        **{field: F(field) + Value(delta) for field, delta in deltas.items()},
+        average_rating=Case(
+            When(Q(review_count__gt=-deltas.get('review_count', 0)), then=Round(
+                Cast(total, FloatField()) / count, 2
+            )),
+            default=Value(0),
+            output_field=DecimalField(max_digits=3, decimal_places=2)
+        )
+    )
+    if updated:
+        # Counter updates skip Book signals: refresh what depends on ratings
+        book = Book.objects.only(*shelves.SHELF_FIELDS).get(pk=book_id)
+        shelves.refresh_book(book)
+        bump_versions('books', f'book:{book_id}')
+    return bool(updated)
+
+
+def review_changed(old_state, new_state):
+    """Apply the difference between a review's previous and current state"""
+    old = contribution(old_state)
+    new = contribution(new_state)
+
+    if old_state and new_state and old_state['book_id'] != new_state['book_id']:
+        apply_deltas(old_state['book_id'], {field: -value for field, value in old.items()})
+        apply_deltas(new_state['book_id'], new)
+        return
+
+    book_id = (new_state or old_state)['book_id']
+    apply_deltas(book_id, {
+        field: new.get(field, 0) - old.get(field, 0)
+        for field in set(old) | set(new)
+    })
+
+
+def rebuild(book_ids=None):
+    """Recompute every book's aggregates from its approved reviews (grouped queries)"""
+    from .models import Review
+
+    books = Book.objects.all()
+    reviews = Review.objects.filter(is_approved=True)
+    if book_ids is not None:
+        books = books.filter(pk__in=book_ids)
+        reviews = reviews.filter(book_id__in=book_ids)
+
+    totals = {
+        row['book_id']: row for row in reviews.values('book_id').annotate(
+            review_count=Count('id'),
+            rating_sum=Sum('rating'),
+            **{f'rating_{star}_count': Count('id', filter=Q(rating=star)) for star in STARS},
+            verified_review_count=Count('id', filter=Q(verified_purchase=True)),
+            recommend_count=Count('id', filter=Q(would_recommend=True)),
+        ).order_by()
+    }
+
+    changed = []
+    for book in books.only('id', 'average_rating', *AGGREGATE_FIELDS).iterator():
+        row = totals.get(book.pk, {})
+        values = {field: row.get(field) or 0 for field in AGGREGATE_FIELDS}
+        values['average_rating'] = (
+            round(Decimal(values['rating_sum']) / values['review_count'], 2) if values['review_count'] else Decimal('0')
+        )
+        if any(getattr(book, field) != value for field, value in values.items()):
+            for field, value in values.items():
+                setattr(book, field, value)
+            changed.append(book)
+
+    Book.objects.bulk_update(changed, ['average_rating', *AGGREGATE_FIELDS], batch_size=500)
+    if changed:
+        shelves.rebuild_all_shelves()
+        bump_versions('books', *[f'book:{book.pk}' for book in changed])
+    return len(changed)
@@ -2,11 +2,14 @@ from rest_framework import serializers
 from django.core.validators import MinValueValidator, MaxValueValidator
 from .models import Review, ReviewVote, ReviewReport
 from accounts.serializers import UserSerializer
+from bnc_books.serializers import EagerLoadingMixin
 
-class ReviewSerializer(serializers.ModelSerializer):
+class ReviewSerializer(EagerLoadingMixin, serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     book_title = serializers.CharField(source='book.title', read_only=True)
     
+    select_related_fields = ('user__profile', 'book')
+    
     class Meta:
         model = Review
         fields = (
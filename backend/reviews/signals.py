@@ -0,0 +1,52 @@
+from django.db.models.signals import post_init, post_save, post_delete, pre_delete, pre_save
+from django.dispatch import receiver
+from bnc_books.cache import bump_versions
+from .models import Review
+from . import ratings
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def invalidate_review_responses(sender, instance, **kwargs):
+    bump_versions(f'reviews:book:{instance.book_id}')
+
+# The rated state of a review loaded with some of its fields deferred
+DEFERRED = object()
+
+@receiver(post_init, sender=Review)
+def remember_rated_state(sender, instance, **kwargs):
+    # The state the book's rating counters currently include. Read from
+    # __dict__ so deferred loads (.only()) don't trigger a query
+    if not instance.pk:
+        instance._rated_state = None
+    elif all(field in instance.__dict__ for field in ratings.RATED_FIELDS):
+        instance._rated_state = {field: instance.__dict__[field] for field in ratings.RATED_FIELDS}
+    else:
+        instance._rated_state = DEFERRED
+
+def _load_rated_state(review):
+    return Review.objects.filter(pk=review.pk).values(*ratings.RATED_FIELDS).first()
+
+@receiver(pre_save, sender=Review)
+def load_deferred_rated_state(sender, instance, **kwargs):
+    if instance._rated_state is DEFERRED:
+        instance._rated_state = _load_rated_state(instance)
+
+@receiver(pre_delete, sender=Review)
+def load_deferred_rated_state_on_delete(sender, instance, **kwargs):
+    if instance._rated_state is DEFERRED:
+        instance._rated_state = _load_rated_state(instance)
+        # Once the row is gone, deferred fields can't be loaded
+        for field, value in (instance._rated_state or {}).items():
+            instance.__dict__.setdefault(field, value)
+
+@receiver(post_save, sender=Review)
+def update_book_ratings(sender, instance, **kwargs):
+    """Apply the review's change to its book's rating aggregates"""
+    state = ratings.review_state(instance)
+    ratings.review_changed(instance._rated_state, state)
+    instance._rated_state = state
+
+@receiver(post_delete, sender=Review)
+def remove_book_rating(sender, instance, **kwargs):
+    ratings.review_changed(instance._rated_state, None)
+    instance._rated_state = None
\ No newline at end of file
@@ -1,3 +1,258 @@
-from django.test import TestCase
+import threading
+from decimal import Decimal
+from django.test import TestCase, TransactionTestCase
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from accounts.models import User
+from bnc_books.testing import QueryScalingAssertionsMixin
+from books.models import Book, Category
+from books.tests import make_book, make_seller
+from .models import Review, ReviewVote
+from . import ratings, votes
+from .views import BookReviewsView
 
-# Create your tests here.
+class ReviewQueryCountTests(QueryScalingAssertionsMixin, TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.buyer = User.objects.create_user(
+            username='buyer@example.com', email='buyer@example.com', role='buyer'
+        )
+        self.client.force_authenticate(self.buyer)
+        self.category = Category.objects.create(name='Fiction')
+    
+    def test_user_reviews_queries_do_not_scale(self):
+        def grow(size):
+            while Review.objects.filter(user=self.buyer).count() < size:
+                index = Review.objects.count()
+                seller = make_seller(f'seller{index}@example.com')
+                Review.objects.create(
+                    user=self.buyer,
+                    book=make_book(seller, self.category, index),
+                    rating=4,
+                    title='Good read',
+                    comment='Enjoyed it from start to finish.'
+                )
+        
+        self.assertQueriesDoNotScale(lambda: self.client.get('/api/reviews/my-reviews/'), grow)
+
+class RatingAggregateTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.category = Category.objects.create(name='Fiction')
+        self.seller = make_seller()
+        self.book = make_book(self.seller, self.category, 1)
+        self.other_book = make_book(self.seller, self.category, 2)
+        self.users = [
+            User.objects.create_user(username=f'reader{index}@example.com', email=f'reader{index}@example.com', role='buyer')
+            for index in range(4)
+        ]
+    
+    def review(self, user, rating, **fields):
+        return Review.objects.create(
+            user=user, book=self.book, rating=rating,
+            title='Review', comment='Some thoughts.', **fields
+        )
+    
+    def aggregates(self, book=None):
+        book = Book.objects.get(pk=(book or self.book).pk)
+        return (
+            book.review_count, book.average_rating,
+            [getattr(book, f'rating_{star}_count') for star in ratings.STARS],
+            book.recommend_count
+        )
+    
+    def test_counters_follow_create_update_approval_and_delete(self):
+        first = self.review(self.users[0], 5)
+        second = self.review(self.users[1], 2, would_recommend=False)
+        self.assertEqual(self.aggregates(), (2, Decimal('3.50'), [0, 1, 0, 0, 1], 1))
+        
+        second.rating = 4
+        second.save()
+        self.assertEqual(self.aggregates(), (2, Decimal('4.50'), [0, 0, 0, 1, 1], 1))
+        
+        first.is_approved = False
+        first.save()
+        self.assertEqual(self.aggregates(), (1, Decimal('4.00'), [0, 0, 0, 1, 0], 0))
+        
+        second.delete()
+        self.assertEqual(self.aggregates(), (0, Decimal('0.00'), [0, 0, 0, 0, 0], 0))
+        
+        first.is_approved = True
+        first.book = self.other_book
+        first.save()
+        self.assertEqual(self.aggregates(self.other_book), (1, Decimal('5.00'), [0, 0, 0, 0, 1], 1))
+    
+    def test_deferred_loads_stay_one_query_and_still_count(self):
+        for user, rating in zip(self.users, (5, 4, 3)):
+            self.review(user, rating)
+        
+        with self.assertNumQueries(1):
+            reviews = list(Review.objects.only('id', 'title').order_by('id'))
+        
+        reviews[0].rating = 1
+        reviews[0].save()
+        reviews[1].delete()
+        self.assertEqual(self.aggregates(), (2, Decimal('2.00'), [1, 0, 1, 0, 0], 2))
+    
+    def test_new_review_costs_the_same_whatever_the_review_count(self):
+        def cost(user):
+            with CaptureQueriesContext(connection) as context:
+                self.review(user, 4)
+            return len(context.captured_queries)
+        
+        self.assertEqual(cost(self.users[0]), cost(self.users[1]))
+        self.assertEqual(cost(self.users[2]), cost(self.users[3]))
+    
+    def test_summary_is_served_from_the_histogram(self):
+        for user, rating in zip(self.users, (5, 5, 3, 1)):
+            self.review(user, rating, verified_purchase=False)
+        
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(f'/api/reviews/summary/{self.book.pk}/')
+        self.assertFalse(any('reviews_review' in query['sql'] for query in context.captured_queries))
+        self.assertEqual(response.data['total_reviews'], 4)
+        self.assertEqual(response.data['average_rating'], 3.5)
+        self.assertEqual(response.json()['rating_distribution'], {'1': 1, '2': 0, '3': 1, '4': 0, '5': 2})
+        self.assertEqual(response.data['would_recommend_percentage'], 100.0)
+    
+    def test_rebuild_repairs_drifted_counters(self):
+        for user, rating in zip(self.users, (5, 4, 4)):
+            self.review(user, rating)
+        expected = self.aggregates()
+        Book.objects.filter(pk=self.book.pk).update(review_count=0, rating_sum=0, rating_4_count=7, average_rating=1)
+        
+        self.assertEqual(ratings.rebuild(), 1)
+        self.assertEqual(self.aggregates(), expected)
+        self.assertEqual(ratings.rebuild(), 0)
+
+class ReviewVoteTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.voter = User.objects.create_user(username='voter@example.com', email='voter@example.com', role='buyer')
+        self.client.force_authenticate(self.voter)
+        author = User.objects.create_user(username='author@example.com', email='author@example.com', role='buyer')
+        self.book = make_book(make_seller(), Category.objects.create(name='Fiction'), 1)
+        self.review = Review.objects.create(
+            user=author, book=self.book, rating=4, title='Good read', comment='Enjoyed it.'
+        )
+    
+    def vote(self, vote_type):
+        return self.client.post(f'/api/reviews/{self.review.pk}/vote/', {'vote_type': vote_type}).data
+    
+    def test_clicks_add_switch_and_remove_the_vote(self):
+        self.assertEqual(self.vote('helpful'), {'helpful_count': 1, 'not_helpful_count': 0, 'user_vote': 'helpful'})
+        self.assertEqual(
+            self.vote('not_helpful'), {'helpful_count': 0, 'not_helpful_count': 1, 'user_vote': 'not_helpful'}
+        )
+        self.assertEqual(self.vote('not_helpful'), {'helpful_count': 0, 'not_helpful_count': 0, 'user_vote': None})
+        self.assertFalse(ReviewVote.objects.exists())
+    
+    def test_votes_leave_the_book_alone(self):
+        with CaptureQueriesContext(connection) as context:
+            self.vote('helpful')
+        self.assertFalse(any('books_book' in query['sql'] for query in context.captured_queries))
+    
+    def test_invalid_vote_type_is_rejected(self):
+        response = self.client.post(f'/api/reviews/{self.review.pk}/vote/', {'vote_type': 'love'})
+        self.assertEqual(response.status_code, 400)
+
+class ReviewVoteConcurrencyTests(TransactionTestCase):
+    """Parallel vote clicks on one review (the SQLite test database is a file)"""
+    voters = 16
+    clicks = 3
+    
+    def test_counters_match_the_vote_rows(self):
+        author = User.objects.create_user(username='author@example.com', email='author@example.com', role='buyer')
+        book = make_book(make_seller(), Category.objects.create(name='Fiction'), 1)
+        review = Review.objects.create(user=author, book=book, rating=4, title='Good read', comment='Enjoyed it.')
+        voters = [
+            User.objects.create_user(username=f'v{index}@example.com', email=f'v{index}@example.com', role='buyer')
+            for index in range(self.voters)
+        ]
+        barrier = threading.Barrier(self.voters)
+        errors = []
+        
+        def click(index, voter):
+            barrier.wait()
+            try:
+                # Each voter clicks helpful / not helpful several times in a row
+                for attempt in range(self.clicks + index % 2):
+                    votes.cast_vote(voter, review, 'helpful' if (index + attempt) % 3 else 'not_helpful')
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+        
+        threads = [threading.Thread(target=click, args=(index, voter)) for index, voter in enumerate(voters)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(errors, [])
+        review.refresh_from_db()
+        self.assertEqual(review.helpful_count, ReviewVote.objects.filter(review=review, vote_type='helpful').count())
+        self.assertEqual(
+            review.not_helpful_count, ReviewVote.objects.filter(review=review, vote_type='not_helpful').count()
+        )
+        self.assertGreater(review.helpful_count + review.not_helpful_count, 0)
+
+
+class ReviewFeedTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.book = make_book(make_seller(), Category.objects.create(name='Fiction'), 1)
+        self.reviews = {}
+        for name, rating, verified, helpful, not_helpful in (
+            ('single_vote', 5, False, 1, 0),
+            ('mostly_helpful', 3, True, 9, 1),
+            ('unhelpful', 4, False, 2, 8),
+            ('no_votes', 1, True, 0, 0),
+        ):
+            user = User.objects.create_user(username=f'{name}@example.com', email=f'{name}@example.com', role='buyer')
+            review = Review.objects.create(
+                user=user, book=self.book, rating=rating, title='A review', comment='Some thoughts on it.'
+            )
+            Review.objects.filter(pk=review.pk).update(
+                verified_purchase=verified,
+                helpful_count=helpful,
+                not_helpful_count=not_helpful,
+                helpfulness_score=votes.wilson_score(helpful, not_helpful)
+            )
+            self.reviews[review.pk] = name
+    
+    def feed(self, sort):
+        response = self.client.get('/api/reviews/', {'book': self.book.pk, 'sort': sort})
+        return [self.reviews[review['id']] for review in response.data['results']]
+    
+    def test_sort_modes(self):
+        self.assertEqual(self.feed('helpful'), ['mostly_helpful', 'single_vote', 'unhelpful', 'no_votes'])
+        self.assertEqual(self.feed('verified')[:2], ['no_votes', 'mostly_helpful'])
+        self.assertEqual(self.feed('highest_rating'), ['single_vote', 'unhelpful', 'mostly_helpful', 'no_votes'])
+        self.assertEqual(self.feed('lowest_rating'), ['no_votes', 'mostly_helpful', 'unhelpful', 'single_vote'])
+        self.assertEqual(self.feed('newest'), ['no_votes', 'unhelpful', 'mostly_helpful', 'single_vote'])
+    
+    def test_count_comes_from_the_book(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get('/api/reviews/', {'book': self.book.pk, 'sort': 'helpful'})
+        self.assertEqual(response.data['count'], 4)
+        self.assertFalse(any('COUNT(' in query['sql'] for query in context.captured_queries))
+    
+    def test_votes_recompute_the_score(self):
+        review = Review.objects.get(pk=next(pk for pk, name in self.reviews.items() if name == 'no_votes'))
+        voter = User.objects.create_user(username='voter@example.com', email='voter@example.com', role='buyer')
+        votes.cast_vote(voter, review, 'helpful')
+        review.refresh_from_db()
+        self.assertAlmostEqual(review.helpfulness_score, votes.wilson_score(1, 0))
+    
+    def test_top_reviews_are_read_in_index_order(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('Checks an SQLite query plan')
+        for sort in ('helpful', 'verified', 'highest_rating', 'newest'):
+            queryset = Review.objects.filter(book=self.book, is_approved=True).order_by(
+                *BookReviewsView.sort_orderings[sort]
+            )[:10]
+            plan = queryset.explain()
+            self.assertIn('USING INDEX', plan, sort)
+            self.assertNotIn('TEMP B-TREE', plan, sort)
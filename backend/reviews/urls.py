@@ -3,7 +3,7 @@ from . import views
 
 urlpatterns = [
     # Review endpoints
-    path('', views.CreateReviewView.as_view(), name='create-review'),
+    # GET lists a book's reviews, POST creates one
     path('', views.BookReviewsView.as_view(), name='book-reviews'),
     path('my-reviews/', views.UserReviewsView.as_view(), name='user-reviews'),
     path('can-review/<int:book_id>/', views.CanReviewView.as_view(), name='can-review'),
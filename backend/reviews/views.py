@@ -5,7 +5,12 @@ from rest_framework.generics import ListAPIView, RetrieveAPIView, UpdateAPIView,
 from django.shortcuts import get_object_or_404
 from django.db.models import Count, Avg, Q
 from django.utils import timezone
+from bnc_books.cache import VersionedCacheMixin
+from bnc_books.pagination import StandardPagination
+from bnc_books.replicas import ReplicaReadMixin
 from .models import Review, ReviewVote, ReviewReport
+from .ratings import AGGREGATE_FIELDS, STARS
+from . import votes
 from books.models import Book
 from orders.models import OrderItem
 from .serializers import (
@@ -58,42 +63,56 @@ class CreateReviewView(APIView):
         
         return True, None
 
-class BookReviewsView(ListAPIView):
+class BookReviewsView(ReplicaReadMixin, CreateReviewView, ListAPIView):
+    """
+    GET lists approved reviews (?book=<id>), POST creates one.
+
+    ?sort= picks the order: newest (default), helpful (Wilson score on
+    helpful / not helpful votes), verified (verified purchases first),
+    highest_rating or lowest_rating. Each has an index on the book's
+    approved reviews, so the top of the feed is read straight from it.
+    """
     serializer_class = ReviewSerializer
-    permission_classes = [permissions.AllowAny]
+    permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    pagination_class = StandardPagination
+    
+    sort_orderings = {
+        'newest': ('-created_at', '-id'),
+        'helpful': ('-helpfulness_score', '-id'),
+        'verified': ('-verified_purchase', '-created_at', '-id'),
+        'highest_rating': ('-rating', '-created_at', '-id'),
+        'lowest_rating': ('rating', '-created_at', '-id'),
+    }
+    
+    def get_sort(self):
+        sort = self.request.query_params.get('sort', 'newest')
+        return sort if sort in self.sort_orderings else 'newest'
+    
+    @property
+    def keyset_pagination(self):
+        # Cursor pages follow (created_at, id)
+        return self.get_sort() == 'newest'
     
     def get_queryset(self):
+        queryset = Review.objects.filter(is_approved=True)
         book_id = self.request.query_params.get('book')
         if book_id:
-            return Review.objects.filter(
-                book_id=book_id, 
-                is_approved=True
-            ).select_related('user', 'book')
-        return Review.objects.filter(is_approved=True).select_related('user', 'book')
+            queryset = queryset.filter(book_id=book_id)
+        return ReviewSerializer.setup_eager_loading(queryset.order_by(*self.sort_orderings[self.get_sort()]))
     
-    def list(self, request, *args, **kwargs):
-        response = super().list(request, *args, **kwargs)
-        
-        # Add count to response
-        book_id = request.query_params.get('book')
-        if book_id:
-            count = Review.objects.filter(book_id=book_id, is_approved=True).count()
-        else:
-            count = Review.objects.filter(is_approved=True).count()
-        
-        response.data = {
-            'count': count,
-            'results': response.data
-        }
-        
-        return response
+    def get_result_count(self):
+        # A book's approved reviews are already counted on the book
+        book_id = self.request.query_params.get('book')
+        if not book_id or not book_id.isdigit():
+            return None
+        return Book.objects.filter(pk=book_id).values_list('review_count', flat=True).first() or 0
 
-class UserReviewsView(ListAPIView):
+class UserReviewsView(ReplicaReadMixin, ListAPIView):
     serializer_class = ReviewSerializer
     permission_classes = [permissions.IsAuthenticated]
     
     def get_queryset(self):
-        return Review.objects.filter(user=self.request.user).select_related('book')
+        return ReviewSerializer.setup_eager_loading(Review.objects.filter(user=self.request.user))
 
 class ReviewDetailView(RetrieveAPIView, UpdateAPIView, DestroyAPIView):
     serializer_class = ReviewSerializer
@@ -177,59 +196,12 @@ class ReviewVoteView(APIView):
         
         vote_type = request.data.get('vote_type')
         
-        if vote_type not in ['helpful', 'not_helpful']:
+        if vote_type not in votes.VOTE_TYPES:
             return Response({
                 'error': 'Vote type must be "helpful" or "not_helpful"'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Check if user has already voted
-        existing_vote = ReviewVote.objects.filter(
-            user=request.user, 
-            review=review
-        ).first()
-        
-        if existing_vote:
-            if existing_vote.vote_type == vote_type:
-                # Remove the vote if clicking the same button
-                existing_vote.delete()
-                
-                # Update counts
-                if vote_type == 'helpful':
-                    review.helpful_count = max(0, review.helpful_count - 1)
-                else:
-                    review.not_helpful_count = max(0, review.not_helpful_count - 1)
-            else:
-                # Change vote type
-                if existing_vote.vote_type == 'helpful':
-                    review.helpful_count = max(0, review.helpful_count - 1)
-                    review.not_helpful_count += 1
-                else:
-                    review.not_helpful_count = max(0, review.not_helpful_count - 1)
-                    review.helpful_count += 1
-                
-                existing_vote.vote_type = vote_type
-                existing_vote.save()
-        else:
-            # Create new vote
-            ReviewVote.objects.create(
-                user=request.user,
-                review=review,
-                vote_type=vote_type
-            )
-            
-            # Update counts
-            if vote_type == 'helpful':
-                review.helpful_count += 1
-            else:
-                review.not_helpful_count += 1
-        
-        review.save()
-        
-        return Response({
-            'helpful_count': review.helpful_count,
-            'not_helpful_count': review.not_helpful_count,
-            'user_vote': vote_type if not existing_vote or existing_vote.vote_type == vote_type else None
-        })
+        return Response(votes.cast_vote(request.user, review, vote_type))
 
 class ReviewReportView(APIView):
     permission_classes = [permissions.IsAuthenticated]
@@ -261,21 +233,24 @@ class ReviewReportView(APIView):
             'report_id': report.id
         }, status=status.HTTP_201_CREATED)
 
-class ReviewSummaryView(APIView):
+class ReviewSummaryView(VersionedCacheMixin, APIView):
     permission_classes = [permissions.AllowAny]
     
+    def get_cache_scopes(self, request, *args, **kwargs):
+        book_id = kwargs['book_id']
+        return [f'book:{book_id}', f'reviews:book:{book_id}']
+    
     def get(self, request, book_id):
         try:
-            book = Book.objects.get(pk=book_id)
+            book = Book.objects.only('id', 'average_rating', *AGGREGATE_FIELDS).get(pk=book_id)
         except Book.DoesNotExist:
             return Response(
                 {'error': 'Book not found'}, 
                 status=status.HTTP_404_NOT_FOUND
             )
         
-        # Get review statistics
-        reviews = Review.objects.filter(book=book, is_approved=True)
-        total_reviews = reviews.count()
+        # Review statistics are counters kept on the book (see reviews.ratings)
+        total_reviews = book.review_count
         
         if total_reviews == 0:
             return Response({
@@ -286,25 +261,14 @@ class ReviewSummaryView(APIView):
                 'would_recommend_percentage': 0
             })
         
-        # Calculate rating distribution
-        rating_distribution = reviews.values('rating').annotate(
-            count=Count('id')
-        ).order_by('rating')
-        
-        distribution_dict = {1: 0, 2: 0, 3: 0, 4: 0, 5: 0}
-        for item in rating_distribution:
-            distribution_dict[item['rating']] = item['count']
-        
-        # Calculate other statistics
-        verified_purchases = reviews.filter(verified_purchase=True).count()
-        would_recommend = reviews.filter(would_recommend=True).count()
-        would_recommend_percentage = round((would_recommend / total_reviews) * 100, 1)
+        distribution_dict = {star: getattr(book, f'rating_{star}_count') for star in STARS}
+        would_recommend_percentage = round((book.recommend_count / total_reviews) * 100, 1)
         
         serializer = ReviewSummarySerializer({
             'total_reviews': total_reviews,
             'average_rating': book.average_rating,
             'rating_distribution': distribution_dict,
-            'verified_purchases': verified_purchases,
+            'verified_purchases': book.verified_review_count,
             'would_recommend_percentage': would_recommend_percentage
         })
         